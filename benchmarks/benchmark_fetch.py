@@ -0,0 +1,91 @@
+"""
+Fetch-layer throughput against the local results stand-in (data_results_server.py), so fetch changes
+can be benchmarked reproducibly without network access. Serves synthetic data in-process, points
+DataFunctions at it and times get_all_election_data and a journaled CrawlJob over the same races,
+reporting requests/second and the request latency percentiles from Instrumentation.
+
+Faults are injected by the stand-in: --latency adds server time to every response and --error-rate
+answers a reproducible fraction of requests 503 (retried by the crawl; get_all_election_data leaves
+those races blank, so it always runs without errors here).
+
+Usage (from the repository root):
+    python benchmarks/benchmark_fetch.py
+    python benchmarks/benchmark_fetch.py --units-per-state 500 --latency 0.01 --error-rate 0.05
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_model import ElectionDataMap
+from data_functions import DataFunctions
+from data_synthetic import SyntheticElectionData
+from data_results_server import ResultsFixtures, ResultsServer
+from data_crawl import CrawlJob
+from data_instrumentation import Instrumentation
+
+
+def report_line(name: str, seconds: float, counts: dict) -> str:
+    http = Instrumentation.report()['http']
+    requests = sum(e['requests'] for e in http.values())
+    p50 = max((e['p50_ms'] for e in http.values()), default=0.0)
+    p95 = max((e['p95_ms'] for e in http.values()), default=0.0)
+    statuses = ', '.join(f"{status}: {count}" for status, count in sorted(counts.items()))
+    return f"{name:<24}{requests:>9}{seconds:>10.2f}{requests / seconds:>10.1f}{p50:>9.1f}{p95:>9.1f}   {statuses}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fetch throughput against the local results stand-in')
+    parser.add_argument('--units-per-state', type=int, default=90)
+    parser.add_argument('--districts-per-state', type=int, default=8)
+    parser.add_argument('--states', default=None, help='Comma separated states (default: all)')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    states = args.states.split(',') if args.states else None
+    start = time.perf_counter()
+    full = SyntheticElectionData.generate(units_per_state=args.units_per_state, districts_per_state=args.districts_per_state, states=states, seed=args.seed)
+    data_map = SyntheticElectionData.district_map(full)
+    fixtures = ResultsFixtures.from_full_data(full)
+    print(f"Fixtures: {len(fixtures)} races, {sum(len(b) for b in fixtures.bodies.values()) / 2 ** 20:.1f}MB in {time.perf_counter() - start:.2f}s")
+
+    results = ResultsServer(fixtures, latency=args.latency, seed=args.seed)
+    server = results.make_server('127.0.0.1', 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    DataFunctions.set_base_url(f"http://127.0.0.1:{server.server_port}/results/county-races")
+    Instrumentation.enable(trace_memory=False)
+
+    print(f"{'run':<24}{'requests':>9}{'seconds':>10}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}   statuses")
+    try:
+        # get_all_election_data has no retries, so it runs without injected errors
+        Instrumentation.reset()
+        results.counts.clear()
+        start = time.perf_counter()
+        DataFunctions.get_all_election_data(list(ElectionDataMap.election_types.keys()), data_map)
+        print(report_line('get_all_election_data', time.perf_counter() - start, results.counts))
+
+        results.error_rate = args.error_rate
+        Instrumentation.reset()
+        results.counts.clear()
+        with tempfile.TemporaryDirectory() as directory:
+            job = CrawlJob(data_map, ElectionDataMap.election_types.keys(), os.path.join(directory, 'crawl.jsonl'))
+            start = time.perf_counter()
+            summary = job.run(max_attempts=5, retry_delay=0)
+            print(report_line('CrawlJob.run', time.perf_counter() - start, results.counts))
+        if summary['failed']:
+            print(f"Crawl left {summary['failed']} tasks failed")
+    finally:
+        Instrumentation.disable()
+        DataFunctions.set_base_url(None)
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Throughput of per-state comparison charts: pyplot per chart (plot_comparison_bar_chart)
+vs the reusable headless renderer, single process and over a process pool.
+
+Usage (from the repository root):
+    python benchmarks/benchmark_rendering.py --processes 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+
+from data_model import ElectionDataGroupedAndFlattenedModel
+from data_analytics import DataAnalytics
+from data_rendering import ComparisonChartRenderer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chart rendering throughput')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--pyplot-charts', type=int, default=10, help='Charts rendered with pyplot for the baseline')
+    args = parser.parse_args()
+
+    analytics = DataAnalytics(ElectionDataGroupedAndFlattenedModel.load_from_csv(["data", "election_data_grouped_and_flattened.csv"]))
+    specs = (
+        ComparisonChartRenderer.state_specs(analytics.df, 'pres_house_ratio', 'Average Presidential-to-House Vote Ratio') +
+        ComparisonChartRenderer.state_specs(analytics.df, 'split_ticket', 'Average Split-Ticket Voting Percent', scale=0.01)
+    )
+    out_dir = tempfile.mkdtemp()
+    print(f"{len(specs)} charts, dpi={args.dpi}")
+
+    # Baseline: fresh pyplot figure per chart
+    start = time.perf_counter()
+    for i, spec in enumerate(specs[:args.pyplot_charts]):
+        DataAnalytics.plot_comparison_bar_chart(
+            non_swing_2020=spec.non_swing_2020, non_swing_2024=spec.non_swing_2024,
+            swing_2020=spec.swing_2020, swing_2024=spec.swing_2024,
+            title=spec.title, figsize=(5, 5), save_path=os.path.join(out_dir, f'pyplot_{i}.png')
+        )
+    pyplot_rate = args.pyplot_charts / (time.perf_counter() - start)
+    print(f"pyplot per chart (dpi 300):   {pyplot_rate:8.1f} charts/s")
+
+    start = time.perf_counter()
+    ComparisonChartRenderer.render_batch(specs, processes=1, figsize=(5, 5), dpi=300)
+    print(f"renderer, 1 process (dpi 300):{len(specs) / (time.perf_counter() - start):8.1f} charts/s")
+
+    for tight in (True, False):
+        start = time.perf_counter()
+        ComparisonChartRenderer.render_batch(specs, processes=1, figsize=(5, 5), dpi=args.dpi, tight=tight)
+        print(f"renderer, 1 process, tight={tight!s:<5}: {len(specs) / (time.perf_counter() - start):8.1f} charts/s")
+
+    if args.processes > 1:
+        start = time.perf_counter()
+        pngs = ComparisonChartRenderer.render_batch(specs, processes=args.processes, figsize=(5, 5), dpi=args.dpi, tight=False)
+        print(f"renderer, {args.processes} processes, tight=False: {len(pngs) / (time.perf_counter() - start):8.1f} charts/s (incl. pool startup)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Compares two ways of giving process-pool workers the analytics frame: pickling DataAnalytics.df
+into every task, and the shared memory column store behind DataAnalytics.worker_pool. Reports pool
+startup, bytes sent per task and the wall time of per-state tasks and of resample tasks.
+
+The flattened real data is small (~4.6k counties); --scale repeats it to emulate larger inputs.
+
+Usage (from the repository root):
+    python benchmarks/benchmark_shared_memory.py
+    python benchmarks/benchmark_shared_memory.py --scale 50 --processes 4 --resamples 200
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_model import ElectionDataGroupedAndFlattenedModel
+from data_analytics import DataAnalytics
+from data_shared import SharedColumnStore
+
+
+def finite_ratio_changes(df: pd.DataFrame) -> np.ndarray:
+    values = df['pres_house_ratio_change'].to_numpy()
+    return values[np.isfinite(values)]
+
+
+def state_median_ratio_change(df: pd.DataFrame) -> float:
+    values = finite_ratio_changes(df)
+    return float(np.median(values)) if len(values) else np.nan
+
+
+def bootstrap_mean_ratio_change(df: pd.DataFrame, rng: np.random.Generator) -> float:
+    values = finite_ratio_changes(df)
+    return float(values[rng.integers(0, len(values), len(values))].mean())
+
+
+# Pickling baseline: the frame travels with every task
+def pickled_state_task(df: pd.DataFrame, state_id: int) -> float:
+    return state_median_ratio_change(df[df['state_id'].to_numpy() == state_id])
+
+
+def pickled_resample_task(df: pd.DataFrame, seed: int) -> float:
+    return bootstrap_mean_ratio_change(df, np.random.default_rng([0, seed]))
+
+
+def noop() -> None:
+    pass
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared memory vs pickled frame for analytics worker pools')
+    parser.add_argument('--input', default=os.path.join('data', 'election_data_grouped_and_flattened.csv'))
+    parser.add_argument('--scale', type=int, default=10, help='Times the frame is repeated')
+    parser.add_argument('--processes', type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument('--resamples', type=int, default=100)
+    args = parser.parse_args()
+
+    analytics = DataAnalytics(ElectionDataGroupedAndFlattenedModel.load_from_csv(args.input))
+    df = pd.concat([analytics.df] * args.scale, ignore_index=True)
+    analytics = DataAnalytics.from_dataframe(df.drop(columns=['state_id']))
+    numeric = analytics.df[SharedColumnStore.numeric_columns(analytics.df)]
+    state_ids = np.unique(numeric['state_id'].to_numpy()).tolist()
+    print(f"{len(numeric)} rows, {numeric.shape[1]} numeric columns, {numeric.memory_usage().sum() / 1e6:.1f}MB, "
+          f"{args.processes} processes, {len(state_ids)} states, {args.resamples} resamples")
+
+    # Pickled frame
+    payload = len(pickle.dumps(numeric, protocol=pickle.HIGHEST_PROTOCOL))
+    pool, startup = timed(lambda: get_context().Pool(args.processes))
+    pool.apply(noop)
+    pickled_states, states_s = timed(lambda: pool.starmap(pickled_state_task, [(numeric, s) for s in state_ids]))
+    pickled_resamples, resamples_s = timed(lambda: pool.starmap(pickled_resample_task, [(numeric, i) for i in range(args.resamples)]))
+    pool.close()
+    pool.join()
+    pickled = (startup, payload, states_s, resamples_s)
+
+    # Shared memory
+    pool, startup = timed(lambda: analytics.worker_pool(args.processes))
+    pool._pool.apply(noop)
+    payload = len(pickle.dumps(pool.store.handle, protocol=pickle.HIGHEST_PROTOCOL))
+    shared_states, states_s = timed(lambda: pool.map_states(state_median_ratio_change))
+    shared_resamples, resamples_s = timed(lambda: pool.map_resamples(bootstrap_mean_ratio_change, args.resamples))
+    pool.close()
+    shared = (startup, payload, states_s, resamples_s)
+
+    print(f"{'':<10}{'startup ms':>12}{'bytes/task':>14}{'per-state ms':>14}{'resamples ms':>14}")
+    for name, (startup, payload, states_s, resamples_s) in (('pickled', pickled), ('shared', shared)):
+        print(f"{name:<10}{startup * 1000:>12.1f}{payload:>14}{states_s * 1000:>14.1f}{resamples_s * 1000:>14.1f}")
+
+    if not (np.allclose(pickled_states, list(shared_states.values()), equal_nan=True) and np.allclose(pickled_resamples, shared_resamples)):
+        print("Results differ between the pickled and shared runs")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
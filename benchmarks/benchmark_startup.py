@@ -0,0 +1,127 @@
+"""
+Import-time budget per CLI command, measured with `python -X importtime cli.py <command> ...` in a
+fresh interpreter. Each command really runs, on a tiny synthetic dataset (fetch against a local
+ResultsServer), so everything it imports on the way counts, not just its COMMAND_MODULES.
+Exits with status 1 when a command goes over its budget or imports a forbidden package.
+
+Usage (from the repository root):
+    python benchmarks/benchmark_startup.py [--runs 3]
+"""
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cli import COMMAND_MODULES
+from data_functions import DataFunctions
+from data_model import ElectionDataFullModel
+from data_results_server import ResultsFixtures, ResultsServer
+from data_synthetic import SyntheticElectionData
+
+# Cumulative import time budgets in milliseconds
+BUDGETS_MS = {
+    'cli': 50,
+    'fetch': 250,
+    'aggregate': 150,
+    'flatten': 150,
+    'analyze': 1500,
+    'join': 1500,
+    'render': 2500,
+}
+
+# Heavy dependencies that must not be imported by the light commands
+FORBIDDEN = {
+    'cli': ['pandas', 'numpy', 'matplotlib', 'requests'],
+    'aggregate': ['pandas', 'numpy', 'matplotlib', 'requests'],
+    'flatten': ['pandas', 'numpy', 'matplotlib', 'requests'],
+    'fetch': ['pandas', 'numpy', 'matplotlib'],
+    'analyze': ['matplotlib'],
+    'join': ['matplotlib'],
+}
+
+
+def build_fixture(directory: str, full: ElectionDataFullModel, base_url: str) -> Dict[str, List[str]]:
+    """Writes a tiny dataset to directory and returns the cli arguments that run each command on it."""
+    grouped = DataFunctions.aggregate_full_data_to_grouped(full)
+    flattened = DataFunctions.flatten_grouped_election_data(grouped)
+    path = {name: os.path.join(directory, name) for name in ['map.json', 'full.json', 'grouped.csv', 'flattened.csv', 'table.csv', 'out']}
+    SyntheticElectionData.district_map(full).save_to_json(path['map.json'])
+    full.save_to_json(path['full.json'])
+    grouped.save_to_csv(path['grouped.csv'])
+    flattened.save_to_csv(path['flattened.csv'])
+    with open(path['table.csv'], 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['state_code', 'county', 'value'])
+        writer.writerows((state, county, 1) for state, counties in full.data['2024'].items() for county in counties)
+    out = path['out']
+    os.makedirs(out)
+    return {
+        'cli': ['--help'],
+        'fetch': ['fetch', '--map', path['map.json'], '--output', os.path.join(out, 'full.json'), '--base-url', base_url],
+        'aggregate': ['aggregate', '--input', path['full.json'], '--output', os.path.join(out, 'grouped.csv')],
+        'flatten': ['flatten', '--input', path['grouped.csv'], '--output', os.path.join(out, 'flattened.csv')],
+        'analyze': ['analyze', '--input', path['flattened.csv'], '--output', os.path.join(out, 'analysis.csv')],
+        'join': ['join', '--table', path['table.csv'], '--input', path['flattened.csv'], '--output', os.path.join(out, 'joined.csv')],
+        'render': ['render', '--input', path['flattened.csv'], '--output-dir', out],
+    }
+
+
+def measure(cli_args: Optional[List[str]]) -> Tuple[float, Set[str]]:
+    """Returns (total import time in ms, top-level packages imported) for a cli run, or for a bare interpreter if None."""
+    command = ['-c', 'pass'] if cli_args is None else ['cli.py'] + cli_args
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + command, cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"cli.py {' '.join(cli_args)} failed:\n{result.stdout}{result.stderr}")
+
+    total_us = 0
+    packages = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        packages.add(name.strip().split('.')[0])
+        # Nested imports are indented past the single separator space; top-level entries sum to the total
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative)
+    return total_us / 1000, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CLI import-time budgets')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    full = SyntheticElectionData.generate(units_per_state=4, districts_per_state=2, states=['PA', 'GA'], seed=0)
+    server = ResultsServer(ResultsFixtures.from_full_data(full)).make_server('127.0.0.1', 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    directory = tempfile.TemporaryDirectory()
+    commands = build_fixture(directory.name, full, f"http://127.0.0.1:{server.server_port}")
+
+    # Interpreter startup (site, encodings) is paid by every command; report only what comes on top
+    baseline = min(measure(None)[0] for _ in range(args.runs))
+
+    failed = False
+    print(f"{'command':<10}{'import ms':>10}{'budget':>8}  status")
+    for command in ['cli'] + list(COMMAND_MODULES):
+        best, packages = min(measure(commands[command]) for _ in range(args.runs))
+        best -= baseline
+        forbidden = sorted(set(FORBIDDEN.get(command, [])) & packages)
+        ok = best <= BUDGETS_MS[command] and not forbidden
+        failed |= not ok
+        status = 'ok' if ok else ('over budget' if not forbidden else f"imports {', '.join(forbidden)}")
+        print(f"{command:<10}{best:>10.1f}{BUDGETS_MS[command]:>8}  {status}")
+
+    server.shutdown()
+    directory.cleanup()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
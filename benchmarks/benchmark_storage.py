@@ -0,0 +1,77 @@
+"""
+Compares selective queries against the embedded database with loading the full CSV and filtering in Python.
+
+Usage (from the repository root):
+    python benchmarks/benchmark_storage.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_model import ElectionDataGroupedModel, ElectionDataGroupedAndFlattenedModel
+from data_storage import DataStore
+
+
+def timed(func, repeat: int = 3) -> float:
+    """Returns the best wall time of several runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    grouped_csv = ["data", "election_data_grouped.csv"]
+    flattened_csv = ["data", "election_data_grouped_and_flattened.csv"]
+    db_path = os.path.join(tempfile.mkdtemp(), "election_data.db")
+
+    grouped = ElectionDataGroupedModel.load_from_csv(grouped_csv)
+    flattened = ElectionDataGroupedAndFlattenedModel.load_from_csv(flattened_csv)
+    grouped.save_to_db(db_path)
+    flattened.save_to_db(db_path)
+
+    cases = [
+        (
+            "grouped: state PA",
+            lambda: [r for r in ElectionDataGroupedModel.load_from_csv(grouped_csv).data if r.state_code == 'PA'],
+            lambda: ElectionDataGroupedModel.load_from_db(db_path, state_code='PA').data,
+        ),
+        (
+            "grouped: 2024 House",
+            lambda: [r for r in ElectionDataGroupedModel.load_from_csv(grouped_csv).data if r.election_year == 2024 and r.election_type == 'H'],
+            lambda: ElectionDataGroupedModel.load_from_db(db_path, election_year=2024, election_type='H').data,
+        ),
+        (
+            "grouped: one county",
+            lambda: [r for r in ElectionDataGroupedModel.load_from_csv(grouped_csv).data if r.state_code == 'PA' and r.county == 'Erie'],
+            lambda: ElectionDataGroupedModel.load_from_db(db_path, state_code='PA', county='Erie').data,
+        ),
+        (
+            "flattened: swing states",
+            lambda: [r for r in ElectionDataGroupedAndFlattenedModel.load_from_csv(flattened_csv).data if r.state_code in ('AZ', 'GA', 'MI', 'NV', 'PA', 'WI', 'NC')],
+            lambda: ElectionDataGroupedAndFlattenedModel.load_from_db(db_path, state_code=['AZ', 'GA', 'MI', 'NV', 'PA', 'WI', 'NC']).data,
+        ),
+    ]
+
+    print(f"{'query':<26}{'rows':>8}{'csv (ms)':>12}{'db (ms)':>12}{'speedup':>10}")
+    for name, csv_func, db_func in cases:
+        rows = len(db_func())
+        if rows != len(csv_func()):
+            raise Exception(f"Row count mismatch for '{name}'")
+        csv_time = timed(csv_func)
+        db_time = timed(db_func)
+        print(f"{name:<26}{rows:>8}{csv_time * 1000:>12.1f}{db_time * 1000:>12.2f}{csv_time / db_time:>9.0f}x")
+
+    with DataStore(db_path) as store:
+        sql = "SELECT state_code, SUM(votes_total) AS votes FROM election_data_grouped WHERE election_year = ? AND election_type = ? GROUP BY state_code"
+        sql_time = timed(lambda: store.query(sql, (2024, 'P')))
+        print(f"{'sql: 2024 P votes/state':<26}{'':>8}{'':>12}{sql_time * 1000:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
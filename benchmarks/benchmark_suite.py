@@ -0,0 +1,148 @@
+"""
+Pipeline benchmark suite on synthetic data. Times each stage at one or more scales, saves the results,
+and flags regressions against a saved baseline. Exits with status 1 when a stage regresses.
+
+Scale is the number of reporting units per state (the real data has ~90 counties per state; thousands
+per state is precinct-like).
+
+Usage (from the repository root):
+    python benchmarks/benchmark_suite.py --units 90,900 --save-baseline
+    python benchmarks/benchmark_suite.py --units 90,900                    # compare with the baseline
+    python benchmarks/benchmark_suite.py --units 20000 --districts 50 --repeat 1
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import List, Dict, Callable, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_model import ElectionDataGroupedModel
+from data_functions import DataFunctions
+from data_analytics import DataAnalytics
+from data_synthetic import SyntheticElectionData
+from data_similarity import StateSimilarity
+
+RESULTS_DIR = ["benchmarks", "results"]
+BASELINE_FILE = "baseline.json"
+LATEST_FILE = "latest.json"
+
+
+def timed(func: Callable[[], Any], repeat: int) -> float:
+    """Returns the best wall time of several runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_scale(units_per_state: int, districts_per_state: int, repeat: int, seed: int) -> Dict[str, Dict[str, float]]:
+    """Times every stage at one scale. Returns {stage: {'seconds': ..., 'rows': ...}}."""
+    full = SyntheticElectionData.generate(units_per_state=units_per_state, districts_per_state=districts_per_state, seed=seed)
+
+    # Each stage feeds the next; keep one output of each for the following stage
+    grouped = DataFunctions.aggregate_full_data_to_grouped(full)
+    csv_path = os.path.join(tempfile.mkdtemp(), "election_data_grouped.csv")
+    grouped.save_to_csv(csv_path)
+    flattened = DataFunctions.flatten_grouped_election_data(grouped)
+    analytics = DataAnalytics(flattened)
+
+    stages = [
+        ('aggregate_full_data_to_grouped', lambda: DataFunctions.aggregate_full_data_to_grouped(full), len(grouped.data)),
+        ('load_from_csv', lambda: ElectionDataGroupedModel.load_from_csv(csv_path), len(grouped.data)),
+        ('to_dataframe', lambda: flattened.to_dataframe(), len(flattened.data)),
+        ('flatten_grouped_election_data', lambda: DataFunctions.flatten_grouped_election_data(grouped), len(flattened.data)),
+        ('DataAnalytics', lambda: DataAnalytics(flattened), len(flattened.data)),
+        ('analyze_presidential_house_ratios_comprehensive', analytics.analyze_presidential_house_ratios_comprehensive, len(flattened.data)),
+        ('analyze_split_ticket_voting_comprehensive', analytics.analyze_split_ticket_voting_comprehensive, len(flattened.data)),
+        ('fit_state_regressions', analytics.fit_state_regressions, len(flattened.data)),
+        ('reporting_threshold_sweep', analytics.reporting_threshold_sweep, len(flattened.data)),
+        # A new StateSimilarity per run, so its cache is not timed
+        ('state_similarity', lambda: analytics.state_similarity(similarity=StateSimilarity()), len(flattened.data)),
+    ]
+    return {name: {'seconds': timed(func, repeat), 'rows': rows} for name, func, rows in stages}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float, min_delta: float) -> List[str]:
+    """
+    Returns the 'scale/stage' keys slower than the baseline by more than threshold (a fraction)
+    and by more than min_delta seconds, so timer noise on very short stages is not flagged.
+    """
+    regressions = []
+    for scale, stages in results['scales'].items():
+        for stage, result in stages.items():
+            base = baseline['scales'].get(scale, {}).get(stage)
+            if base is None:
+                continue
+            delta = result['seconds'] - base['seconds']
+            if delta > base['seconds'] * threshold and delta > min_delta:
+                regressions.append(f"{scale}/{stage}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pipeline benchmark suite on synthetic data')
+    parser.add_argument('--units', default='90,900', help='Comma separated units per state, one run per value')
+    parser.add_argument('--districts', type=int, default=8, help='House districts per state')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--threshold', type=float, default=0.2, help='Slowdown fraction flagged as a regression')
+    parser.add_argument('--min-delta-ms', type=float, default=5, help='Ignore slowdowns smaller than this')
+    parser.add_argument('--save-baseline', action='store_true', help='Save these results as the new baseline')
+    args = parser.parse_args()
+
+    results_dir = os.path.join(*RESULTS_DIR)
+    os.makedirs(results_dir, exist_ok=True)
+    baseline_path = os.path.join(results_dir, BASELINE_FILE)
+    baseline = None
+    if os.path.exists(baseline_path):
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'districts_per_state': args.districts,
+        'scales': {},
+    }
+
+    print(f"{'units/state':>11}  {'stage':<50}{'rows':>10}{'ms':>12}{'baseline':>12}{'change':>9}")
+    for units in [int(u) for u in args.units.split(',')]:
+        scale = f"units={units}"
+        results['scales'][scale] = run_scale(units, args.districts, args.repeat, args.seed)
+        for stage, result in results['scales'][scale].items():
+            base = (baseline or {}).get('scales', {}).get(scale, {}).get(stage)
+            base_ms = f"{base['seconds'] * 1000:.1f}" if base else '-'
+            change = f"{(result['seconds'] / base['seconds'] - 1) * 100:+.0f}%" if base else ''
+            print(f"{units:>11}  {stage:<50}{result['rows']:>10}{result['seconds'] * 1000:>12.1f}{base_ms:>12}{change:>9}")
+
+    with open(os.path.join(results_dir, LATEST_FILE), 'w') as f:
+        json.dump(results, f, indent=4)
+
+    if args.save_baseline:
+        with open(baseline_path, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline saved to {baseline_path}")
+        return
+
+    if baseline is None:
+        print("No baseline to compare with; run with --save-baseline first")
+        return
+
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms / 1000)
+    if regressions:
+        print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("No regressions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Load test for the local analytics service. Starts the service in-process (or targets --url)
+and reports latency percentiles and throughput for concurrent clients.
+
+Usage (from the repository root):
+    python benchmarks/load_test_service.py --clients 16 --seconds 10
+    python benchmarks/load_test_service.py --url http://127.0.0.1:8050
+    python benchmarks/load_test_service.py --warm-start
+
+--warm-start writes the service's warm cache from a separate process first and starts the tested
+service from it, so the run also checks that a warm restart serves what a cold start does (county
+ids are per process). Exits with status 1 when any request fails.
+"""
+import argparse
+import http.client
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_model import ElectionDataMap
+
+
+def build_paths(unique_queries: int, seed: int = 0) -> list[str]:
+    """Builds a mix of parameterized queries; a small set repeats so the cache gets hits."""
+    rng = random.Random(seed)
+    metrics = ['pres_house_ratio_change', 'split_ticket_change', 'pres_house_ratio_2024', 'split_ticket_2024']
+    states = list(ElectionDataMap.election_states.keys())
+    paths = ['/analysis/ratio', '/analysis/split_ticket']
+    while len(paths) < unique_queries:
+        kind = rng.random()
+        if kind < 0.7:
+            paths.append(f'/metric?metric={rng.choice(metrics)}&state={rng.choice(states)}&top_k={rng.choice([3, 5, 10])}')
+        else:
+            swing = ','.join(sorted(rng.sample(states, 7)))
+            paths.append(f'/analysis/{rng.choice(["ratio", "split_ticket"])}?swing={swing}')
+    return paths
+
+
+def run_client(host: str, port: int, paths: list[str], deadline: float, latencies: list, errors: list, seed: int) -> None:
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    while time.perf_counter() < deadline:
+        path = rng.choice(paths)
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except Exception as ex:
+            errors.append(str(ex))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test for data_service')
+    parser.add_argument('--url', default=None, help='Target an already running service instead of starting one')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--unique-queries', type=int, default=200)
+    parser.add_argument('--warm-start', action='store_true', help='Start from a warm cache written by another process')
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port
+    else:
+        from data_service import AnalyticsService
+        data_path = ['data', 'election_data_grouped_and_flattened.csv']
+        warm_cache_dir = tempfile.mkdtemp() if args.warm_start else None
+        if warm_cache_dir:
+            # The cache must come from another process, whose county registry assigned the ids
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            subprocess.run([sys.executable, '-c', f"from data_service import AnalyticsService; AnalyticsService({data_path!r}, warm_cache_dir={warm_cache_dir!r})"],
+                           cwd=root, check=True)
+        start = time.perf_counter()
+        service = AnalyticsService(data_path, warm_cache_dir=warm_cache_dir)
+        print(f"Startup ({'warm, cache from another process' if warm_cache_dir else 'load'} + precompute): {time.perf_counter() - start:.2f}s")
+        server = service.make_server('127.0.0.1', 0)
+        host, port = server.server_address
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    paths = build_paths(args.unique_queries)
+    latencies, errors = [], []
+    deadline = time.perf_counter() + args.seconds
+    threads = [
+        threading.Thread(target=run_client, args=(host, port, paths, deadline, latencies, errors, i))
+        for i in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+    latencies.sort()
+    def pct(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else float('nan')
+
+    print(f"clients={args.clients} requests={len(latencies)} errors={len(errors)} elapsed={elapsed:.1f}s")
+    print(f"throughput: {len(latencies) / elapsed:.0f} req/s")
+    print(f"latency ms: p50={pct(0.5):.2f} p95={pct(0.95):.2f} p99={pct(0.99):.2f} max={pct(1.0):.2f}")
+    if errors:
+        print(f"errors: {sorted(set(map(str, errors)))}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+"""
+Command line entry point for the election data pipeline.
+
+Each command imports only the modules it needs, on first use, so a command that only reads
+a CSV does not pay for pandas, matplotlib or requests.
+
+With --validate, fetch, aggregate and flatten run DataValidator on the data they produce and stop
+on error-level violations (warnings are printed). It is opt-in because the validator needs pandas
+and numpy, which these commands otherwise never load.
+
+Usage:
+    python cli.py [--report report.json] [--trace trace.json] [--no-memory] [--validate] <command> ...
+    python cli.py fetch      [--map data/election_year_state_county_district_map.json] [--output data/election_data_full.json] [--refresh-map] [--timeline data/election_timeline.bin] [--journal data/election_crawl.jsonl | --grouped-only data/election_data_grouped.csv [--full-jsonl full.jsonl]] [--base-url http://127.0.0.1:8060]
+    python cli.py aggregate  [--input data/election_data_full.json] [--output data/election_data_grouped.csv]
+    python cli.py flatten    [--input data/election_data_grouped.csv] [--output data/election_data_grouped_and_flattened.csv]
+    python cli.py analyze    [--input data/election_data_grouped_and_flattened.csv] [--analysis ratio|split_ticket] [--top-k 5] [--crosswalk data/county_crosswalk.csv] [--output out.csv]
+    python cli.py join       --table county_table.csv [--input data/election_data_grouped_and_flattened.csv] [--state-column state_code] [--county-column county] [--output joined.csv]
+    python cli.py render     [--input data/election_data_grouped_and_flattened.csv] [--output-dir images]
+"""
+import argparse
+import importlib
+import os
+import sys
+from typing import List, Dict, Optional, Callable, Any
+
+from data_instrumentation import Instrumentation
+
+# Modules each command needs; imported lazily by import_command
+COMMAND_MODULES: Dict[str, List[str]] = {
+    'fetch': ['data_functions'],
+    'aggregate': ['data_functions'],
+    'flatten': ['data_functions'],
+    'analyze': ['data_analytics'],
+    'join': ['data_analytics'],
+    'render': ['data_analytics', 'data_rendering'],
+}
+
+DEFAULT_PATHS: Dict[str, str] = {
+    'map': os.path.join('data', 'election_year_state_county_district_map.json'),
+    'full': os.path.join('data', 'election_data_full.json'),
+    'grouped': os.path.join('data', 'election_data_grouped.csv'),
+    'flattened': os.path.join('data', 'election_data_grouped_and_flattened.csv'),
+}
+
+
+def import_command(command: str) -> Dict[str, object]:
+    """Imports the modules of a command and returns them by name."""
+    return {name: importlib.import_module(name) for name in COMMAND_MODULES[command]}
+
+
+def validate(args: argparse.Namespace, check: Callable[[Any], Any], outcome: str = 'nothing was saved') -> None:
+    """Runs a validation stage, check(DataValidator) -> ValidationReport, with --validate. Exits on errors."""
+    if not args.validate:
+        return
+    from data_validation import DataValidator
+    report = check(DataValidator)
+    if len(report.violations):
+        print(report.summary().to_string(index=False))
+    if not report.ok:
+        sys.exit(f"Data validation failed; {outcome}")
+
+
+def fetch(args: argparse.Namespace) -> None:
+    modules = import_command('fetch')
+    data_functions = modules['data_functions']
+    ElectionDataMap = data_functions.ElectionDataMap
+    if args.base_url:
+        data_functions.DataFunctions.set_base_url(args.base_url)
+
+    if args.refresh_map or not os.path.exists(args.map):
+        data_map = data_functions.DataFunctions.get_election_year_state_district_county_map(
+            ElectionDataMap.election_years, ElectionDataMap.election_states.keys())
+        data_map.save_to_json(args.map)
+    else:
+        data_map = data_functions.ElectionYearStateCountyDistrictMap.load_from_json(args.map)
+
+    if args.grouped_only:
+        # Routine refresh: no full data model, so no fingerprint or timeline either
+        from data_streaming import StreamingPipeline
+        grouped = StreamingPipeline.fetch_grouped(ElectionDataMap.election_types.keys(), data_map, grouped_csv=args.grouped_only, full_jsonl=args.full_jsonl)
+        # Rows are written as they arrive, so here a failed validation can only flag the output
+        validate(args, lambda validator: validator.validate_grouped(grouped, data_map), f"{args.grouped_only} holds invalid rows")
+        return
+
+    if args.journal:
+        # Resumable crawl: rerunning with the same journal only fetches what is not done yet
+        from data_crawl import CrawlJob
+        job = CrawlJob(data_map, ElectionDataMap.election_types.keys(), args.journal)
+        summary = job.run()
+        print(f"Crawl: {summary['done']} done, {summary['pending']} pending, {summary['failed']} failed of {summary['total']} tasks")
+        if summary['done'] != summary['total']:
+            for key, error in summary['failures'].items():
+                print(f"    {key}: {error}")
+            sys.exit(f"Crawl incomplete; run again with --journal {args.journal} to retry")
+        election_data = job.result()
+    else:
+        election_data = data_functions.DataFunctions.get_all_election_data(ElectionDataMap.election_types.keys(), data_map)
+    # Save before validating so a failed check does not throw the fetched data away
+    election_data.save_to_json(args.output)
+    validate(args, lambda validator: validator.validate_full(election_data), f"{args.output} holds invalid data")
+
+    # Keep a fingerprint next to the output and report what changed since the previous fetch
+    from data_fingerprint import ElectionDataFingerprint
+    fingerprint_path = ElectionDataFingerprint.path_for(args.output)
+    fingerprint = ElectionDataFingerprint.of(election_data)
+    if os.path.exists(fingerprint_path):
+        diff = fingerprint.diff(ElectionDataFingerprint.load_from_json(fingerprint_path))
+        print(f"Changed since the previous fetch: {len(diff.counties())} counties "
+              f"({len(diff.added)} added, {len(diff.removed)} removed, {len(diff.modified)} modified keys)")
+    fingerprint.save_to_json(fingerprint_path)
+
+    if args.timeline:
+        from data_timeline import TimelineStore
+        changed = TimelineStore(args.timeline).append(election_data)
+        print(f"Appended snapshot to {args.timeline} ({changed} changed series)")
+
+
+def aggregate(args: argparse.Namespace) -> None:
+    data_functions = import_command('aggregate')['data_functions']
+    election_data = data_functions.ElectionDataFullModel.load_from_json(args.input)
+    grouped = data_functions.DataFunctions.aggregate_full_data_to_grouped(election_data)
+    validate(args, lambda validator: validator.validate_full(election_data) + validator.validate_grouped(grouped))
+    grouped.save_to_csv(args.output)
+
+
+def flatten(args: argparse.Namespace) -> None:
+    data_functions = import_command('flatten')['data_functions']
+    grouped = data_functions.ElectionDataGroupedModel.load_from_csv(args.input)
+    flattened = data_functions.DataFunctions.flatten_grouped_election_data(grouped)
+    validate(args, lambda validator: validator.validate_flattened(flattened))
+    flattened.save_to_csv(args.output)
+
+
+def analyze(args: argparse.Namespace) -> None:
+    data_analytics = import_command('analyze')['data_analytics']
+    flattened = data_analytics.ElectionDataGroupedAndFlattenedModel.load_from_csv(args.input)
+    analytics = data_analytics.DataAnalytics(flattened)
+    if args.crosswalk:
+        from data_crosswalk import CountyCrosswalk
+        analytics = analytics.on_common_geography(CountyCrosswalk.load(args.crosswalk))
+    swing_states = args.swing.split(',') if args.swing else None
+
+    if args.analysis == 'ratio':
+        result = analytics.analyze_presidential_house_ratios_comprehensive(swing_states=swing_states, top_k=args.top_k)
+    else:
+        result = analytics.analyze_split_ticket_voting_comprehensive(swing_states=swing_states, top_k=args.top_k)
+
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"Data saved to {args.output}")
+    else:
+        print(result.to_string())
+
+
+def join(args: argparse.Namespace) -> None:
+    data_analytics = import_command('join')['data_analytics']
+    flattened = data_analytics.ElectionDataGroupedAndFlattenedModel.load_from_csv(args.input)
+    analytics = data_analytics.DataAnalytics(flattened)
+    result = analytics.join_county_table(args.table, state_column=args.state_column, county_column=args.county_column)
+
+    counts = result.matches['method'].value_counts()
+    print(f"Matched {counts.get('exact', 0)} names exactly and {counts.get('fuzzy', 0)} by similarity; "
+          f"{counts.get('ambiguous', 0)} ambiguous, {counts.get('unmatched', 0)} unmatched")
+    for _, row in result.ambiguous.iterrows():
+        print(f"    ambiguous {row['state_code']} {row['name']}: {row['candidates']}")
+    for _, row in result.unmatched.iterrows():
+        print(f"    unmatched {row['state_code']} {row['name']}")
+
+    if args.output:
+        result.joined.to_csv(args.output, index=False)
+        print(f"Data saved to {args.output}")
+
+
+def render(args: argparse.Namespace) -> None:
+    modules = import_command('render')
+    data_analytics, data_rendering = modules['data_analytics'], modules['data_rendering']
+    flattened = data_analytics.ElectionDataGroupedAndFlattenedModel.load_from_csv(args.input)
+    analytics = data_analytics.DataAnalytics(flattened)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    ratio_analysis = analytics.analyze_presidential_house_ratios_comprehensive()
+    split_ticket_analysis = analytics.analyze_split_ticket_voting_comprehensive()
+
+    charts = data_rendering.ComparisonChartRenderer(figsize=(5, 5))
+    charts.render(data_rendering.ComparisonChartSpec(
+        non_swing_2020=ratio_analysis["avg_ratio_2020"][2],
+        non_swing_2024=ratio_analysis["avg_ratio_2024"][2],
+        swing_2020=ratio_analysis["avg_ratio_2020"][1],
+        swing_2024=ratio_analysis["avg_ratio_2024"][1],
+        title='Average Presidential-to-House Vote Ratio',
+        y_bounds=(75, 125),
+        save_path=os.path.join(args.output_dir, 'ratio_analysis.png')
+    ))
+    charts.render(data_rendering.ComparisonChartSpec(
+        non_swing_2020=split_ticket_analysis["avg_split_ticket_2020"][2] * 0.01,
+        non_swing_2024=split_ticket_analysis["avg_split_ticket_2024"][2] * 0.01,
+        swing_2020=split_ticket_analysis["avg_split_ticket_2020"][1] * 0.01,
+        swing_2024=split_ticket_analysis["avg_split_ticket_2024"][1] * 0.01,
+        title='Average Split-Ticket Voting Percent (Estimate)',
+        save_path=os.path.join(args.output_dir, 'split_ticket_analysis.png')
+    ))
+
+    tables = data_rendering.TableImageRenderer(cache_dir=args.table_cache)
+    tables.export_many({
+        os.path.join(args.output_dir, 'ratio_analysis_data.png'): ratio_analysis,
+        os.path.join(args.output_dir, 'split_ticket_analysis_data.png'): split_ticket_analysis,
+    })
+    print(f"Images saved to {args.output_dir}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Election data pipeline')
+    parser.add_argument('--report', default=None, help='Write a JSON stage/HTTP instrumentation report')
+    parser.add_argument('--trace', default=None, help='Write a trace-event JSON file for a trace viewer')
+    parser.add_argument('--no-memory', action='store_true', help='Skip tracemalloc peak memory when instrumenting')
+    parser.add_argument('--validate', action='store_true', help='Validate the data produced by fetch, aggregate and flatten (loads pandas)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('fetch', help='Fetch full election data from the CNN API')
+    p.add_argument('--map', default=DEFAULT_PATHS['map'])
+    p.add_argument('--output', default=DEFAULT_PATHS['full'])
+    p.add_argument('--refresh-map', action='store_true', help='Re-fetch the county/district map')
+    p.add_argument('--timeline', default=None, help='Also append the fetched counts to this timeline file')
+    mode = p.add_mutually_exclusive_group()
+    mode.add_argument('--journal', default=None, help='Crawl through a resumable journal file (e.g. data/election_crawl.jsonl)')
+    mode.add_argument('--grouped-only', default=None, metavar='GROUPED_CSV', help='Fold responses straight into this grouped CSV without building the full data')
+    p.add_argument('--full-jsonl', default=None, help='With --grouped-only, also keep the full data as JSONL')
+    p.add_argument('--base-url', default=None, help='Results API root, e.g. a local data_results_server.py (default: RESULTS_BASE_URL or the CNN API)')
+    p.set_defaults(func=fetch)
+
+    p = commands.add_parser('aggregate', help='Aggregate full data to grouped CSV')
+    p.add_argument('--input', default=DEFAULT_PATHS['full'])
+    p.add_argument('--output', default=DEFAULT_PATHS['grouped'])
+    p.set_defaults(func=aggregate)
+
+    p = commands.add_parser('flatten', help='Flatten grouped CSV to one row per county')
+    p.add_argument('--input', default=DEFAULT_PATHS['grouped'])
+    p.add_argument('--output', default=DEFAULT_PATHS['flattened'])
+    p.set_defaults(func=flatten)
+
+    p = commands.add_parser('analyze', help='Run a comprehensive analysis')
+    p.add_argument('--input', default=DEFAULT_PATHS['flattened'])
+    p.add_argument('--analysis', choices=['ratio', 'split_ticket'], default='ratio')
+    p.add_argument('--swing', default=None, help='Comma separated swing states, e.g. AZ,GA,MI')
+    p.add_argument('--top-k', type=int, default=5)
+    p.add_argument('--crosswalk', default=None, help='Align units across years with an apportionment table (e.g. data/county_crosswalk.csv)')
+    p.add_argument('--output', default=None, help='CSV file to write instead of printing')
+    p.set_defaults(func=analyze)
+
+    p = commands.add_parser('join', help='Join a county table from another source by county name')
+    p.add_argument('--table', required=True, help='CSV with a state and a county name column')
+    p.add_argument('--input', default=DEFAULT_PATHS['flattened'])
+    p.add_argument('--state-column', default='state_code', help='State code or name column of the table')
+    p.add_argument('--county-column', default='county', help='County name column of the table')
+    p.add_argument('--output', default=None, help='CSV file to write the joined data to')
+    p.set_defaults(func=join)
+
+    p = commands.add_parser('render', help='Render the README charts and tables')
+    p.add_argument('--input', default=DEFAULT_PATHS['flattened'])
+    p.add_argument('--output-dir', default='images')
+    p.add_argument('--table-cache', default='.table_cache')
+    p.set_defaults(func=render)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    if not (args.report or args.trace):
+        args.func(args)
+        return
+
+    Instrumentation.enable(trace_memory=not args.no_memory)
+    try:
+        with Instrumentation.stage(f'cli.{args.command}'):
+            args.func(args)
+    finally:
+        Instrumentation.disable()
+        if args.report:
+            Instrumentation.save_report(args.report)
+        if args.trace:
+            Instrumentation.save_trace(args.trace)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
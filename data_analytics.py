@@ -1,19 +1,161 @@
-import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 import os
+import re
 
-from typing import List, Dict, Optional, Tuple, Union
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Union, TYPE_CHECKING
 from data_model import ElectionDataGroupedAndFlattenedModel
+from data_registry import CountyRegistry
+from data_instrumentation import Instrumentation, instrumented
+
+if TYPE_CHECKING:
+    from data_shared import AnalyticsWorkerPool
+    from data_sketches import MetricQuantiles
+    from data_crosswalk import CountyCrosswalk
+    from data_matching import CountyNameIndex, CountyJoinResult
+    from data_similarity import StateSimilarity, StateDistances
+
+
+@dataclass
+class StateRegressionResult:
+    """
+    Per-state regressions of DataAnalytics.fit_state_regressions, one model per (metric, state).
+    models has n, k, rank, r2 and sigma per model; coefficients has coef, std_err and t_value per
+    model term; residuals has fitted, residual and studentized per county and metric, indexed by
+    (metric, DataAnalytics.df index label).
+    """
+    models: pd.DataFrame
+    coefficients: pd.DataFrame
+    residuals: pd.DataFrame
+
+    def anomalies(self, threshold: float = 3.0, metric: Optional[str] = None) -> pd.DataFrame:
+        """Counties whose studentized residual is at least threshold in absolute value, largest first."""
+        residuals = self.residuals if metric is None else self.residuals[self.residuals['metric'] == metric]
+        flagged = residuals[residuals['studentized'].abs() >= threshold]
+        return flagged.iloc[np.argsort(-flagged['studentized'].abs().to_numpy(), kind='stable')]
+
 
 class DataAnalytics:
     SWING_STATES = [
         'AZ', 'GA', 'MI', 'NV', 'PA', 'WI', 'NC'
     ]
 
+    # Default per-state models: metric -> covariates. Besides df columns, covariates can be
+    # log_<column> and <pres|house>_<dem|rep>_share_<year> (party share of the race's total votes).
+    REGRESSION_MODELS: Dict[str, List[str]] = {
+        'pres_house_ratio_change': ['pres_house_ratio_2020', 'log_pres_total_votes_2020', 'pres_dem_share_2020'],
+        'split_ticket_change': ['split_ticket_2020', 'log_pres_total_votes_2020', 'pres_dem_share_2020'],
+    }
+
     def __init__(self, data: ElectionDataGroupedAndFlattenedModel):
-        self.df = data.to_dataframe()
-        self._calculate_all_metrics(self.df)
+        self._prepare(data.to_dataframe())
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'DataAnalytics':
+        """
+        Creates the analytics from a frame with the flattened model's columns (at least state_code,
+        county and the pres/house vote columns), e.g. from CountyAccumulator.to_dataframe. county_id
+        is recomputed from state_code and county: ids are only valid in the process that assigned
+        them, and the frame may come from elsewhere (e.g. a pickle written by another process).
+        """
+        analytics = cls.__new__(cls)
+        df = df.copy()
+        df['county_id'] = CountyRegistry.default().get_ids(df['state_code'].tolist(), df['county'].tolist())
+        analytics._prepare(df)
+        return analytics
+
+    def _prepare(self, df: pd.DataFrame) -> None:
+        with Instrumentation.stage('analytics.prepare') as stage:
+            self.df = df
+            self.registry = CountyRegistry.default()
+            self.df['state_id'] = self.registry.county_state_ids[self.df['county_id'].to_numpy()]
+            self._calculate_all_metrics(self.df)
+            stage.rows = len(self.df)
+
+    def worker_pool(self, processes: Optional[int] = None, columns: Optional[List[str]] = None, start_method: Optional[str] = None) -> 'AnalyticsWorkerPool':
+        """
+        Returns a process pool for per-state or per-resample tasks over the numeric columns of df
+        (inputs and derived metrics, or the given columns). The columns are copied once into shared
+        memory and workers attach to it by name instead of receiving a pickled frame; the shared
+        memory is released when the pool is closed. See data_shared.AnalyticsWorkerPool.
+        """
+        from data_shared import SharedColumnStore, AnalyticsWorkerPool
+        store = SharedColumnStore.create(self.df, columns)
+        try:
+            return AnalyticsWorkerPool(store, processes, owns_store=True, start_method=start_method)
+        except Exception:
+            store.close()
+            raise
+
+    def metric_quantiles(self, sketches: Optional['MetricQuantiles'] = None) -> 'MetricQuantiles':
+        """
+        Returns per-state quantile sketches of the metrics, mergeable to groups and nationwide. Pass the
+        sketches of the previous poll to update them in place; only states with changed counties are
+        rebuilt. See data_sketches.MetricQuantiles.
+        """
+        from data_sketches import MetricQuantiles
+        sketches = sketches if sketches is not None else MetricQuantiles(registry=self.registry)
+        sketches.update(self.df)
+        return sketches
+
+    def state_similarity(self, metrics: Optional[List[str]] = None, similarity: Optional['StateSimilarity'] = None) -> 'StateDistances':
+        """
+        Returns the pairwise KS, Wasserstein and mean-shift distances between the states' county
+        distributions of the metrics, e.g. to check whether the swing states stand out. Pass a
+        StateSimilarity to reuse its cache across calls. See data_similarity.StateSimilarity.
+        """
+        from data_similarity import StateSimilarity
+        similarity = similarity if similarity is not None else StateSimilarity()
+        return similarity.compute(self.df, metrics)
+
+    def projected_intervals(
+        self,
+        draws: int = 10000,
+        metrics: Optional[List[str]] = None,
+        quantiles: Optional[List[float]] = None,
+        memory_mb: float = 256,
+        **model
+    ) -> pd.DataFrame:
+        """
+        Per-county intervals of the metrics once partially reported races are projected to final counts,
+        by Monte Carlo over the outstanding vote. model takes turnout_sigma, shift_sigma and seed.
+        See data_projection.FinalCountProjection.
+        """
+        from data_projection import FinalCountProjection
+        return FinalCountProjection(self.df, **model).simulate(draws, metrics, quantiles, memory_mb)
+
+    def on_common_geography(self, crosswalk: Optional['CountyCrosswalk'] = None) -> 'DataAnalytics':
+        """
+        Returns the analytics over units aligned across years by a crosswalk (default: the local
+        apportionment table, data/county_crosswalk.csv), so units split, merged or renamed between
+        cycles keep their year-over-year metrics. See data_crosswalk.CountyCrosswalk.
+        """
+        from data_crosswalk import CountyCrosswalk
+        crosswalk = crosswalk if crosswalk is not None else CountyCrosswalk.load(registry=self.registry)
+        return DataAnalytics.from_dataframe(crosswalk.apply(self.df))
+
+    def join_county_table(
+        self,
+        table: Union[pd.DataFrame, str, List[str]],
+        state_column: str = 'state_code',
+        county_column: str = 'county',
+        columns: Optional[List[str]] = None,
+        index: Optional['CountyNameIndex'] = None
+    ) -> 'CountyJoinResult':
+        """
+        Joins a county-level table from another source (a frame or CSV path, e.g. demographics) to
+        the flattened data, matching its county names to ours (see data_matching.CountyNameIndex).
+        The result's joined frame has one row per county of self.df; its unmatched and ambiguous
+        frames list the table names that could not be resolved.
+        """
+        from data_matching import CountyNameIndex
+        index = index if index is not None else CountyNameIndex.from_dataframe(self.df, registry=self.registry)
+        return index.join(self.df, table, state_column=state_column, county_column=county_column, columns=columns)
+
+    def _state_mask(self, df: pd.DataFrame, states: List[str]) -> np.ndarray:
+        """Boolean mask of the rows in any of the states, tested on integer state ids."""
+        return np.isin(df['state_id'].to_numpy(), self.registry.state_ids(states))
     
     @staticmethod
     def _reorder_comprehensive_analysis_columns(df: pd.DataFrame) -> pd.DataFrame:
@@ -22,12 +164,15 @@ class DataAnalytics:
         other_cols = [col for col in df.columns if col not in first_cols]
         return df[first_cols + other_cols]
 
-    def analyze_presidential_house_ratios_comprehensive(self) -> pd.DataFrame:
+    @instrumented('analytics.ratios')
+    def analyze_presidential_house_ratios_comprehensive(self, swing_states: Optional[List[str]] = None, top_k: int = 5) -> pd.DataFrame:
         """
         Creates a comprehensive analysis of presidential to house vote ratios,
         including nationwide, swing states, and per-state anomalies.
         Separates increases and decreases in ratios.
+        swing_states overrides SWING_STATES and top_k sets the number of nationwide increases/decreases.
         """
+        swing_states = swing_states if swing_states is not None else self.SWING_STATES
         # Create a clean working copy with finite values only
         working_df = self.df.copy()
         working_df = working_df[
@@ -68,22 +213,23 @@ class DataAnalytics:
         results.append(nationwide)
         
         # 2. Swing States aggregate
-        swing_df = working_df[working_df['state_code'].isin(self.SWING_STATES)]
+        swing_mask = self._state_mask(working_df, swing_states)
+        swing_df = working_df[swing_mask]
         swing_stats = format_ratio_metrics(swing_df)
         swing_stats['category'] = 'Swing States Aggregate'
         swing_stats['state_code'] = 'SWING'
         results.append(swing_stats)
         
         # 3. Non-Swing States aggregate
-        nonswing_df = working_df[~working_df['state_code'].isin(self.SWING_STATES)]
+        nonswing_df = working_df[~swing_mask]
         nonswing_stats = format_ratio_metrics(nonswing_df)
         nonswing_stats['category'] = 'Non-Swing States Aggregate'
         nonswing_stats['state_code'] = 'NON-SWING'
         results.append(nonswing_stats)
         
         # 4. Largest increases per swing state
-        for state in self.SWING_STATES:
-            state_df = working_df[working_df['state_code'] == state]
+        for state in swing_states:
+            state_df = working_df[working_df['state_id'].to_numpy() == self.registry.state_id(state)]
             if len(state_df) > 0:
                 top_3 = state_df.nlargest(3, 'pres_house_ratio_change')
                 
@@ -98,11 +244,11 @@ class DataAnalytics:
                         'avg_ratio_change': row['pres_house_ratio_change']
                     }))
         
-        # 5. Top 5 increases nationwide
-        top_5_increases = working_df.nlargest(5, 'pres_house_ratio_change')
-        for _, row in top_5_increases.iterrows():
+        # 5. Top k increases nationwide
+        top_increases = working_df.nlargest(top_k, 'pres_house_ratio_change')
+        for _, row in top_increases.iterrows():
             results.append(pd.Series({
-                'category': 'Top 5 Increase - Nationwide',
+                'category': f'Top {top_k} Increase - Nationwide',
                 'state_code': row['state_code'],
                 'county_count': 1,
                 'county': row['county'],
@@ -111,11 +257,11 @@ class DataAnalytics:
                 'avg_ratio_change': row['pres_house_ratio_change']
             }))
         
-        # 6. Top 5 decreases nationwide
-        top_5_decreases = working_df.nsmallest(5, 'pres_house_ratio_change')
-        for _, row in top_5_decreases.iterrows():
+        # 6. Top k decreases nationwide
+        top_decreases = working_df.nsmallest(top_k, 'pres_house_ratio_change')
+        for _, row in top_decreases.iterrows():
             results.append(pd.Series({
-                'category': 'Top 5 Decrease - Nationwide',
+                'category': f'Top {top_k} Decrease - Nationwide',
                 'state_code': row['state_code'],
                 'county_count': 1,
                 'county': row['county'],
@@ -127,11 +273,14 @@ class DataAnalytics:
         results_df = pd.DataFrame(results)
         return self._reorder_comprehensive_analysis_columns(results_df)
 
-    def analyze_split_ticket_voting_comprehensive(self) -> pd.DataFrame:
+    @instrumented('analytics.split_ticket')
+    def analyze_split_ticket_voting_comprehensive(self, swing_states: Optional[List[str]] = None, top_k: int = 5) -> pd.DataFrame:
         """
         Creates a comprehensive analysis of split-ticket voting patterns,
         including nationwide, swing states, and separated increases/decreases.
+        swing_states overrides SWING_STATES and top_k sets the number of nationwide increases/decreases.
         """
+        swing_states = swing_states if swing_states is not None else self.SWING_STATES
         # Create a clean working copy excluding NaN values
         working_df = self.df.copy()
         working_df = working_df[
@@ -172,22 +321,23 @@ class DataAnalytics:
         results.append(nationwide)
         
         # 2. Swing States aggregate
-        swing_df = working_df[working_df['state_code'].isin(self.SWING_STATES)]
+        swing_mask = self._state_mask(working_df, swing_states)
+        swing_df = working_df[swing_mask]
         swing_stats = format_split_ticket_metrics(swing_df)
         swing_stats['category'] = 'Swing States Aggregate'
         swing_stats['state_code'] = 'SWING'
         results.append(swing_stats)
         
         # 3. Non-Swing States aggregate
-        nonswing_df = working_df[~working_df['state_code'].isin(self.SWING_STATES)]
+        nonswing_df = working_df[~swing_mask]
         nonswing_stats = format_split_ticket_metrics(nonswing_df)
         nonswing_stats['category'] = 'Non-Swing States Aggregate'
         nonswing_stats['state_code'] = 'NON-SWING'
         results.append(nonswing_stats)
         
         # 4. Largest increases per swing state
-        for state in self.SWING_STATES:
-            state_df = working_df[working_df['state_code'] == state]
+        for state in swing_states:
+            state_df = working_df[working_df['state_id'].to_numpy() == self.registry.state_id(state)]
             if len(state_df) > 0:
                 top_3 = state_df.nlargest(3, 'split_ticket_change')
                 
@@ -202,11 +352,11 @@ class DataAnalytics:
                         'avg_split_ticket_change': row['split_ticket_change']
                     }))
         
-        # 5. Top 5 increases nationwide
-        top_5_increases = working_df.nlargest(5, 'split_ticket_change')
-        for _, row in top_5_increases.iterrows():
+        # 5. Top k increases nationwide
+        top_increases = working_df.nlargest(top_k, 'split_ticket_change')
+        for _, row in top_increases.iterrows():
             results.append(pd.Series({
-                'category': 'Top 5 Increase - Nationwide',
+                'category': f'Top {top_k} Increase - Nationwide',
                 'state_code': row['state_code'],
                 'county_count': 1,
                 'county': row['county'],
@@ -215,11 +365,11 @@ class DataAnalytics:
                 'avg_split_ticket_change': row['split_ticket_change']
             }))
         
-        # 6. Top 5 decreases nationwide
-        top_5_decreases = working_df.nsmallest(5, 'split_ticket_change')
-        for _, row in top_5_decreases.iterrows():
+        # 6. Top k decreases nationwide
+        top_decreases = working_df.nsmallest(top_k, 'split_ticket_change')
+        for _, row in top_decreases.iterrows():
             results.append(pd.Series({
-                'category': 'Top 5 Decrease - Nationwide',
+                'category': f'Top {top_k} Decrease - Nationwide',
                 'state_code': row['state_code'],
                 'county_count': 1,
                 'county': row['county'],
@@ -231,14 +381,204 @@ class DataAnalytics:
         results_df = pd.DataFrame(results)
         return self._reorder_comprehensive_analysis_columns(results_df)
 
+    @instrumented('analytics.threshold_sweep')
+    def reporting_threshold_sweep(
+        self,
+        metrics: Optional[List[str]] = None,
+        swing_states: Optional[List[str]] = None,
+        reporting_columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Swing vs non-swing summary of metrics at every distinct reporting-completeness cutoff.
+        A county's completeness is the lowest pct_reported of its reporting_columns (default: the
+        pres and house races of both years, missing counted as 0); at cutoff t the counties with
+        completeness >= t and a finite metric are included, as in the comprehensive analyses.
+        Counties are sorted once and every cutoff is read off cumulative sums.
+        Returns one row per metric and cutoff with the count, mean and std of all, swing and
+        non-swing counties and delta (swing mean - non-swing mean).
+
+        Example:
+            sweep = analytics.reporting_threshold_sweep(['pres_house_ratio_change'])
+            sweep.plot(x='threshold', y='delta')
+        """
+        metrics = metrics or ['pres_house_ratio_change', 'split_ticket_change']
+        swing_states = swing_states if swing_states is not None else self.SWING_STATES
+        reporting_columns = reporting_columns or [
+            f'{race}_pct_reported_{year}' for year in ('2024', '2020') for race in ('pres', 'house')
+        ]
+
+        reported = np.column_stack([self.df[c].to_numpy(dtype=np.float64, na_value=np.nan) for c in reporting_columns])
+        completeness = np.nan_to_num(reported, nan=0.0).min(axis=1)
+        # Most complete first, so the counties passing any cutoff are a prefix of the order
+        order = np.argsort(-completeness, kind='stable')
+        completeness = completeness[order]
+        thresholds = np.unique(completeness)
+        included = np.searchsorted(-completeness, -thresholds, side='right')
+        swing = self._state_mask(self.df, swing_states)[order]
+
+        results = []
+        for metric in metrics:
+            values = self.df[metric].to_numpy(dtype=np.float64)[order]
+            finite = np.isfinite(values)
+            frame = {'metric': metric, 'threshold': thresholds}
+            means = {}
+            for group, mask in (('all', finite), ('swing', finite & swing), ('nonswing', finite & ~swing)):
+                # Sums of values centred on the group mean keep the variance from cancelling out
+                centre = values[mask].mean() if mask.any() else 0.0
+                x = np.where(mask, values - centre, 0.0)
+                count = np.concatenate([[0], np.cumsum(mask)])[included]
+                sum_x = np.concatenate([[0.0], np.cumsum(x)])[included]
+                sum_xx = np.concatenate([[0.0], np.cumsum(x * x)])[included]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    mean = np.where(count > 0, sum_x / count, np.nan)
+                    variance = np.where(count > 1, (sum_xx - count * mean * mean) / (count - 1), np.nan)
+                means[group] = mean + centre
+                frame[f'{group}_count'] = count
+                frame[f'{group}_mean'] = means[group]
+                frame[f'{group}_std'] = np.sqrt(np.maximum(variance, 0.0))
+            frame['delta'] = means['swing'] - means['nonswing']
+            results.append(pd.DataFrame(frame))
+        return pd.concat(results, ignore_index=True)
+
+    def _covariate(self, name: str) -> np.ndarray:
+        """Values of a regression covariate: a df column, log_<covariate> or a party vote share."""
+        if name in self.df.columns:
+            return self.df[name].to_numpy(dtype=np.float64)
+        if name.startswith('log_'):
+            base = self._covariate(name[len('log_'):])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(base > 0, np.log(base), np.nan)
+        match = re.fullmatch(r'(pres|house)_(dem|rep)_share_(\d{4})', name)
+        if match:
+            race, party, year = match.groups()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return self._covariate(f'{race}_total_votes_{party}_{year}') / self._covariate(f'{race}_total_votes_{year}')
+        raise Exception(f"Unknown regression covariate '{name}'")
+
+    @instrumented('analytics.state_regressions')
+    def fit_state_regressions(
+        self,
+        models: Optional[Dict[str, List[str]]] = None,
+        weights: Optional[str] = None,
+        states: Optional[List[str]] = None
+    ) -> StateRegressionResult:
+        """
+        Fits one OLS model per state and metric (models maps metric -> covariates, default
+        REGRESSION_MODELS; an intercept is always added), or WLS with the given weights covariate
+        (e.g. 'pres_total_votes_2024'). Counties with a missing or non-finite value are left out of
+        that metric's models.
+
+        All models are fitted at once: rows of every metric are stacked with a (metric, state) group
+        index, the per-group normal equations X'WX and X'Wy are summed with one reduceat, and the
+        stacked systems are solved with a batched pseudo-inverse, so rank-deficient states (fewer
+        counties than terms, or a constant covariate) get minimum-norm coefficients instead of failing.
+
+        Studentized residuals, residual / (sigma * sqrt(1 - leverage)), are comparable across states
+        and serve as an anomaly signal; see StateRegressionResult.anomalies.
+        """
+        models = models if models is not None else self.REGRESSION_MODELS
+        metrics = list(models.keys())
+        terms = [['const'] + list(models[metric]) for metric in metrics]
+        k = max(len(t) for t in terms)
+        n_states = len(self.registry.states)
+
+        state_ids = self.df['state_id'].to_numpy()
+        w_all = np.ones(len(self.df)) if weights is None else self._covariate(weights)
+        selected = np.ones(len(self.df), dtype=bool) if states is None else np.isin(state_ids, self.registry.state_ids(states))
+
+        # Stack the usable rows of every metric; unused trailing terms stay zero and get zero coefficients
+        X_parts, y_parts, w_parts, group_parts, row_parts = [], [], [], [], []
+        for m, metric in enumerate(metrics):
+            X = np.zeros((len(self.df), k))
+            X[:, 0] = 1.0
+            for j, covariate in enumerate(models[metric]):
+                X[:, j + 1] = self._covariate(covariate)
+            y = self.df[metric].to_numpy(dtype=np.float64)
+            usable = selected & np.isfinite(y) & np.isfinite(X).all(axis=1) & np.isfinite(w_all) & (w_all > 0)
+            X_parts.append(X[usable])
+            y_parts.append(y[usable])
+            w_parts.append(w_all[usable])
+            group_parts.append(m * n_states + state_ids[usable])
+            row_parts.append(np.flatnonzero(usable))
+
+        groups = np.concatenate(group_parts)
+        order = np.argsort(groups, kind='stable')
+        groups = groups[order]
+        X, y, w = np.concatenate(X_parts)[order], np.concatenate(y_parts)[order], np.concatenate(w_parts)[order]
+        rows = np.concatenate(row_parts)[order]
+
+        if len(groups) == 0:
+            raise Exception("No rows to fit")
+        model_groups, starts, counts = np.unique(groups, return_index=True, return_counts=True)
+        member = np.repeat(np.arange(len(model_groups)), counts)  # model index of each stacked row
+        model_metric = model_groups // n_states
+        model_k = np.array([len(terms[m]) for m in model_metric])
+
+        # Batched normal equations and solve
+        sw = np.sqrt(w)
+        Xw = X * sw[:, None]
+        XtWX = np.add.reduceat(Xw[:, :, None] * Xw[:, None, :], starts, axis=0)
+        XtWy = np.add.reduceat(Xw * (y * sw)[:, None], starts, axis=0)
+        XtWX_inv = np.linalg.pinv(XtWX, hermitian=True)
+        beta = np.einsum('gij,gj->gi', XtWX_inv, XtWy)
+        rank = np.linalg.matrix_rank(XtWX, hermitian=True)
+
+        fitted = np.einsum('ni,ni->n', X, beta[member])
+        residual = y - fitted
+        rss = np.add.reduceat(w * residual ** 2, starts)
+        dof = counts - model_k
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sigma2 = np.where(dof > 0, rss / dof, np.nan)
+            y_mean = np.add.reduceat(w * y, starts) / np.add.reduceat(w, starts)
+            tss = np.add.reduceat(w * (y - y_mean[member]) ** 2, starts)
+            r2 = np.where(tss > 0, 1 - rss / tss, np.nan)
+            std_err = np.sqrt(np.diagonal(XtWX_inv, axis1=1, axis2=2) * sigma2[:, None])
+            leverage = w * np.einsum('ni,nij,nj->n', X, XtWX_inv[member], X)
+            studentized = residual * sw / np.sqrt(sigma2[member] * (1 - leverage))
+        studentized[~np.isfinite(studentized)] = np.nan
+
+        model_states = [self.registry.states[g % n_states] for g in model_groups.tolist()]
+        model_metrics = [metrics[m] for m in model_metric.tolist()]
+        models_df = pd.DataFrame({
+            'metric': model_metrics, 'state_code': model_states, 'n': counts, 'k': model_k,
+            'rank': rank, 'r2': r2, 'sigma': np.sqrt(sigma2),
+        })
+
+        # One coefficient row per real term of each model
+        term_model, term_index = np.nonzero(np.arange(k)[None, :] < model_k[:, None])
+        coef = beta[term_model, term_index]
+        se = std_err[term_model, term_index]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_value = coef / se
+        coefficients_df = pd.DataFrame({
+            'metric': [model_metrics[i] for i in term_model.tolist()],
+            'state_code': [model_states[i] for i in term_model.tolist()],
+            'term': [terms[model_metric[i]][j] for i, j in zip(term_model.tolist(), term_index.tolist())],
+            'coef': coef, 'std_err': se, 't_value': t_value,
+        })
+
+        residual_metrics = [model_metrics[i] for i in member.tolist()]
+        residuals_df = pd.DataFrame({
+            'metric': residual_metrics,
+            'state_code': self.df['state_code'].to_numpy()[rows],
+            'county': self.df['county'].to_numpy()[rows],
+            'county_id': self.df['county_id'].to_numpy()[rows],
+            'actual': y, 'fitted': fitted, 'residual': residual, 'studentized': studentized,
+        }, index=pd.MultiIndex.from_arrays([residual_metrics, self.df.index[rows]]))
+
+        return StateRegressionResult(models=models_df, coefficients=coefficients_df, residuals=residuals_df)
+
     @staticmethod
-    def _calculate_all_metrics(df: pd.DataFrame) -> None:
-        """Helper method to calculate all metrics used in analysis."""
+    def _calculate_all_metrics(df: Union[pd.DataFrame, Dict[str, np.ndarray]]) -> None:
+        """
+        Helper method to calculate all metrics used in analysis. Also works on a dict of numpy arrays
+        keyed by column name (e.g. simulated counts, one row per draw), adding the metrics as arrays.
+        """
         # Calculate ratios, handling division by zero
-        df['pres_house_ratio_2024'] = df['pres_total_votes_2024'].div(df['house_total_votes_2024'])
-        df['pres_house_ratio_2020'] = df['pres_total_votes_2020'].div(df['house_total_votes_2020'])
+        df['pres_house_ratio_2024'] = df['pres_total_votes_2024'] / df['house_total_votes_2024']
+        df['pres_house_ratio_2020'] = df['pres_total_votes_2020'] / df['house_total_votes_2020']
         df['pres_house_ratio_change'] = df['pres_house_ratio_2024'] - df['pres_house_ratio_2020']
-        df['abs_ratio_change'] = df['pres_house_ratio_change'].abs()
+        df['abs_ratio_change'] = np.abs(df['pres_house_ratio_change'])
         
         # Calculate split ticket estimates
         for year in ['2024', '2020']:
@@ -271,7 +611,7 @@ class DataAnalytics:
         
         # Calculate split ticket changes
         df['split_ticket_change'] = df['split_ticket_2024'] - df['split_ticket_2020']
-        df['abs_split_ticket_change'] = df['split_ticket_change'].abs()
+        df['abs_split_ticket_change'] = np.abs(df['split_ticket_change'])
 
         
     @staticmethod
@@ -290,6 +630,9 @@ class DataAnalytics:
         """
         Creates a simple comparison bar chart showing 2020 vs 2024 values for swing and non-swing states.
         """
+        # matplotlib is imported on first use, it is only needed for plotting
+        import matplotlib.pyplot as plt
+
         # Create figure
         plt.figure(figsize=figsize)
         ax = plt.gca()
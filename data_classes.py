@@ -3,10 +3,15 @@ import abc
 import json
 import os
 import time
-import pandas as pd
 from datetime import datetime
 from dataclasses import dataclass, asdict, fields, is_dataclass, field
-from typing import List, Type, TypeVar, Union, Dict, Any, Optional, Generic, ClassVar
+from typing import List, Type, TypeVar, Union, Dict, Any, Optional, Generic, ClassVar, TYPE_CHECKING
+
+from data_instrumentation import Instrumentation
+
+# pandas is imported on first use to keep module import cheap
+if TYPE_CHECKING:
+    import pandas as pd
 
 T = TypeVar('T', bound='RowModel')
 
@@ -17,34 +22,86 @@ class JsonFileData:
     def save_to_json(self, filename: Union[str, list[str]]):
         """Saves the data to a JSON file."""
         filepath = filename if isinstance(filename, str) else os.path.join(*filename)
-        with open(filepath, 'w') as f:
-            json.dump(self.data, f, indent=4)
+        with Instrumentation.stage('json.save', file=filepath):
+            with open(filepath, 'w') as f:
+                json.dump(self.data, f, indent=4)
         print(f"Data saved to {filepath}")
 
     @classmethod
     def load_from_json(cls, filename: Union[str, list[str]]) -> 'JsonFileData':
         """Loads data from a JSON file and returns an instance of JsonFileData."""
         filepath = filename if isinstance(filename, str) else os.path.join(*filename)
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        with Instrumentation.stage('json.load', file=filepath):
+            with open(filepath, 'r') as f:
+                data = json.load(f)
         return cls(data)
         
+class FieldCodec:
+    """
+    Converts a row model field between its in-memory value and the value written to files, for
+    fields kept as ids in memory. Set it with field(metadata={'codec': ...}).
+    """
+
+    def encode(self, value: Any) -> Any:
+        raise NotImplementedError
+
+    def decode(self, value: Any) -> Any:
+        raise NotImplementedError
+
+
 class RowModel:
     """Base class for CSV row models with serialization/deserialization methods."""
 
+    @classmethod
+    def persisted_fields(cls) -> list:
+        """Returns the dataclass fields written to files. Fields with metadata {'persist': False} are derived in memory."""
+        return [f for f in fields(cls) if f.metadata.get('persist', True)]
+
+    @classmethod
+    def field_codecs(cls) -> Dict[str, FieldCodec]:
+        """Returns the codecs of the fields that have one, by field name."""
+        codecs = cls.__dict__.get('_field_codecs')
+        if codecs is None:
+            codecs = {f.name: f.metadata['codec'] for f in fields(cls) if 'codec' in f.metadata}
+            cls._field_codecs = codecs
+        return codecs
+
+    def decode_fields(self) -> None:
+        """Decodes codec fields that were given their file value (e.g. a joined candidate string); call from __post_init__."""
+        for name, codec in self.field_codecs().items():
+            value = getattr(self, name)
+            if isinstance(value, str):
+                setattr(self, name, codec.decode(value))
+
+    @classmethod
+    def field_names(cls) -> List[str]:
+        names = cls.__dict__.get('_field_names')
+        if names is None:
+            if not is_dataclass(cls):
+                raise TypeError("RowModel must be a dataclass")
+            names = [f.name for f in fields(cls)]
+            cls._field_names = names
+        return names
+
     def to_dict(self) -> Dict[str, Any]:
-        """Converts the dataclass instance to a dictionary."""
-        if is_dataclass(self):
-            return asdict(self)
-        raise TypeError("RowModel must be a dataclass")
+        """Converts the dataclass instance to a dictionary of its file values (codec fields are encoded)."""
+        # Row fields are scalars or tuples, so a shallow dict is equivalent to asdict and much cheaper
+        data = {name: getattr(self, name) for name in self.field_names()}
+        for name, codec in self.field_codecs().items():
+            data[name] = codec.encode(data[name])
+        return data
 
     @classmethod
     def from_dict(cls: Type[T], data: Dict[str, Any]) -> T:
         """Creates an instance of the dataclass from a dictionary, handling type conversions."""
         field_types = {field.name: field.type for field in fields(cls)}
+        codecs = cls.field_codecs()
         kwargs = {}
 
         for key, value in data.items():
+            if key in codecs:
+                kwargs[key] = codecs[key].decode(value)
+                continue
             # Convert the value to the appropriate type if it is not None
             target_type = field_types.get(key)
             if value is not None and target_type:
@@ -74,6 +131,10 @@ class RowModel:
 class CsvFileData(Generic[T], abc.ABC):
     data: List[T]
 
+    # Table name and indexes used when the data is kept in a DataStore database file
+    db_table: ClassVar[Optional[str]] = None
+    db_indexes: ClassVar[List[tuple]] = []
+
     @property
     @abc.abstractmethod
     def row_model(self) -> Type[T]:
@@ -85,13 +146,15 @@ class CsvFileData(Generic[T], abc.ABC):
         filepath = filename if isinstance(filename, str) else os.path.join(*filename)
         
         # Use the field names from the row model for CSV headers
-        fieldnames = [field.name for field in fields(self.row_model)]
+        fieldnames = [field.name for field in self.row_model.persisted_fields()]
         
-        with open(filepath, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for row in self.data:
-                writer.writerow(row.to_dict())
+        with Instrumentation.stage('csv.save', file=filepath) as stage:
+            with open(filepath, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+                writer.writeheader()
+                for row in self.data:
+                    writer.writerow(row.to_dict())
+            stage.rows = len(self.data)
         
         print(f"Data saved to {filepath}")
 
@@ -105,17 +168,50 @@ class CsvFileData(Generic[T], abc.ABC):
         instance = cls(data=[])  # Create temporary instance with empty data
         row_model_class = instance.row_model  # Get the actual row model class
 
-        with open(filepath, 'r', newline='') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Use the row_model's from_dict method to create instances
-                data_row = row_model_class.from_dict(row)
-                data.append(data_row)
+        with Instrumentation.stage('csv.load', file=filepath) as stage:
+            with open(filepath, 'r', newline='') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    # Use the row_model's from_dict method to create instances
+                    data_row = row_model_class.from_dict(row)
+                    data.append(data_row)
+            stage.rows = len(data)
         
         return cls(data=data)
     
     
-    def to_dataframe(self) -> pd.DataFrame:
+    def save_to_db(self, filename: Union[str, List[str]]):
+        """Saves the data to its table in an embedded database file, replacing any previous contents."""
+        from data_storage import DataStore
+
+        if self.db_table is None:
+            raise Exception(f"{type(self).__name__} has no database table")
+        with DataStore(filename) as store, Instrumentation.stage('db.save', file=store.filepath, table=self.db_table) as stage:
+            store.write_table(self.db_table, self.row_model, self.data, self.db_indexes)
+            stage.rows = len(self.data)
+
+        print(f"Data saved to {store.filepath} (table {self.db_table})")
+
+    @classmethod
+    def load_from_db(cls: Type['CsvFileData[T]'], filename: Union[str, List[str]], **filters) -> 'CsvFileData[T]':
+        """
+        Loads data from an embedded database file and returns an instance of CsvFileData.
+        Keyword filters select a subset, e.g. state_code="PA" or election_type=["P", "H"].
+        """
+        from data_storage import DataStore
+
+        if cls.db_table is None:
+            raise Exception(f"{cls.__name__} has no database table")
+        row_model_class = cls(data=[]).row_model
+        with DataStore(filename) as store, Instrumentation.stage('db.load', file=store.filepath, table=cls.db_table) as stage:
+            data = store.read_rows(cls.db_table, row_model_class, **filters)
+            stage.rows = len(data)
+
+        return cls(data=data)
+
+    def to_dataframe(self) -> 'pd.DataFrame':
         """Converts the data to a pandas DataFrame."""
+        import pandas as pd
+
         # Convert each row to a dictionary and create DataFrame
         return pd.DataFrame([row.to_dict() for row in self.data])
\ No newline at end of file
@@ -0,0 +1,258 @@
+import json
+import os
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import List, Dict, Optional, Union, Any, Iterable
+
+from data_model import ElectionYearStateCountyDistrictMap, ElectionDataFullModel
+from data_functions import DataFunctions
+from data_instrumentation import Instrumentation
+
+
+@dataclass(frozen=True)
+class CrawlTask:
+    """One results request: a statewide race (district None) or one House district."""
+    year: str
+    state_code: str
+    election_type: str
+    district: Optional[int] = None
+
+    @property
+    def key(self) -> str:
+        key = f"{self.year}-{self.election_type}G-{self.state_code}"
+        return key if self.district is None else f"{key}-{self.district}"
+
+    @property
+    def url(self) -> str:
+        return DataFunctions.results_url(self.key)
+
+
+class CrawlJournal:
+    """
+    Append-only JSONL journal of a crawl. Each line is one event:
+        {"event": "task", "task": {...}}                                  task queued
+        {"event": "done", "key": ..., "status": ..., "counties": {...}}   result, extracted county data by county name
+        {"event": "failed", "key": ..., "status": ..., "error": ...}      attempt failed
+    Every event is flushed and synced to disk before the crawl moves on, so a crash loses at most the
+    request in flight. Replaying the journal on open rebuilds the queue and the results; a torn last
+    line (crash mid-write) is ignored and cut off the file, so new events start on a fresh line.
+    """
+
+    def __init__(self, filename: Union[str, List[str]]):
+        self.filepath = filename if isinstance(filename, str) else os.path.join(*filename)
+        self.tasks: Dict[str, CrawlTask] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.failures: Dict[str, Dict[str, Any]] = {}
+        self.attempts: Dict[str, int] = {}
+        if os.path.exists(self.filepath):
+            self._replay()
+
+    def _replay(self) -> None:
+        complete = 0
+        with open(self.filepath, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                complete += len(line)
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._apply(event)
+        if complete < os.path.getsize(self.filepath):
+            with open(self.filepath, 'r+b') as f:
+                f.truncate(complete)
+
+    def _apply(self, event: Dict[str, Any]) -> None:
+        if event['event'] == 'task':
+            task = CrawlTask(**event['task'])
+            self.tasks[task.key] = task
+        elif event['event'] == 'done':
+            self.results[event['key']] = event
+            self.failures.pop(event['key'], None)
+            self.attempts[event['key']] = self.attempts.get(event['key'], 0) + 1
+        elif event['event'] == 'failed':
+            self.failures[event['key']] = event
+            self.attempts[event['key']] = self.attempts.get(event['key'], 0) + 1
+
+    def _write(self, events: Iterable[Dict[str, Any]]) -> None:
+        with open(self.filepath, 'a') as f:
+            for event in events:
+                f.write(json.dumps(event))
+                f.write('\n')
+                self._apply(event)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def enqueue(self, tasks: Iterable[CrawlTask]) -> int:
+        """Queues tasks not queued yet. Returns the number added."""
+        new = [t for t in dict.fromkeys(tasks) if t.key not in self.tasks]
+        if new:
+            self._write({"event": "task", "task": asdict(t)} for t in new)
+        return len(new)
+
+    def record_done(self, task: CrawlTask, status: int, counties: Dict[str, Any]) -> None:
+        self._write([{"event": "done", "key": task.key, "status": status, "counties": counties, "at": datetime.now().isoformat()}])
+
+    def record_failed(self, task: CrawlTask, status: Optional[int], error: str) -> None:
+        self._write([{"event": "failed", "key": task.key, "status": status, "error": error, "at": datetime.now().isoformat()}])
+
+    def status(self, key: str) -> str:
+        """'done', 'failed' or 'pending'."""
+        if key in self.results:
+            return 'done'
+        return 'failed' if key in self.failures else 'pending'
+
+
+class CrawlJob:
+    """
+    Resumable version of DataFunctions.get_all_election_data. The requests of a crawl, one per
+    (year, state, election type[, district]), are queued in a CrawlJournal on disk and every result is
+    journaled as it lands. Running the job again with the same journal (after a crash, an interrupt
+    or failed requests) only fetches the tasks that are not done; failed tasks are retried.
+
+    A request that fails (connection error, unexpected status, a county missing from the map,
+    a duplicate county) is recorded as failed with its error instead of stopping the crawl.
+    Statuses in NO_RACE_STATUSES mean the race didn't run in that state or district; the task
+    is done and its counties keep blank data, as in get_all_election_data.
+
+    Example:
+        job = CrawlJob(data_map, ElectionDataMap.election_types.keys(), ["data", "election_crawl.jsonl"])
+        job.run()
+        print(job.summary())
+        election_data = job.result()
+    """
+
+    NO_RACE_STATUSES = (403, 404)
+
+    def __init__(
+        self,
+        year_state_county_district_map: ElectionYearStateCountyDistrictMap,
+        election_types: Iterable[str],
+        journal: Union[str, List[str], CrawlJournal]
+    ):
+        self.map = year_state_county_district_map
+        self.election_types = list(election_types)
+        self.journal = journal if isinstance(journal, CrawlJournal) else CrawlJournal(journal)
+        self.journal.enqueue(self.plan())
+
+    def plan(self) -> List[CrawlTask]:
+        """Returns every task of the crawl, in the order get_all_election_data requests them."""
+        tasks = []
+        for year, states in self.map.data.items():
+            for state in states:
+                for election_type in self.election_types:
+                    if election_type in ('P', 'S', 'G'):
+                        tasks.append(CrawlTask(str(year), state, election_type))
+                    elif election_type == 'H':
+                        tasks.extend(CrawlTask(str(year), state, election_type, int(d)) for d in states[state]["districts"])
+                    else:
+                        raise Exception(f"Unsupported election_type '{election_type}'")
+        return tasks
+
+    def _state_map(self, task: CrawlTask) -> Dict[str, Any]:
+        # Map years are ints when fetched and strings when loaded from JSON
+        year = task.year if task.year in self.map.data else int(task.year)
+        return self.map.data[year][task.state_code]
+
+    def _fetch(self, task: CrawlTask, attempt: int) -> None:
+        """Runs one task and journals the outcome."""
+        try:
+            response = DataFunctions._request(task.url, f'{task.election_type}G', attempt=attempt)
+        except Exception as ex:
+            self.journal.record_failed(task, None, f"{type(ex).__name__}: {ex}")
+            return
+
+        if response.status_code in self.NO_RACE_STATUSES:
+            self.journal.record_done(task, response.status_code, {})
+            return
+        if response.status_code != 200:
+            self.journal.record_failed(task, response.status_code, f"Unexpected status {response.status_code}")
+            return
+
+        try:
+            known_counties = set(self._state_map(task)["counties"])
+            counties = {}
+            for county_response_data in response.json():
+                county_name = county_response_data["countyName"]
+                if county_name not in known_counties:
+                    raise Exception(f"County '{county_name}' not in the county/district map")
+                if county_name in counties and task.district is None:
+                    raise Exception(f"Duplicate county {county_name}")
+                counties[county_name] = DataFunctions.extract_county_data_from_response(county_response_data)
+        except Exception as ex:
+            self.journal.record_failed(task, response.status_code, f"{type(ex).__name__}: {ex}")
+            return
+        self.journal.record_done(task, response.status_code, counties)
+
+    def run(self, max_attempts: int = 3, retry_delay: float = 1.0) -> Dict[str, Any]:
+        """
+        Fetches every task that is not done, trying each up to max_attempts times in this run
+        (retry_delay seconds apart). Returns summary().
+        """
+        todo = [task for key, task in self.journal.tasks.items() if self.journal.status(key) != 'done']
+        with Instrumentation.stage('crawl.run', tasks=len(todo)) as stage:
+            for i, task in enumerate(todo):
+                for attempt in range(1, max_attempts + 1):
+                    if attempt > 1:
+                        time.sleep(retry_delay)
+                    self._fetch(task, self.journal.attempts.get(task.key, 0) + 1)
+                    if self.journal.status(task.key) == 'done':
+                        break
+                if (i + 1) % 50 == 0 or i + 1 == len(todo):
+                    print(f" Crawled {i + 1}/{len(todo)} tasks")
+            stage.rows = len(todo)
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        """Counts of pending, done and failed tasks, with the last error of each failed task."""
+        statuses = {key: self.journal.status(key) for key in self.journal.tasks}
+        return {
+            'total': len(statuses),
+            'done': sum(1 for s in statuses.values() if s == 'done'),
+            'pending': sum(1 for s in statuses.values() if s == 'pending'),
+            'failed': sum(1 for s in statuses.values() if s == 'failed'),
+            'failures': {key: self.journal.failures[key]['error'] for key, s in statuses.items() if s == 'failed'},
+        }
+
+    def result(self, allow_incomplete: bool = False) -> ElectionDataFullModel:
+        """
+        Assembles the journaled results into ElectionDataFullModel, laid out as get_all_election_data
+        returns it. Raises if tasks are not done, unless allow_incomplete (their counties stay blank).
+        """
+        summary = self.summary()
+        if summary['done'] != summary['total'] and not allow_incomplete:
+            raise Exception(f"Crawl incomplete: {summary['pending']} pending, {summary['failed']} failed tasks")
+
+        res = {}
+        for year, states in self.map.data.items():
+            year_data = {}
+            for state in states:
+                state_counties_data = {}
+                for county_name in states[state]["counties"]:
+                    state_counties_data[county_name] = {}
+                    for election_type in self.election_types:
+                        if election_type != 'H':
+                            state_counties_data[county_name][election_type] = DataFunctions.get_blank_county_data()
+                        else:
+                            state_counties_data[county_name][election_type] = {
+                                district: DataFunctions.get_blank_county_data()
+                                for district in states[state]["county_districts"].get(county_name, [])
+                            }
+
+                for election_type in self.election_types:
+                    districts = states[state]["districts"] if election_type == 'H' else [None]
+                    for district in districts:
+                        task = CrawlTask(str(year), state, election_type, int(district) if district is not None else None)
+                        done = self.journal.results.get(task.key)
+                        if done is None:
+                            continue
+                        for county_name, county_data in done['counties'].items():
+                            if district is None:
+                                state_counties_data[county_name][election_type] = county_data
+                            else:
+                                state_counties_data[county_name][election_type][district] = county_data
+                year_data[state] = state_counties_data
+            res[year] = year_data
+        return ElectionDataFullModel(res)
@@ -0,0 +1,182 @@
+import csv
+import os
+from collections import defaultdict
+from typing import List, Dict, Optional, Tuple, Union, Iterable
+
+import numpy as np
+import pandas as pd
+
+from data_registry import CountyRegistry
+from data_instrumentation import instrumented
+
+
+class ApportionmentMatrix:
+    """
+    Sparse (targets x sources) matrix in CSR layout: the sources of target i are
+    indices[indptr[i]:indptr[i + 1]], with the matching weights.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray, shape: Tuple[int, int]):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.shape = shape
+
+    @classmethod
+    def from_entries(cls, targets: np.ndarray, sources: np.ndarray, weights: np.ndarray, shape: Tuple[int, int]) -> 'ApportionmentMatrix':
+        """Builds the matrix from (target, source, weight) entries; duplicate entries add up."""
+        order = np.argsort(targets, kind='stable')
+        indptr = np.zeros(shape[0] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=shape[0]), out=indptr[1:])
+        return cls(indptr, sources[order], weights[order], shape)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.indices)
+
+    def dot(self, block: np.ndarray) -> np.ndarray:
+        """Returns matrix @ block for a (sources x columns) block, every column in one pass."""
+        block = block.reshape(len(block), -1)
+        result = np.zeros((self.shape[0], block.shape[1]))
+        starts = self.indptr[:-1]
+        nonempty = starts < self.indptr[1:]
+        if self.nnz:
+            products = block[self.indices] * self.weights[:, None]
+            result[nonempty] = np.add.reduceat(products, starts[nonempty], axis=0)
+        return result
+
+
+class CountyCrosswalk:
+    """
+    Aligns the reporting units of different election years on one common geography, so units that
+    were split, merged or renamed between cycles (Kansas City reported apart from Jackson County MO,
+    Essex Junction separated from Essex VT) are compared as a whole instead of dropping out of the
+    year-over-year metrics half empty.
+
+    The apportionment table (data/county_crosswalk.csv) has columns year, state_code, county,
+    target and weight: the share of a year's unit that belongs to the target unit. A blank year
+    applies to every year; the weights of a unit must add up to 1. Units not in the table map to
+    themselves. Names are matched through CountyRegistry, so spelling variants fold together too.
+
+    apply() builds one sparse matrix per year and re-aggregates all vote columns of the year with a
+    single sparse product; vote shares and pct_reported (weighted by votes) are recomputed from the
+    re-aggregated counts.
+
+    Example:
+        crosswalk = CountyCrosswalk.load()
+        common = crosswalk.apply(analytics.df)
+        analytics = DataAnalytics.from_dataframe(common)
+    """
+
+    DEFAULT_TABLE = ["data", "county_crosswalk.csv"]
+    RACES = ['pres', 'senate', 'house', 'gov']
+    COUNT_FIELDS = ['total_votes', 'total_votes_dem', 'total_votes_rep', 'total_votes_other']
+    YEARS = ['2024', '2020']
+
+    def __init__(self, entries: Iterable[Tuple[Optional[str], str, str, str, float]] = (), registry: Optional[CountyRegistry] = None):
+        self.registry = registry or CountyRegistry.default()
+        # year (None for every year) -> source county id -> [(target county id, weight)]
+        self._entries: Dict[Optional[str], Dict[int, List[Tuple[int, float]]]] = defaultdict(lambda: defaultdict(list))
+        for year, state_code, county, target, weight in entries:
+            source_id = self.registry.get_id(state_code, county)
+            self._entries[year or None][source_id].append((self.registry.get_id(state_code, target), float(weight)))
+        for year, sources in self._entries.items():
+            for source_id, targets in sources.items():
+                total = sum(weight for _, weight in targets)
+                if abs(total - 1) > 1e-6:
+                    raise Exception(f"Crosswalk weights of {self.registry.state_code(source_id)} '{self.registry.name(source_id)}' ({year or 'all years'}) add up to {total}, not 1")
+
+    @classmethod
+    def load(cls, filename: Optional[Union[str, List[str]]] = None, registry: Optional[CountyRegistry] = None) -> 'CountyCrosswalk':
+        """Loads an apportionment table; without one, the default table if present, else an identity crosswalk."""
+        filepath = os.path.join(*(filename or cls.DEFAULT_TABLE)) if not isinstance(filename, str) else filename
+        if filename is None and not os.path.exists(filepath):
+            return cls(registry=registry)
+        with open(filepath, 'r', newline='') as f:
+            entries = [
+                (row['year'].strip() or None, row['state_code'], row['county'], row['target'], float(row['weight'] or 1))
+                for row in csv.DictReader(f)
+            ]
+        return cls(entries, registry)
+
+    def _targets(self, year: str, county_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(target county id, source row, weight) entries of a year for rows with the given county ids."""
+        mapping = {**self._entries.get(None, {}), **self._entries.get(year, {})}
+        mapped = np.isin(county_ids, list(mapping)) if mapping else np.zeros(len(county_ids), dtype=bool)
+        rows = np.flatnonzero(~mapped)
+        targets, sources, weights = [county_ids[rows]], [rows], [np.ones(len(rows))]
+        for row in np.flatnonzero(mapped).tolist():
+            for target_id, weight in mapping[int(county_ids[row])]:
+                targets.append(np.array([target_id]))
+                sources.append(np.array([row]))
+                weights.append(np.array([weight]))
+        return np.concatenate(targets), np.concatenate(sources), np.concatenate(weights)
+
+    def matrices(self, county_ids: np.ndarray, years: Optional[List[str]] = None) -> Tuple[np.ndarray, Dict[str, ApportionmentMatrix]]:
+        """
+        Returns the county ids of the common geography and, per year, the matrix from rows with the
+        given county ids to it.
+        """
+        years = years or self.YEARS
+        entries = {year: self._targets(year, county_ids) for year in years}
+        common = np.unique(np.concatenate([targets for targets, _, _ in entries.values()]))
+        return common, {
+            year: ApportionmentMatrix.from_entries(np.searchsorted(common, targets), sources, weights, (len(common), len(county_ids)))
+            for year, (targets, sources, weights) in entries.items()
+        }
+
+    @instrumented('crosswalk.apply')
+    def apply(self, df: pd.DataFrame, years: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Re-aggregates a flattened frame (state_code, county, county_id and the <race>_..._<year>
+        columns) onto the common geography. Returns one row per common unit with the same columns;
+        a value is NaN when no unit mapped to it reported the race that year. Units the table maps
+        away only in some years (e.g. 2024 parts of a 2020 county) are dropped when they keep no data
+        in the other years.
+        """
+        years = years or self.YEARS
+        county_ids = df['county_id'].to_numpy(dtype=np.int64)
+        common, matrices = self.matrices(county_ids, years)
+        has_data = np.zeros(len(common), dtype=bool)
+        result = {
+            'state_code': [self.registry.state_code(c) for c in common.tolist()],
+            'county': [self.registry.name(c) for c in common.tolist()],
+        }
+
+        for year in years:
+            races = [race for race in self.RACES if f'{race}_total_votes_{year}' in df.columns]
+            counts = [f'{race}_{field}_{year}' for race in races for field in self.COUNT_FIELDS]
+            values = df[counts].to_numpy(dtype=np.float64, na_value=np.nan)
+            totals = values[:, 0::len(self.COUNT_FIELDS)]
+            reported = np.column_stack([df[f'{race}_pct_reported_{year}'].to_numpy(dtype=np.float64, na_value=np.nan) for race in races])
+            # One block per year: vote counts, pct_reported weighted by votes and unweighted, and presence flags
+            k = len(races)
+            block = np.hstack([
+                np.nan_to_num(values),
+                np.nan_to_num(reported * totals),
+                np.nan_to_num(totals) * ~np.isnan(reported),
+                np.nan_to_num(reported),
+                ~np.isnan(reported),
+                ~np.isnan(totals),
+            ])
+            aggregated = matrices[year].dot(block)
+            n = len(counts)
+            weighted, weight, plain, reporting, present = (aggregated[:, n + i * k:n + (i + 1) * k] for i in range(5))
+            present = present > 0
+            has_data |= present.any(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # Units without votes (weight 0) fall back to the plain mean of pct_reported
+                pct_reported = np.where(weight > 0, weighted / weight, np.where(reporting > 0, plain / reporting, np.nan))
+                for i, race in enumerate(races):
+                    columns = aggregated[:, i * len(self.COUNT_FIELDS):(i + 1) * len(self.COUNT_FIELDS)]
+                    total = np.where(present[:, i], columns[:, 0], np.nan)
+                    for j, field in enumerate(self.COUNT_FIELDS):
+                        result[f'{race}_{field}_{year}'] = np.where(present[:, i], columns[:, j], np.nan)
+                    for j, party in enumerate(('dem', 'rep', 'other'), start=1):
+                        result[f'{race}_total_votes_{party}_pct_{year}'] = np.where(total > 0, columns[:, j] / total * 100, np.nan)
+                    result[f'{race}_pct_reported_{year}'] = np.where(present[:, i], pct_reported[:, i], np.nan)
+
+        result['county_id'] = common
+        sources = [source_id for mapping in self._entries.values() for source_id in mapping]
+        frame = pd.DataFrame(result)[has_data | ~np.isin(common, sources)].reset_index(drop=True)
+        return frame[[c for c in df.columns if c in frame.columns] + [c for c in frame.columns if c not in df.columns]]
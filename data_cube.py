@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+
+from typing import List, Dict, Optional, Tuple, Union
+from data_model import ElectionDataMap, ElectionDataGroupedAndFlattenedModel, ElectionDataGroupedAndFlattenedRowModel
+from data_analytics import DataAnalytics
+
+
+class ElectionDataCube:
+    """
+    In-process cube over the flattened model. Holds additive statistics per county and measure
+    and keeps pre-materialized rollups for the state, group (swing / non-swing) and nation levels.
+
+    Every statistic is additive, so rollups are plain sums and a changed county only adds its
+    delta to the levels above it.
+
+    Example:
+        cube = ElectionDataCube.from_flattened(flattened_election_data)
+        cube.query('pres_house_ratio_change', group='SWING')
+        cube.query('split_ticket_2024', state='PA')['weighted_mean']
+        cube.frame(['pres_house_ratio_change', 'split_ticket_change'], level='state')
+    """
+
+    # Statistics kept per (member, measure), in array order
+    STATS: Tuple[str, ...] = ('count', 'sum', 'sum_sq', 'weight', 'weighted_sum')
+    LEVELS: Tuple[str, ...] = ('county', 'state', 'group', 'nation')
+    GROUPS: Tuple[str, ...] = ('SWING', 'NON-SWING')
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        measures: Optional[List[str]] = None,
+        weights: Optional[Dict[str, str]] = None,
+        filter_finite: Optional[List[str]] = None,
+        swing_states: Optional[List[str]] = None
+    ):
+        """
+        Builds the cube from a dataframe that already has the DataAnalytics metrics calculated.
+        - measures: numeric columns to hold (defaults to every numeric column)
+        - weights: measure -> weight column for vote-weighted sums (defaults to presidential total votes of the measure's year)
+        - filter_finite: counties where any of these columns is not finite are left out of every measure
+        - swing_states: states in the SWING group (defaults to DataAnalytics.SWING_STATES)
+        """
+        self.swing_states = list(swing_states) if swing_states is not None else list(DataAnalytics.SWING_STATES)
+        self.filter_finite = list(filter_finite) if filter_finite else []
+        self.measures = list(measures) if measures is not None else [
+            c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])
+        ]
+        self.weights = {m: self._default_weight_column(m) for m in self.measures}
+        if weights:
+            self.weights.update(weights)
+
+        self.states = list(ElectionDataMap.election_states.keys())
+        for state in df['state_code'].unique():
+            if state not in self.states:
+                self.states.append(state)
+        self._state_index = {state: i for i, state in enumerate(self.states)}
+        self._measure_index = {measure: i for i, measure in enumerate(self.measures)}
+
+        # County grain
+        self.county_keys: List[Tuple[str, str]] = list(zip(df['state_code'], df['county']))
+        self._county_index = {key: i for i, key in enumerate(self.county_keys)}
+        if len(self._county_index) != len(self.county_keys):
+            raise Exception("Duplicate (state_code, county) keys in cube input")
+        self._county_state = np.array([self._state_index[s] for s, _ in self.county_keys], dtype=np.int64)
+        self.county_stats = self._calculate_stats(df)
+
+        # Pre-materialized rollups
+        self._group_of_state = np.array([0 if s in self.swing_states else 1 for s in self.states], dtype=np.int64)
+        self.state_stats = np.zeros((len(self.states), len(self.measures), len(self.STATS)))
+        np.add.at(self.state_stats, self._county_state, self.county_stats)
+        self.group_stats = np.zeros((len(self.GROUPS), len(self.measures), len(self.STATS)))
+        np.add.at(self.group_stats, self._group_of_state, self.state_stats)
+        self.nation_stats = self.group_stats.sum(axis=0)
+
+    @classmethod
+    def from_flattened(cls, data: ElectionDataGroupedAndFlattenedModel, **kwargs) -> 'ElectionDataCube':
+        """Builds the cube from the flattened model, calculating the DataAnalytics metrics first."""
+        df = data.to_dataframe()
+        DataAnalytics._calculate_all_metrics(df)
+        return cls(df, **kwargs)
+
+    @classmethod
+    def from_analytics(cls, analytics: DataAnalytics, **kwargs) -> 'ElectionDataCube':
+        """Builds the cube from the dataframe of an existing DataAnalytics instance."""
+        return cls(analytics.df, **kwargs)
+
+    @staticmethod
+    def _default_weight_column(measure: str) -> str:
+        year = '2020' if measure.endswith('_2020') else '2024'
+        return f'pres_total_votes_{year}'
+
+    def _calculate_stats(self, df: pd.DataFrame) -> np.ndarray:
+        """Calculates the additive statistics of each row, shape (rows, measures, stats)."""
+        for col in set(self.weights.values()):
+            if col not in df.columns:
+                raise Exception(f"Weight column '{col}' not present in cube input")
+
+        x = df[self.measures].to_numpy(dtype=float)
+        w = df[[self.weights[m] for m in self.measures]].to_numpy(dtype=float)
+        valid = np.isfinite(x)
+        if self.filter_finite:
+            valid &= np.isfinite(df[self.filter_finite].to_numpy(dtype=float)).all(axis=1)[:, None]
+        weighted = valid & np.isfinite(w)
+
+        x = np.where(valid, x, 0.0)
+        w = np.where(weighted, w, 0.0)
+        return np.stack([
+            valid.astype(float),
+            x,
+            x * x,
+            w,
+            w * x
+        ], axis=-1)
+
+    def _stats_for(self, state: Optional[str], group: Optional[str], county: Optional[str]) -> np.ndarray:
+        if county is not None:
+            if state is None:
+                raise Exception("A county query needs its state")
+            return self.county_stats[self._county_index[(state, county)]]
+        if state is not None:
+            return self.state_stats[self._state_index[state]]
+        if group is not None:
+            return self.group_stats[self.GROUPS.index(group)]
+        return self.nation_stats
+
+    @staticmethod
+    def _describe(count: float, total: float, sum_sq: float, weight: float, weighted_sum: float) -> Dict[str, float]:
+        mean = total / count if count > 0 else np.nan
+        # Sample standard deviation, matching pandas .std()
+        var = (sum_sq - count * mean * mean) / (count - 1) if count > 1 else np.nan
+        return {
+            'count': int(round(count)),
+            'sum': total,
+            'mean': mean,
+            'std': float(np.sqrt(max(var, 0.0))) if count > 1 else np.nan,
+            'weight': weight,
+            'weighted_mean': weighted_sum / weight if weight > 0 else np.nan
+        }
+
+    def query(self, measure: str, state: Optional[str] = None, group: Optional[str] = None, county: Optional[str] = None) -> Dict[str, float]:
+        """
+        Returns count, sum, mean, std, weight and weighted mean of one measure.
+        Slices by county (with state), state, group ('SWING' / 'NON-SWING') or nationwide when no slice is given.
+        """
+        stats = self._stats_for(state, group, county)[self._measure_index[measure]].tolist()
+        return self._describe(*stats)
+
+    def frame(self, measures: Optional[List[str]] = None, level: str = 'state') -> pd.DataFrame:
+        """
+        Dices the cube into a dataframe with one row per member of the level and
+        columns '<measure>_<statistic>' for the requested measures.
+        """
+        measures = measures if measures is not None else self.measures
+        idx = [self._measure_index[m] for m in measures]
+
+        if level == 'county':
+            stats, index = self.county_stats, pd.MultiIndex.from_tuples(self.county_keys, names=['state_code', 'county'])
+        elif level == 'state':
+            stats, index = self.state_stats, pd.Index(self.states, name='state_code')
+        elif level == 'group':
+            stats, index = self.group_stats, pd.Index(self.GROUPS, name='group')
+        elif level == 'nation':
+            stats, index = self.nation_stats[None], pd.Index(['ALL'], name='nation')
+        else:
+            raise Exception(f"Unsupported cube level '{level}'")
+
+        stats = stats[:, idx]
+        count, total, sum_sq, weight, weighted_sum = np.moveaxis(stats, -1, 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(count > 0, total / count, np.nan)
+            var = np.where(count > 1, (sum_sq - count * mean * mean) / (count - 1), np.nan)
+            weighted_mean = np.where(weight > 0, weighted_sum / weight, np.nan)
+        std = np.sqrt(np.clip(var, 0.0, None))
+
+        columns = {}
+        for j, measure in enumerate(measures):
+            columns[f'{measure}_count'] = count[:, j].round().astype(int)
+            columns[f'{measure}_mean'] = mean[:, j]
+            columns[f'{measure}_std'] = std[:, j]
+            columns[f'{measure}_weighted_mean'] = weighted_mean[:, j]
+        return pd.DataFrame(columns, index=index)
+
+    def update_counties(self, rows: List[ElectionDataGroupedAndFlattenedRowModel]) -> None:
+        """
+        Incrementally applies changed (or new) county rows. Only the delta of each county is
+        added to its state, group and the nation; nothing else is recomputed.
+        """
+        if not rows:
+            return
+        df = pd.DataFrame([row.to_dict() for row in rows])
+        DataAnalytics._calculate_all_metrics(df)
+        new_stats = self._calculate_stats(df)
+
+        for row, stats in zip(rows, new_stats):
+            key = (row.state_code, row.county)
+            if row.state_code not in self._state_index:
+                raise Exception(f"Unknown state '{row.state_code}' for cube update")
+
+            i = self._county_index.get(key)
+            if i is None:
+                # New county, grow the county grain
+                i = len(self.county_keys)
+                self.county_keys.append(key)
+                self._county_index[key] = i
+                self._county_state = np.append(self._county_state, self._state_index[row.state_code])
+                self.county_stats = np.concatenate([self.county_stats, np.zeros((1,) + stats.shape)])
+
+            delta = stats - self.county_stats[i]
+            self.county_stats[i] = stats
+            state_idx = self._county_state[i]
+            self.state_stats[state_idx] += delta
+            self.group_stats[self._group_of_state[state_idx]] += delta
+            self.nation_stats += delta
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple, Union, Any, Iterable, Set
+
+from data_classes import JsonFileData
+from data_model import ElectionDataFullModel
+from data_instrumentation import instrumented
+
+# Canonical JSON of leaf values: key order doesn't change a hash
+_LEAF_ENCODER = json.JSONEncoder(sort_keys=True, separators=(',', ':'))
+
+
+@dataclass
+class FingerprintDiff:
+    """
+    Keys that differ between two fingerprints. A key is a path tuple (year, state_code, county,
+    election_type[, district]) down to the deepest level that differs; a whole county or state that
+    appears or disappears is reported once, at its own level.
+    """
+    added: List[Tuple[str, ...]] = field(default_factory=list)
+    removed: List[Tuple[str, ...]] = field(default_factory=list)
+    modified: List[Tuple[str, ...]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+    def keys(self) -> List[Tuple[str, ...]]:
+        """Returns every changed key."""
+        return self.added + self.removed + self.modified
+
+    def counties(self) -> Set[Tuple[str, str, str]]:
+        """
+        Returns the (year, state_code, county) keys with any change. An added or removed state or year
+        has no county keys of its own; see keys().
+        """
+        return {key[:3] for key in self.keys() if len(key) >= 3}
+
+    def select(self, full_data: ElectionDataFullModel) -> ElectionDataFullModel:
+        """
+        Returns the part of full_data holding the added and modified counties (and all counties of added
+        states and years), e.g. to re-aggregate only those with DataFunctions.aggregate_full_data_to_grouped.
+        """
+        res = {}
+        for key in self.added + self.modified:
+            # Diff keys are strings; years are ints when fetched and strings when loaded from JSON
+            year = key[0] if key[0] in full_data.data else int(key[0])
+            year_data = full_data.data.get(year, {})
+            if len(key) == 1:
+                res[year] = year_data
+                continue
+            state_data = year_data.get(key[1], {})
+            if len(key) == 2:
+                res.setdefault(year, {})[key[1]] = state_data
+                continue
+            if key[2] in state_data:
+                res.setdefault(year, {}).setdefault(key[1], {})[key[2]] = state_data[key[2]]
+        return ElectionDataFullModel(res)
+
+
+@dataclass
+class ElectionDataFingerprint(JsonFileData):
+    """
+    Merkle tree of hashes over ElectionDataFullModel: year -> state -> county -> election type ->
+    district (House races only). A leaf hashes its race data and every other node hashes its children's
+    keys and hashes, so equal hashes mean equal subtrees. Comparing two fingerprints only descends into
+    subtrees whose hashes differ, so a diff costs time in proportion to what changed rather than to the
+    size of the data.
+
+    Fields in EXCLUDED_FIELDS (the source timestamp, which moves on every poll) are left out of the
+    hashes, so only changes of counts, names and reporting percentages show up.
+
+    Inner nodes are stored as {"hash": ..., "children": {key: node}} and leaves as their hash string.
+
+    Example:
+        fingerprint = ElectionDataFingerprint.of(election_data)
+        previous = ElectionDataFingerprint.load_from_json(["data", "election_data_full.fingerprint.json"])
+        diff = fingerprint.diff(previous)
+        grouped_changes = DataFunctions.aggregate_full_data_to_grouped(diff.select(election_data))
+        fingerprint.save_to_json(["data", "election_data_full.fingerprint.json"])
+    """
+
+    LEVELS = ['year', 'state_code', 'county', 'election_type', 'district']
+    EXCLUDED_FIELDS = ('timestamp',)
+    DIGEST_SIZE = 8
+
+    @staticmethod
+    def path_for(filename: Union[str, List[str]]) -> str:
+        """Returns the fingerprint file kept next to a full data JSON file."""
+        filepath = filename if isinstance(filename, str) else os.path.join(*filename)
+        root, _ = os.path.splitext(filepath)
+        return f"{root}.fingerprint.json"
+
+    @staticmethod
+    def _hash_leaf(value: Any, excluded: Tuple[str, ...]) -> str:
+        if isinstance(value, dict) and excluded:
+            value = {k: v for k, v in value.items() if k not in excluded}
+        encoded = _LEAF_ENCODER.encode(value).encode()
+        return hashlib.blake2b(encoded, digest_size=ElectionDataFingerprint.DIGEST_SIZE).hexdigest()
+
+    @staticmethod
+    def _hash(node: Union[str, Dict[str, Any]]) -> str:
+        return node if isinstance(node, str) else node['hash']
+
+    @staticmethod
+    def _hash_children(children: Dict[str, Union[str, Dict[str, Any]]]) -> str:
+        h = hashlib.blake2b(digest_size=ElectionDataFingerprint.DIGEST_SIZE)
+        for key in sorted(children):
+            h.update(key.encode())
+            h.update(b'\0')
+            h.update(ElectionDataFingerprint._hash(children[key]).encode())
+        return h.hexdigest()
+
+    @staticmethod
+    def _node(value: Any, depth: int, key: str, excluded: Tuple[str, ...]) -> Union[str, Dict[str, Any]]:
+        # depth is the index of key in LEVELS; House races branch into districts, other races are leaves
+        if depth < 3 or (depth == 3 and key == 'H' and isinstance(value, dict)):
+            children = {str(k): ElectionDataFingerprint._node(v, depth + 1, str(k), excluded) for k, v in value.items()}
+            return {'hash': ElectionDataFingerprint._hash_children(children), 'children': children}
+        return ElectionDataFingerprint._hash_leaf(value, excluded)
+
+    @staticmethod
+    @instrumented('fingerprint.build')
+    def of(full_data: ElectionDataFullModel, excluded_fields: Iterable[str] = EXCLUDED_FIELDS) -> 'ElectionDataFingerprint':
+        """Computes the fingerprint of full data."""
+        excluded = tuple(excluded_fields)
+        children = {str(year): ElectionDataFingerprint._node(states, 0, str(year), excluded) for year, states in full_data.data.items()}
+        return ElectionDataFingerprint({'hash': ElectionDataFingerprint._hash_children(children), 'children': children})
+
+    @property
+    def digest(self) -> str:
+        """Root hash; equal for equal data."""
+        return self.data['hash']
+
+    def hash_of(self, *key: Union[int, str]) -> Optional[str]:
+        """Returns the hash of the subtree at a key path, e.g. hash_of(2024, 'PA', 'Erie', 'H', 3), or None."""
+        node = self.data
+        for k in key:
+            if isinstance(node, str):
+                return None
+            node = node['children'].get(str(k))
+            if node is None:
+                return None
+        return self._hash(node)
+
+    def diff(self, previous: 'ElectionDataFingerprint') -> FingerprintDiff:
+        """Returns the keys added, removed or modified since a previous fingerprint."""
+        result = FingerprintDiff()
+        stack = [((), self.data, previous.data)]
+        while stack:
+            key, new, old = stack.pop()
+            if self._hash(new) == self._hash(old):
+                continue
+            if isinstance(new, str) or isinstance(old, str):
+                result.modified.append(key)
+                continue
+            new_children, old_children = new['children'], old['children']
+            for k, child in new_children.items():
+                if k not in old_children:
+                    result.added.append(key + (k,))
+                else:
+                    stack.append((key + (k,), child, old_children[k]))
+            result.removed.extend(key + (k,) for k in old_children if k not in new_children)
+
+        for keys in (result.added, result.removed, result.modified):
+            keys.sort()
+        return result
@@ -1,7 +1,5 @@
-import requests
 import csv
 import abc
-import pandas as pd
 import json
 import os
 import time
@@ -11,12 +9,44 @@ from typing import List, Type, TypeVar, Union, Dict, Any, Optional, Generic
 from datetime import datetime
 
 from data_model import *
+from data_instrumentation import Instrumentation, instrumented
 
 
 
 class DataFunctions:
+    """Fetching, aggregation and flattening stages. requests is imported on first fetch."""
+
+    # Results endpoint root; point it at a local stand-in (data_results_server.py) with
+    # set_base_url or the RESULTS_BASE_URL environment variable
+    DEFAULT_BASE_URL = "https://politics.api.cnn.io/results/county-races"
+    base_url = os.environ.get('RESULTS_BASE_URL', DEFAULT_BASE_URL).rstrip('/')
+
+    @staticmethod
+    def set_base_url(base_url: Optional[str]) -> None:
+        """Sets the results endpoint root, or restores the default with None."""
+        DataFunctions.base_url = (base_url or DataFunctions.DEFAULT_BASE_URL).rstrip('/')
+
+    @staticmethod
+    def results_url(race: str) -> str:
+        """Url of a race's county results, e.g. results_url('2024-HG-PA-3')."""
+        return f"{DataFunctions.base_url}/{race}.json"
 
     @staticmethod
+    def _request(url: str, endpoint: str, attempt: int = 1):
+        """GETs a results url, recording latency, status and attempt number when instrumentation is on."""
+        import requests
+
+        start = time.perf_counter()
+        try:
+            response = requests.get(url)
+        except Exception:
+            Instrumentation.record_request(url, None, time.perf_counter() - start, attempt, endpoint)
+            raise
+        Instrumentation.record_request(url, response.status_code, time.perf_counter() - start, attempt, endpoint)
+        return response
+
+    @staticmethod
+    @instrumented('fetch.county_district_map')
     def get_election_year_state_district_county_map(years: list[int], states: list[str]) -> ElectionYearStateCountyDistrictMap:
         res = {}
         for year in years:
@@ -28,8 +58,8 @@ class DataFunctions:
                 county_districts = {}
                 
                 # Pull counties for pres race
-                url = f"https://politics.api.cnn.io/results/county-races/{year}-PG-{state}.json"
-                response = requests.get(url)
+                url = DataFunctions.results_url(f"{year}-PG-{state}")
+                response = DataFunctions._request(url, 'PG')
                 if response.status_code == 200:
                     for county_data in response.json():
                         county_name = county_data["countyName"]
@@ -43,8 +73,8 @@ class DataFunctions:
                 # Pull districts for house races
                 district_id = 1
                 while True:
-                    url = f"https://politics.api.cnn.io/results/county-races/{year}-HG-{state}-{district_id}.json"
-                    response = requests.get(url)
+                    url = DataFunctions.results_url(f"{year}-HG-{state}-{district_id}")
+                    response = DataFunctions._request(url, 'HG')
                     if response.status_code == 200:
                         districts.append(district_id)
                         for county_data in response.json():
@@ -59,7 +89,7 @@ class DataFunctions:
                     else:
                         time.sleep(1)
                         # Retry on error... if errors again, assume there are no more districts
-                        response = requests.get(url)
+                        response = DataFunctions._request(url, 'HG', attempt=2)
                         if response.status_code == 200:
                             districts.append(district_id)
                             for county_data in response.json():
@@ -85,31 +115,36 @@ class DataFunctions:
 
 
     @staticmethod
-    def get_all_election_data(election_types: list[str], year_state_county_district_map: ElectionYearStateCountyDistrictMap) -> ElectionDataFullModel:
+    def get_blank_county_data() -> dict[str, any]:
+        return {
+            "pct_reported": None,
+            "total_votes": None,
+            "candidates": {},
+            "timestamp": None
+        }
+
+    @staticmethod
+    def extract_county_data_from_response(county_response_data: json) -> dict[str, any]:
+        data = {
+            "pct_reported": county_response_data["percentReporting"],
+            "total_votes": county_response_data["totalVote"],
+            "candidates": {
+                candidate["candidatePartyCode"]: {
+                    "name": candidate["fullName"],
+                    "votes": candidate["voteNum"],
+                    "votes_pct": float(candidate["votePercentStr"])
+                }
+                for candidate in county_response_data["candidates"]
+            },
+            "timestamp": county_response_data["extractedAt"]
+        }
+        return data
 
-        def get_blank_county_data() -> dict[str, any]:
-            return { 
-                "pct_reported": None,
-                "total_votes": None,
-                "candidates": {},
-                "timestamp": None
-            }
-
-        def extract_county_data_from_response(county_response_data: json) -> dict[str, any]:
-            data = { 
-                "pct_reported": county_response_data["percentReporting"],
-                "total_votes": county_response_data["totalVote"],
-                "candidates": {
-                    candidate["candidatePartyCode"]: {
-                        "name": candidate["fullName"],
-                        "votes": candidate["voteNum"],
-                        "votes_pct": float(candidate["votePercentStr"])
-                    }
-                    for candidate in county_response_data["candidates"]
-                },
-                "timestamp": county_response_data["extractedAt"]
-            }
-            return data
+    @staticmethod
+    @instrumented('fetch.election_data')
+    def get_all_election_data(election_types: list[str], year_state_county_district_map: ElectionYearStateCountyDistrictMap) -> ElectionDataFullModel:
+        get_blank_county_data = DataFunctions.get_blank_county_data
+        extract_county_data_from_response = DataFunctions.extract_county_data_from_response
 
         res = {}
         for year, states in year_state_county_district_map.data.items():
@@ -139,8 +174,8 @@ class DataFunctions:
                     loaded_counties = set()
                     if election_type in ('P', 'S', 'G'):
                         # load county data
-                        url = f"https://politics.api.cnn.io/results/county-races/{year}-{election_type}G-{state}.json"
-                        response = requests.get(url)
+                        url = DataFunctions.results_url(f"{year}-{election_type}G-{state}")
+                        response = DataFunctions._request(url, f'{election_type}G')
                         if response.status_code == 200:
                             for county_response_data in response.json():
                                 county_name = county_response_data["countyName"]
@@ -163,8 +198,8 @@ class DataFunctions:
                     elif election_type == 'H':
                         # load district county data
                         for district in year_state_county_district_map.data[year][state]["districts"]:
-                            url = f"https://politics.api.cnn.io/results/county-races/{year}-{election_type}G-{state}-{district}.json"
-                            response = requests.get(url)
+                            url = DataFunctions.results_url(f"{year}-{election_type}G-{state}-{district}")
+                            response = DataFunctions._request(url, f'{election_type}G')
                             if response.status_code == 200:
                                 for county_response_data in response.json():
                                     county_name = county_response_data["countyName"]
@@ -201,10 +236,102 @@ class DataFunctions:
         
         return ElectionDataFullModel(res)
 
-    @staticmethod        
+    @staticmethod
+    def new_race_aggregate(reported_pct: Optional[float] = None, house: bool = False) -> Dict[str, Any]:
+        """Running sums of one grouped row (a race in a county) while its candidates are folded in."""
+        aggregate = {
+            'dem_candidates': [],
+            'rep_candidates': [],
+            'other_candidates': [],
+            'dem_votes': 0,
+            'rep_votes': 0,
+            'other_votes': 0,
+            'total_votes': 0,
+        }
+        if house:
+            aggregate['district_weights'] = []  # Store district total votes and reported percentages for weighted average
+        else:
+            aggregate['reported_pct'] = reported_pct
+        return aggregate
+
+    @staticmethod
+    def add_race_data(aggregate: Dict[str, Any], data: Dict[str, Any], candidates: CandidateRegistry, district: Optional[Union[int, str]] = None) -> None:
+        """Folds one county's race data (a district's for House races) into a race aggregate."""
+        if district is not None:
+            # Store district's total votes and reported percentage for weighted average
+            district_total_votes = data.get('total_votes', 0)
+            if district_total_votes > 0 and data['pct_reported'] is not None:
+                aggregate['district_weights'].append({
+                    'total_votes': district_total_votes,
+                    'pct_reported': data['pct_reported']
+                })
+
+        # Process each candidate
+        for party, candidate_data in data['candidates'].items():
+            candidate_id = candidates.get_id(candidate_data['name'], party, district)
+            votes = candidate_data['votes']
+
+            if party == 'D':
+                aggregate['dem_candidates'].append(candidate_id)
+                aggregate['dem_votes'] += votes
+            elif party == 'R':
+                aggregate['rep_candidates'].append(candidate_id)
+                aggregate['rep_votes'] += votes
+            else:
+                aggregate['other_candidates'].append(candidate_id)
+                aggregate['other_votes'] += votes
+
+            aggregate['total_votes'] += votes
+
+    @staticmethod
+    def grouped_row(year: Union[int, str], election_type: str, state_code: str, county: str, data: Dict[str, Any], candidates: CandidateRegistry) -> ElectionDataGroupedRowModel:
+        """Builds the grouped row of a race aggregate."""
+        # For House races, calculate weighted average of reported percentage
+        if election_type == 'H' and data.get('district_weights', []):
+            weights = data['district_weights']
+            total_weight = sum(d['total_votes'] for d in weights)
+            if total_weight > 0:
+                weighted_pct = sum(
+                    d['pct_reported'] * (d['total_votes'] / total_weight) 
+                    for d in weights
+                )
+                reported_pct = weighted_pct
+            else:
+                reported_pct = None
+        else:
+            reported_pct = data.get('reported_pct')
+            
+        # Calculate vote percentages
+        total_votes = data['total_votes']
+        dem_pct = (data['dem_votes'] / total_votes * 100) if total_votes > 0 else None
+        rep_pct = (data['rep_votes'] / total_votes * 100) if total_votes > 0 else None
+        other_pct = (data['other_votes'] / total_votes * 100) if total_votes > 0 else None
+        
+        return ElectionDataGroupedRowModel(
+            election_year=year,
+            election_type=election_type,
+            state_code=state_code,
+            county=county,
+            dem_candidate=candidates.intern(data['dem_candidates']),
+            rep_candidate=candidates.intern(data['rep_candidates']),
+            other_candidate=candidates.intern(data['other_candidates']),
+            reported_pct=reported_pct,
+            votes_total=total_votes,
+            votes_dem=data['dem_votes'],
+            votes_rep=data['rep_votes'],
+            votes_other=data['other_votes'],
+            votes_dem_pct=dem_pct,
+            votes_rep_pct=rep_pct,
+            votes_other_pct=other_pct
+        )
+
+    @staticmethod
+    @instrumented('aggregate')
     def aggregate_full_data_to_grouped(full_data: ElectionDataFullModel) -> ElectionDataGroupedModel:
         # Dictionary to store aggregated data, keyed by (year, state, election_type, county)
         aggregated_data = {}
+        # Candidates are collected as CandidateRegistry ids; the joined label strings are only built for output
+        candidates = CandidateRegistry.default()
         
         for year, state_data in full_data.data.items():
             for state_code, county_data in state_data.items():
@@ -215,143 +342,50 @@ class DataFunctions:
                         if election_type == 'H':
                             # Initialize aggregated data for this key if not exists
                             if key not in aggregated_data:
-                                aggregated_data[key] = {
-                                    'dem_candidates': [],
-                                    'rep_candidates': [],
-                                    'other_candidates': [],
-                                    'dem_votes': 0,
-                                    'rep_votes': 0,
-                                    'other_votes': 0,
-                                    'total_votes': 0,
-                                    'district_weights': []  # Store district total votes and reported percentages for weighted average
-                                }
+                                aggregated_data[key] = DataFunctions.new_race_aggregate(house=True)
                             
                             # Iterate through each district's data
                             for district, district_data in data.items():
                                 if not district_data['candidates']:
                                     continue
-                                
-                                # Store district's total votes and reported percentage for weighted average
-                                district_total_votes = district_data.get('total_votes', 0)
-                                if district_total_votes > 0 and district_data['pct_reported'] is not None:
-                                    aggregated_data[key]['district_weights'].append({
-                                        'total_votes': district_total_votes,
-                                        'pct_reported': district_data['pct_reported']
-                                    })
-                                
-                                # Process each candidate
-                                for party, candidate_data in district_data['candidates'].items():
-                                    candidate_name = f"[{district}]{candidate_data['name']}"
-                                    votes = candidate_data['votes']
-                                    
-                                    if party == 'D':
-                                        aggregated_data[key]['dem_candidates'].append(candidate_name)
-                                        aggregated_data[key]['dem_votes'] += votes
-                                    elif party == 'R':
-                                        aggregated_data[key]['rep_candidates'].append(candidate_name)
-                                        aggregated_data[key]['rep_votes'] += votes
-                                    else:
-                                        aggregated_data[key]['other_candidates'].append(candidate_name)
-                                        aggregated_data[key]['other_votes'] += votes
-                                    
-                                    aggregated_data[key]['total_votes'] += votes
+                                DataFunctions.add_race_data(aggregated_data[key], district_data, candidates, district)
                             
                         else:  # Non-House elections (P, S, G)
                             if not data['candidates']:
                                 continue
                                 
-                            aggregated_data[key] = {
-                                'dem_candidates': [],
-                                'rep_candidates': [],
-                                'other_candidates': [],
-                                'dem_votes': 0,
-                                'rep_votes': 0,
-                                'other_votes': 0,
-                                'total_votes': 0,
-                                'reported_pct': data['pct_reported']
-                            }
-                            
-                            # Process each candidate
-                            for party, candidate_data in data['candidates'].items():
-                                votes = candidate_data['votes']
-                                
-                                if party == 'D':
-                                    aggregated_data[key]['dem_candidates'].append(candidate_data['name'])
-                                    aggregated_data[key]['dem_votes'] += votes
-                                elif party == 'R':
-                                    aggregated_data[key]['rep_candidates'].append(candidate_data['name'])
-                                    aggregated_data[key]['rep_votes'] += votes
-                                else:
-                                    aggregated_data[key]['other_candidates'].append(candidate_data['name'])
-                                    aggregated_data[key]['other_votes'] += votes
-                                
-                                aggregated_data[key]['total_votes'] += votes
+                            aggregated_data[key] = DataFunctions.new_race_aggregate(data['pct_reported'])
+                            DataFunctions.add_race_data(aggregated_data[key], data, candidates)
         
         # Convert aggregated data to rows
-        grouped_rows = []
-        for (year, state_code, election_type, county), data in aggregated_data.items():
-            # For House races, calculate weighted average of reported percentage
-            if election_type == 'H' and data.get('district_weights', []):
-                weights = data['district_weights']
-                total_weight = sum(d['total_votes'] for d in weights)
-                if total_weight > 0:
-                    weighted_pct = sum(
-                        d['pct_reported'] * (d['total_votes'] / total_weight) 
-                        for d in weights
-                    )
-                    reported_pct = weighted_pct
-                else:
-                    reported_pct = None
-            else:
-                reported_pct = data.get('reported_pct')
-                
-            # Calculate vote percentages
-            total_votes = data['total_votes']
-            dem_pct = (data['dem_votes'] / total_votes * 100) if total_votes > 0 else None
-            rep_pct = (data['rep_votes'] / total_votes * 100) if total_votes > 0 else None
-            other_pct = (data['other_votes'] / total_votes * 100) if total_votes > 0 else None
-            
-            # Create row
-            grouped_row = ElectionDataGroupedRowModel(
-                election_year=year,
-                election_type=election_type,
-                state_code=state_code,
-                county=county,
-                dem_candidate='; '.join(data['dem_candidates']) if data['dem_candidates'] else None,
-                rep_candidate='; '.join(data['rep_candidates']) if data['rep_candidates'] else None,
-                other_candidate='; '.join(data['other_candidates']) if data['other_candidates'] else None,
-                reported_pct=reported_pct,
-                votes_total=total_votes,
-                votes_dem=data['dem_votes'],
-                votes_rep=data['rep_votes'],
-                votes_other=data['other_votes'],
-                votes_dem_pct=dem_pct,
-                votes_rep_pct=rep_pct,
-                votes_other_pct=other_pct
-            )
-            grouped_rows.append(grouped_row)
+        grouped_rows = [
+            DataFunctions.grouped_row(year, election_type, state_code, county, data, candidates)
+            for (year, state_code, election_type, county), data in aggregated_data.items()
+        ]
         
         return ElectionDataGroupedModel(data=grouped_rows)
 
 
         
-    @staticmethod        
+    @staticmethod
+    @instrumented('flatten')
     def flatten_grouped_election_data(grouped_data: ElectionDataGroupedModel) -> ElectionDataGroupedAndFlattenedModel:
         """
         Converts grouped election data into flattened format with one row per state/county
         """
-        # Dictionary to store flattened data, keyed by (state_code, county)
+        # Dictionary to store flattened data, keyed by county id (name variants across years share an id)
         flattened_data = {}
         
         # Process each row in grouped data
         for row in grouped_data.data:
-            key = (row.state_code, row.county)
+            key = row.county_id
             
             # Initialize new row if needed
             if key not in flattened_data:
                 flattened_data[key] = ElectionDataGroupedAndFlattenedRowModel(
                     state_code=row.state_code,
-                    county=row.county
+                    county=row.county,
+                    county_id=row.county_id
                 )
             
             # Map to flatten format field names
@@ -0,0 +1,297 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Union, Any, Callable, ClassVar
+
+
+@dataclass
+class StageRecord:
+    """One completed stage: wall time, rows produced and peak traced memory while it ran."""
+    name: str
+    start_ns: int
+    duration_ns: int = 0
+    rows: Optional[int] = None
+    peak_bytes: Optional[int] = None
+    thread_id: int = 0
+    args: Dict[str, Any] = field(default_factory=dict)
+
+
+class _Stage:
+    """Context manager returned by Instrumentation.stage while instrumentation is on. Set .rows inside the block."""
+
+    __slots__ = ('_owner', 'record', 'rows', '_peak')
+
+    def __init__(self, owner: 'Instrumentation', name: str, args: Dict[str, Any]):
+        self._owner = owner
+        self.record = StageRecord(name=name, start_ns=0, thread_id=threading.get_ident(), args=args)
+        self.rows: Optional[int] = None
+        self._peak = 0
+
+    def __enter__(self) -> '_Stage':
+        self._owner._push(self)
+        self.record.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.record.duration_ns = time.perf_counter_ns() - self.record.start_ns
+        self.record.rows = self.rows
+        if exc_type is not None:
+            self.record.args['error'] = exc_type.__name__
+        self._owner._pop(self)
+
+
+class _NullStage:
+    """Shared no-op stage used while instrumentation is off."""
+
+    __slots__ = ('rows',)
+
+    def __enter__(self) -> '_NullStage':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Instrumentation:
+    """
+    Records per-stage wall time, peak memory (tracemalloc) and row counts, plus per-request HTTP
+    latency, status and retry histograms. Off by default; while off, stage() returns a shared no-op
+    context and instrumented functions call straight through, so the cost is a flag check.
+
+    The report is a JSON summary; the trace is in trace-event format and loads in chrome://tracing
+    or https://ui.perfetto.dev.
+
+    Example:
+        Instrumentation.enable()
+        grouped = ElectionDataGroupedModel.load_from_csv(["data", "election_data_grouped.csv"])
+        flattened = DataFunctions.flatten_grouped_election_data(grouped)
+        Instrumentation.save_report(["data", "instrumentation_report.json"])
+        Instrumentation.save_trace(["data", "instrumentation_trace.json"])
+
+        with Instrumentation.stage("custom", state="PA") as stage:
+            stage.rows = len(rows)
+    """
+
+    # Upper bounds of the HTTP latency histogram buckets in milliseconds (last bucket is open ended)
+    LATENCY_BUCKETS_MS: ClassVar[List[float]] = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+    enabled: ClassVar[bool] = False
+    trace_memory: ClassVar[bool] = False
+
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    _local: ClassVar[threading.local] = threading.local()
+    _origin_ns: ClassVar[int] = 0
+    _stages: ClassVar[List[StageRecord]] = []
+    _requests: ClassVar[List[Dict[str, Any]]] = []
+    _started_tracemalloc: ClassVar[bool] = False
+
+    @classmethod
+    def enable(cls, trace_memory: bool = True) -> None:
+        """
+        Turns instrumentation on and clears previous records. trace_memory starts tracemalloc for peak
+        memory per stage; it slows allocation-heavy stages several times, so pass False for timings.
+        """
+        cls.reset()
+        cls.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            cls._started_tracemalloc = True
+        cls.enabled = True
+
+    @classmethod
+    def disable(cls) -> None:
+        """Turns instrumentation off. Records are kept until the next enable() or reset()."""
+        cls.enabled = False
+        if cls._started_tracemalloc:
+            tracemalloc.stop()
+            cls._started_tracemalloc = False
+        cls.trace_memory = False
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._origin_ns = time.perf_counter_ns()
+            cls._stages = []
+            cls._requests = []
+
+    @classmethod
+    def stage(cls, name: str, **args) -> Union[_Stage, _NullStage]:
+        """Returns a context manager timing a stage. Extra keyword args are kept in the trace event."""
+        if not cls.enabled:
+            return _NULL_STAGE
+        return _Stage(cls, name, args)
+
+    @classmethod
+    def _push(cls, stage: _Stage) -> None:
+        stack = getattr(cls._local, 'stack', None)
+        if stack is None:
+            stack = cls._local.stack = []
+        if cls.trace_memory and tracemalloc.is_tracing():
+            # Fold the peak so far into the enclosing stage before resetting it for this one
+            if stack:
+                stack[-1]._peak = max(stack[-1]._peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        stack.append(stage)
+
+    @classmethod
+    def _pop(cls, stage: _Stage) -> None:
+        stack = cls._local.stack
+        stack.pop()
+        if cls.trace_memory and tracemalloc.is_tracing():
+            stage._peak = max(stage._peak, tracemalloc.get_traced_memory()[1])
+            stage.record.peak_bytes = stage._peak
+            if stack:
+                stack[-1]._peak = max(stack[-1]._peak, stage._peak)
+        with cls._lock:
+            cls._stages.append(stage.record)
+
+    @classmethod
+    def record_request(cls, url: str, status: Optional[int], latency_s: float, attempt: int = 1, endpoint: Optional[str] = None) -> None:
+        """Records one HTTP request. status is None when the request raised. endpoint groups the histograms."""
+        if not cls.enabled:
+            return
+        end_ns = time.perf_counter_ns()
+        with cls._lock:
+            cls._requests.append({
+                'url': url,
+                'endpoint': endpoint or 'http',
+                'status': status,
+                'latency_ms': latency_s * 1000,
+                'attempt': attempt,
+                'end_ns': end_ns,
+                'thread_id': threading.get_ident(),
+            })
+
+    @classmethod
+    def _latency_bucket(cls, latency_ms: float) -> str:
+        for bound in cls.LATENCY_BUCKETS_MS:
+            if latency_ms <= bound:
+                return f"<={bound:g}ms"
+        return f">{cls.LATENCY_BUCKETS_MS[-1]:g}ms"
+
+    @classmethod
+    def report(cls) -> Dict[str, Any]:
+        """Returns a summary of stages (by name) and HTTP requests (by endpoint)."""
+        with cls._lock:
+            stage_records = list(cls._stages)
+            requests = list(cls._requests)
+
+        stages = {}
+        for record in stage_records:
+            s = stages.setdefault(record.name, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': None, 'peak_bytes': None})
+            ms = record.duration_ns / 1e6
+            s['calls'] += 1
+            s['total_ms'] += ms
+            s['max_ms'] = max(s['max_ms'], ms)
+            if record.rows is not None:
+                s['rows'] = (s['rows'] or 0) + record.rows
+            if record.peak_bytes is not None:
+                s['peak_bytes'] = max(s['peak_bytes'] or 0, record.peak_bytes)
+
+        http = {}
+        for endpoint in sorted({r['endpoint'] for r in requests}):
+            endpoint_requests = [r for r in requests if r['endpoint'] == endpoint]
+            latencies = sorted(r['latency_ms'] for r in endpoint_requests)
+            histogram = defaultdict(int)
+            statuses = defaultdict(int)
+            attempts = defaultdict(int)
+            for r in endpoint_requests:
+                histogram[cls._latency_bucket(r['latency_ms'])] += 1
+                statuses[str(r['status']) if r['status'] is not None else 'error'] += 1
+                attempts[str(r['attempt'])] += 1
+            http[endpoint] = {
+                'requests': len(endpoint_requests),
+                'retries': sum(1 for r in endpoint_requests if r['attempt'] > 1),
+                'total_ms': sum(latencies),
+                'p50_ms': latencies[len(latencies) // 2],
+                'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                'max_ms': latencies[-1],
+                'latency_histogram': {b: histogram[b] for b in [cls._latency_bucket(x) for x in cls.LATENCY_BUCKETS_MS + [float('inf')]] if b in histogram},
+                'status_histogram': dict(statuses),
+                'attempt_histogram': dict(attempts),
+            }
+
+        return {'stages': stages, 'http': http}
+
+    @classmethod
+    def trace_events(cls) -> List[Dict[str, Any]]:
+        """Returns stages and requests as complete ('X') trace events, timestamps in microseconds from enable()."""
+        pid = os.getpid()
+        with cls._lock:
+            stage_records = list(cls._stages)
+            requests = list(cls._requests)
+
+        events = []
+        for record in stage_records:
+            args = dict(record.args)
+            if record.rows is not None:
+                args['rows'] = record.rows
+            if record.peak_bytes is not None:
+                args['peak_bytes'] = record.peak_bytes
+            events.append({
+                'name': record.name, 'cat': 'stage', 'ph': 'X', 'pid': pid, 'tid': record.thread_id,
+                'ts': (record.start_ns - cls._origin_ns) / 1000, 'dur': record.duration_ns / 1000, 'args': args,
+            })
+        for r in requests:
+            dur = r['latency_ms'] * 1000
+            events.append({
+                'name': r['endpoint'], 'cat': 'http', 'ph': 'X', 'pid': pid, 'tid': r['thread_id'],
+                'ts': (r['end_ns'] - cls._origin_ns) / 1000 - dur, 'dur': dur,
+                'args': {'url': r['url'], 'status': r['status'], 'attempt': r['attempt']},
+            })
+        events.sort(key=lambda e: e['ts'])
+        return events
+
+    @classmethod
+    def save_report(cls, filename: Union[str, List[str]]) -> None:
+        """Saves the summary report to a JSON file."""
+        filepath = filename if isinstance(filename, str) else os.path.join(*filename)
+        with open(filepath, 'w') as f:
+            json.dump(cls.report(), f, indent=4)
+        print(f"Report saved to {filepath}")
+
+    @classmethod
+    def save_trace(cls, filename: Union[str, List[str]]) -> None:
+        """Saves a trace-event JSON file that can be opened in a trace viewer."""
+        filepath = filename if isinstance(filename, str) else os.path.join(*filename)
+        with open(filepath, 'w') as f:
+            json.dump({'traceEvents': cls.trace_events(), 'displayTimeUnit': 'ms'}, f)
+        print(f"Trace saved to {filepath}")
+
+
+def count_rows(result: Any) -> Optional[int]:
+    """Row count of a stage result: list length, length of a model's data list, or DataFrame length."""
+    if isinstance(result, list):
+        return len(result)
+    data = getattr(result, 'data', None)
+    if isinstance(data, list):
+        return len(data)
+    if hasattr(result, 'shape'):
+        return len(result)
+    return None
+
+
+def instrumented(name: str) -> Callable:
+    """
+    Decorator recording each call of a function as a stage with the row count of its result.
+    Apply it below @staticmethod / @classmethod.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not Instrumentation.enabled:
+                return func(*args, **kwargs)
+            with Instrumentation.stage(name) as stage:
+                result = func(*args, **kwargs)
+                stage.rows = count_rows(result)
+            return result
+        return wrapper
+    return decorator
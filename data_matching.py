@@ -0,0 +1,255 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Union, Iterable
+
+import numpy as np
+import pandas as pd
+
+from data_model import ElectionDataMap, ElectionYearStateCountyDistrictMap
+from data_registry import CountyRegistry
+
+
+@dataclass
+class CountyJoinResult:
+    """
+    Result of CountyNameIndex.join: joined is the left frame with the table's columns added (NaN
+    where no row matched); matches has one row per distinct (state_code, name) of the table with
+    the county_id and matched_name it resolved to, the method (exact, fuzzy, ambiguous or
+    unmatched), the trigram similarity score and, for ambiguous names, the tied candidates.
+    """
+    joined: pd.DataFrame
+    matches: pd.DataFrame
+
+    @property
+    def unmatched(self) -> pd.DataFrame:
+        return self.matches[self.matches['method'] == 'unmatched']
+
+    @property
+    def ambiguous(self) -> pd.DataFrame:
+        return self.matches[self.matches['method'] == 'ambiguous']
+
+
+class CountyNameIndex:
+    """
+    Matches county names from other sources (demographic or turnout tables, the district map) to
+    known counties, within each state.
+
+    Names are first compared on their match key: CountyRegistry.normalize (so "St. Louis" and
+    "Saint Louis" agree) after dropping the unit words other sources add (SOURCE_SUFFIXES, e.g.
+    "Acadia Parish"). "City" is kept, so "Richmond city" and "Richmond County" stay apart. Names
+    without an exact key are scored against the counties of their state by trigram similarity
+    (Dice coefficient of the key's trigram sets), found through an inverted index of
+    (state, trigram) postings. The best candidate is taken when it scores at least min_similarity
+    and beats the next one by margin; otherwise the name is reported as ambiguous.
+
+    Every lookup of a bulk match runs as array operations over all names at once.
+
+    Example:
+        index = CountyNameIndex.from_dataframe(analytics.df)
+        result = index.join(analytics.df, pd.read_csv("county_demographics.csv"), county_column="name")
+        result.unmatched, result.ambiguous
+        enriched = result.joined
+    """
+
+    # Unit words other sources append to county names, dropped before normalization
+    SOURCE_SUFFIXES = re.compile(r"\s+(parish|borough|census area|city and borough|municipality)$", re.IGNORECASE)
+    # Zero padding of numbered units ("Election District 01")
+    NUMBER_PADDING = re.compile(r"\b0+(?=\d)")
+    STATE_NAMES: Dict[str, str] = {name.lower(): code for code, name in ElectionDataMap.election_states.items()}
+
+    def __init__(
+        self,
+        state_codes: Iterable[str],
+        names: Iterable[str],
+        county_ids: Optional[Iterable[int]] = None,
+        registry: Optional[CountyRegistry] = None,
+        min_similarity: float = 0.5,
+        margin: float = 0.05
+    ):
+        self.registry = registry or CountyRegistry.default()
+        self.min_similarity = min_similarity
+        self.margin = margin
+        state_codes, names = list(state_codes), list(names)
+        county_ids = list(county_ids) if county_ids is not None else self.registry.get_ids(state_codes, names).tolist()
+
+        # One target per (state, key, county id); the first name seen is the one reported
+        targets: Dict[Tuple[str, str, int], str] = {}
+        for state_code, name, county_id in zip(state_codes, names, county_ids):
+            targets.setdefault((state_code, self.key(state_code, name), int(county_id)), name)
+        self.target_states = [state for state, _, _ in targets]
+        self.target_keys = [key for _, key, _ in targets]
+        self.target_ids = np.array([county_id for _, _, county_id in targets], dtype=np.int64)
+        self.target_names = list(targets.values())
+
+        self._exact: Dict[Tuple[str, str], List[int]] = {}
+        for i, (state_code, key) in enumerate(zip(self.target_states, self.target_keys)):
+            self._exact.setdefault((state_code, key), []).append(i)
+
+        # Inverted index: (state, trigram) ids sorted, with the target of each posting
+        self._grams: Dict[Tuple[str, str], int] = {}
+        gram_ids, gram_targets = self._gram_pairs(self.target_states, self.target_keys, register=True)
+        order = np.argsort(gram_ids, kind='stable')
+        self._posting_grams = gram_ids[order]
+        self._posting_targets = gram_targets[order]
+        self._target_sizes = np.bincount(gram_targets, minlength=len(self.target_keys))
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, **kwargs) -> 'CountyNameIndex':
+        """Index of the counties of a flattened frame (state_code, county and county_id)."""
+        return cls(df['state_code'].tolist(), df['county'].tolist(), df['county_id'].tolist(), **kwargs)
+
+    @classmethod
+    def from_district_map(cls, year_state_county_district_map: ElectionYearStateCountyDistrictMap, **kwargs) -> 'CountyNameIndex':
+        """Index of the county spellings of the district map, all years."""
+        pairs = [(state, county) for states in year_state_county_district_map.data.values() for state, state_map in states.items() for county in state_map["counties"]]
+        return cls([s for s, _ in pairs], [c for _, c in pairs], **kwargs)
+
+    def key(self, state_code: str, name: str) -> str:
+        """Match key of a name: suffixes and number padding of other sources dropped, then CountyRegistry.normalize."""
+        name = self.NUMBER_PADDING.sub('', self.SOURCE_SUFFIXES.sub('', str(name).strip()))
+        return self.registry.normalize(state_code, name)
+
+    @staticmethod
+    def trigrams(key: str) -> List[str]:
+        """Distinct trigrams of a key, padded so short keys and word starts/ends count."""
+        padded = f"^{key}$"
+        return list(dict.fromkeys(padded[i:i + 3] for i in range(len(padded) - 2)))
+
+    def _gram_pairs(self, states: List[str], keys: List[str], register: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """(state trigram id, position) pairs of keys; unknown trigrams are skipped unless register."""
+        gram_ids, positions = [], []
+        for i, (state_code, key) in enumerate(zip(states, keys)):
+            for gram in self.trigrams(key):
+                gram_id = self._grams.get((state_code, gram))
+                if gram_id is None:
+                    if not register:
+                        continue
+                    gram_id = self._grams[(state_code, gram)] = len(self._grams)
+                gram_ids.append(gram_id)
+                positions.append(i)
+        return np.array(gram_ids, dtype=np.int64), np.array(positions, dtype=np.int64)
+
+    def _state_code(self, state: str) -> str:
+        state = str(state).strip()
+        return self.STATE_NAMES.get(state.lower(), state.upper())
+
+    def _fuzzy(self, states: List[str], keys: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[List[int]]]:
+        """Best target, its score, the runner-up score and the tied targets of each key, all keys at once."""
+        n = len(keys)
+        best, best_score, second_score = np.full(n, -1, dtype=np.int64), np.zeros(n), np.zeros(n)
+        ties: List[List[int]] = [[] for _ in range(n)]
+        query_sizes = np.array([len(self.trigrams(k)) for k in keys], dtype=np.int64)
+        gram_ids, queries = self._gram_pairs(states, keys)
+        if len(gram_ids) == 0:
+            return best, best_score, second_score, ties
+
+        # Expand each query trigram into the postings of that trigram
+        lo = np.searchsorted(self._posting_grams, gram_ids, side='left')
+        hi = np.searchsorted(self._posting_grams, gram_ids, side='right')
+        counts = hi - lo
+        starts = np.repeat(lo - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+        targets = self._posting_targets[starts + np.arange(counts.sum())]
+        pair_queries = np.repeat(queries, counts)
+
+        # Shared trigrams per (query, target) pair, then the Dice coefficient
+        codes, shared = np.unique(pair_queries * len(self.target_keys) + targets, return_counts=True)
+        pair_queries, pair_targets = codes // len(self.target_keys), codes % len(self.target_keys)
+        scores = 2 * shared / (query_sizes[pair_queries] + self._target_sizes[pair_targets])
+
+        # Rank the candidates of each query by score
+        order = np.lexsort((-scores, pair_queries))
+        pair_queries, pair_targets, scores = pair_queries[order], pair_targets[order], scores[order]
+        first = np.flatnonzero(np.concatenate([[True], pair_queries[1:] != pair_queries[:-1]]))
+        best[pair_queries[first]] = pair_targets[first]
+        best_score[pair_queries[first]] = scores[first]
+        nxt = np.minimum(first + 1, len(pair_queries) - 1)
+        has_second = (first + 1 < len(pair_queries)) & (pair_queries[nxt] == pair_queries[first])
+        second_score[pair_queries[first[has_second]]] = scores[nxt[has_second]]
+
+        close = np.flatnonzero(best_score - second_score < self.margin)
+        close_mask = np.isin(pair_queries, close) & (scores >= best_score[pair_queries] - self.margin)
+        for query, target in zip(pair_queries[close_mask].tolist(), pair_targets[close_mask].tolist()):
+            ties[query].append(target)
+        return best, best_score, second_score, ties
+
+    def match(self, states: Iterable[str], names: Iterable[str]) -> pd.DataFrame:
+        """
+        Resolves names to counties. Returns one row per input with state_code, name, county_id
+        (-1 when not resolved), matched_name, method, score and candidates.
+        """
+        states = [self._state_code(s) for s in states]
+        names = [str(n) for n in names]
+        unique = pd.DataFrame({'state_code': states, 'name': names}).drop_duplicates(ignore_index=True)
+        unique_states, unique_names = unique['state_code'].tolist(), unique['name'].tolist()
+        keys = [self.key(s, n) for s, n in zip(unique_states, unique_names)]
+
+        n = len(unique)
+        target = np.full(n, -1, dtype=np.int64)
+        method = np.full(n, 'unmatched', dtype=object)
+        score = np.zeros(n)
+        candidates: List[Optional[str]] = [None] * n
+
+        exact = [self._exact.get((s, k), []) for s, k in zip(unique_states, keys)]
+        for i, hits in enumerate(exact):
+            if len({int(self.target_ids[t]) for t in hits}) == 1:
+                target[i], method[i], score[i] = hits[0], 'exact', 1.0
+            elif hits:
+                method[i] = 'ambiguous'
+                candidates[i] = '; '.join(self.target_names[t] for t in hits)
+
+        fuzzy = np.flatnonzero(method == 'unmatched')
+        if len(fuzzy):
+            best, best_score, second_score, ties = self._fuzzy([unique_states[i] for i in fuzzy], [keys[i] for i in fuzzy])
+            accepted = (best >= 0) & (best_score >= self.min_similarity)
+            distinct = best_score - second_score >= self.margin
+            for j, i in enumerate(fuzzy.tolist()):
+                if not accepted[j]:
+                    continue
+                score[i] = best_score[j]
+                if distinct[j] or len({int(self.target_ids[t]) for t in ties[j]}) <= 1:
+                    target[i], method[i] = best[j], 'fuzzy'
+                else:
+                    method[i] = 'ambiguous'
+                    candidates[i] = '; '.join(self.target_names[t] for t in ties[j])
+
+        resolved = target >= 0
+        unique['county_id'] = np.where(resolved, self.target_ids[np.maximum(target, 0)] if len(self.target_ids) else -1, -1)
+        unique['matched_name'] = [self.target_names[t] if t >= 0 else None for t in target.tolist()]
+        unique['method'] = method
+        unique['score'] = score
+        unique['candidates'] = candidates
+        return pd.DataFrame({'state_code': states, 'name': names}).merge(unique, on=['state_code', 'name'], how='left')
+
+    def join(
+        self,
+        df: pd.DataFrame,
+        table: Union[pd.DataFrame, str, List[str]],
+        state_column: str = 'state_code',
+        county_column: str = 'county',
+        columns: Optional[List[str]] = None
+    ) -> CountyJoinResult:
+        """
+        Left-joins a county table (a frame or CSV path) to df on county_id, resolving the table's
+        names with match(). columns picks the table columns to add (default: all but the name
+        columns); colliding names get a _table suffix. Table rows resolving to the same county
+        are an error, listed in the raised exception.
+        """
+        if not isinstance(table, pd.DataFrame):
+            table = pd.read_csv(table if isinstance(table, str) else os.path.join(*table))
+        matched = self.match(table[state_column].tolist(), table[county_column].tolist())
+        columns = columns or [c for c in table.columns if c not in (state_column, county_column)]
+
+        values = table[columns].copy()
+        values.columns = [f"{c}_table" if c in df.columns else c for c in columns]
+        values['county_id'] = matched['county_id'].to_numpy()
+        values = values[values['county_id'] >= 0]
+        duplicated = values['county_id'].duplicated(keep=False)
+        if duplicated.any():
+            rows = matched.loc[values.index[duplicated]]
+            raise Exception(f"Several table rows resolve to the same county: {rows[['state_code', 'name', 'matched_name']].to_dict('records')}")
+
+        joined = df.merge(values, on='county_id', how='left', sort=False)
+        joined.index = df.index
+        matches = matched.drop_duplicates(['state_code', 'name'], ignore_index=True)
+        return CountyJoinResult(joined, matches)
@@ -1,7 +1,23 @@
+import sys
 from dataclasses import dataclass, asdict, fields, is_dataclass
-from typing import List, Type, TypeVar, Union, Dict, Any, Optional, Generic, ClassVar
+from typing import List, Type, TypeVar, Union, Dict, Any, Optional, Generic, ClassVar, Tuple
 
 from data_classes import *
+from data_registry import CountyRegistry, CandidateRegistry
+
+
+class CandidateListCodec(FieldCodec):
+    """Candidate column codec: a tuple of CandidateRegistry ids in memory, "; " joined labels in files."""
+
+    def __init__(self, party: str):
+        # Party given to candidates first seen in this column (other candidates are 'O' when loaded from files)
+        self.party = party
+
+    def encode(self, value: Optional[Tuple[int, ...]]) -> Optional[str]:
+        return CandidateRegistry.default().encode(value)
+
+    def decode(self, value: Optional[str]) -> Optional[Tuple[int, ...]]:
+        return CandidateRegistry.default().decode(value, self.party)
 
 class ElectionDataMap:
     
@@ -92,8 +108,23 @@ class ElectionYearStateCountyDistrictMap(JsonFileData):
     """
     data: Dict[int, Dict[str, Dict[str, Dict[str, List[int]]]]] = field(default_factory=dict)
 
+    def __post_init__(self):
+        # Share one string object per county name across the counties lists and county_districts keys
+        for states in self.data.values():
+            for state_data in states.values():
+                state_data["counties"] = [sys.intern(c) for c in state_data["counties"]]
+                state_data["county_districts"] = {sys.intern(c): d for c, d in state_data["county_districts"].items()}
+
+    def county_districts_by_id(self, year: Union[int, str]) -> Dict[int, List[int]]:
+        """Returns the county districts of a year keyed by CountyRegistry county id."""
+        registry = CountyRegistry.default()
+        year_data = self.data[year] if year in self.data else self.data[str(year)]
+        return {
+            registry.get_id(state_code, county): districts
+            for state_code, state_data in year_data.items()
+            for county, districts in state_data["county_districts"].items()
+        }
 
-    
 
 @dataclass
 class ElectionDataFullModel(JsonFileData):
@@ -185,9 +216,10 @@ class ElectionDataGroupedRowModel(RowModel):
     election_type: str
     state_code: str
     county: str
-    dem_candidate: Optional[str] = None
-    rep_candidate: Optional[str] = None
-    other_candidate: Optional[str] = None
+    # Candidate ids (CandidateRegistry) in memory, written to files as "; " joined labels
+    dem_candidate: Optional[Tuple[int, ...]] = field(default=None, metadata={'codec': CandidateListCodec('D')})
+    rep_candidate: Optional[Tuple[int, ...]] = field(default=None, metadata={'codec': CandidateListCodec('R')})
+    other_candidate: Optional[Tuple[int, ...]] = field(default=None, metadata={'codec': CandidateListCodec('O')})
     reported_pct: Optional[float] = None
     votes_total: Optional[int] = None
     votes_dem: Optional[int] = None
@@ -196,12 +228,30 @@ class ElectionDataGroupedRowModel(RowModel):
     votes_dem_pct: Optional[float] = None
     votes_rep_pct: Optional[float] = None
     votes_other_pct: Optional[float] = None
+    # Derived integer key from CountyRegistry, not written to files
+    county_id: Optional[int] = field(default=None, compare=False, metadata={'persist': False})
+
+    def __post_init__(self):
+        # Repeated names share one string object per distinct value
+        self.election_type = sys.intern(self.election_type)
+        self.state_code = sys.intern(self.state_code)
+        self.county = sys.intern(self.county)
+        self.decode_fields()
+        if self.county_id is None:
+            self.county_id = CountyRegistry.default().get_id(self.state_code, self.county)
 
 
 @dataclass
 class ElectionDataGroupedModel(CsvFileData[ElectionDataGroupedRowModel]):
     data: List[ElectionDataGroupedRowModel]
 
+    db_table: ClassVar[str] = 'election_data_grouped'
+    db_indexes: ClassVar[List[tuple]] = [
+        ('state_code', 'county'),
+        ('election_year', 'election_type'),
+        ('state_code',),
+    ]
+
     @property
     def row_model(self) -> Type[ElectionDataGroupedRowModel]:
         return ElectionDataGroupedRowModel
@@ -295,6 +345,15 @@ class ElectionDataGroupedAndFlattenedRowModel(RowModel):
     gov_total_votes_other_pct_2020: Optional[float] = None
     gov_pct_reported_2020: Optional[float] = None
 
+    # Derived integer key from CountyRegistry, not written to files
+    county_id: Optional[int] = field(default=None, compare=False, metadata={'persist': False})
+
+    def __post_init__(self):
+        self.state_code = sys.intern(self.state_code)
+        self.county = sys.intern(self.county)
+        if self.county_id is None:
+            self.county_id = CountyRegistry.default().get_id(self.state_code, self.county)
+
 
 
 
@@ -303,6 +362,12 @@ class ElectionDataGroupedAndFlattenedModel(CsvFileData[ElectionDataGroupedAndFla
     """Model for flattened election data that can be saved/loaded from CSV"""
     data: List[ElectionDataGroupedAndFlattenedRowModel]
 
+    db_table: ClassVar[str] = 'election_data_grouped_and_flattened'
+    db_indexes: ClassVar[List[tuple]] = [
+        ('state_code', 'county'),
+        ('state_code',),
+    ]
+
     @property
     def row_model(self) -> Type[ElectionDataGroupedAndFlattenedRowModel]:
         return ElectionDataGroupedAndFlattenedRowModel
\ No newline at end of file
@@ -0,0 +1,207 @@
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_analytics import DataAnalytics
+from data_instrumentation import Instrumentation
+
+
+class FinalCountProjection:
+    """
+    Projects final vote counts of partially reported counties from pct_reported and the reported
+    party split, and propagates the uncertainty of the outstanding vote into the DataAnalytics
+    metrics by Monte Carlo simulation.
+
+    For a race reported at p percent with total T, the expected outstanding vote is T * (100 - p) / p.
+    Each draw scales it by a lognormal turnout factor (mean 1, turnout_sigma) and splits it between the
+    parties with the reported two-party share shifted on the logit scale by a normal draw (shift_sigma),
+    the other-party share kept as reported. Both draws are shared by all races of a county and year,
+    since the outstanding ballots are the same ballots. Races with pct_reported missing, 0 or 100 keep
+    their reported counts.
+
+    Draws are simulated in chunks sized to memory_mb, all counties at once. Per-county results are
+    accumulated into fixed histograms, so memory stays bounded for any number of draws. The bins
+    span the range of a pilot sample of PILOT_DRAWS draws (its own random stream, widened by half
+    the range on each side), not of the first chunk, so interval quantiles do not depend on the
+    chunk size.
+
+    Example:
+        projection = FinalCountProjection(analytics.df)
+        projected = DataAnalytics.from_dataframe(projection.expected())
+        intervals = projection.simulate(draws=100000, memory_mb=256)
+        intervals[['state_code', 'county', 'pres_house_ratio_change', 'pres_house_ratio_change_q05', 'pres_house_ratio_change_q95']]
+    """
+
+    RACES = ['pres', 'senate', 'house', 'gov']
+    PARTIES = ['dem', 'rep']
+    YEARS = ['2024', '2020']
+    DEFAULT_METRICS = ['pres_house_ratio_2024', 'pres_house_ratio_change', 'split_ticket_2024', 'split_ticket_change']
+    DEFAULT_QUANTILES = [0.05, 0.5, 0.95]
+    HISTOGRAM_BINS = 256
+    PILOT_DRAWS = 500
+
+    # Float arrays alive per simulated county-draw while computing the metrics (inputs, draws,
+    # metrics and numpy temporaries), used to size chunks
+    ARRAYS_PER_DRAW = 64
+
+    def __init__(self, df: pd.DataFrame, turnout_sigma: float = 0.2, shift_sigma: float = 0.15, seed: int = 0):
+        self.df = df
+        self.turnout_sigma = turnout_sigma
+        self.shift_sigma = shift_sigma
+        self.seed = seed
+
+    def _race(self, race: str, year: str) -> Dict[str, np.ndarray]:
+        """Reported counts of a race with the expected outstanding vote and the outstanding vote split."""
+        def column(name: str) -> np.ndarray:
+            return self.df[name].to_numpy(dtype=np.float64) if name in self.df.columns else np.full(len(self.df), np.nan)
+
+        total = column(f'{race}_total_votes_{year}')
+        dem = column(f'{race}_total_votes_dem_{year}')
+        rep = column(f'{race}_total_votes_rep_{year}')
+        pct = column(f'{race}_pct_reported_{year}')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            projectable = (pct > 0) & (pct < 100) & (total > 0)
+            outstanding = np.where(projectable, total * (100 - pct) / pct, 0.0)
+            two_party = np.nan_to_num(dem) + np.nan_to_num(rep)
+            dem_share = np.where(two_party > 0, np.nan_to_num(dem) / two_party, 0.5)
+            two_party_fraction = np.where(total > 0, two_party / total, 0.0)
+        return {
+            'total': total, 'dem': dem, 'rep': rep, 'outstanding': outstanding,
+            'dem_logit': np.log(np.clip(dem_share, 1e-6, 1 - 1e-6) / np.clip(1 - dem_share, 1e-6, 1 - 1e-6)),
+            'two_party_fraction': two_party_fraction,
+        }
+
+    def expected(self) -> pd.DataFrame:
+        """Copy of df with every race's counts projected to 100% reporting at the reported split."""
+        df = self.df.copy()
+        for year in self.YEARS:
+            for race in self.RACES:
+                if f'{race}_total_votes_{year}' not in df.columns:
+                    continue
+                r = self._race(race, year)
+                df[f'{race}_total_votes_{year}'] = r['total'] + r['outstanding']
+                dem_out = r['outstanding'] * r['two_party_fraction'] / (1 + np.exp(-r['dem_logit']))
+                rep_out = r['outstanding'] * r['two_party_fraction'] - dem_out
+                df[f'{race}_total_votes_dem_{year}'] = r['dem'] + dem_out
+                df[f'{race}_total_votes_rep_{year}'] = r['rep'] + rep_out
+                if f'{race}_pct_reported_{year}' in df.columns:
+                    df[f'{race}_pct_reported_{year}'] = np.where(r['outstanding'] > 0, 100.0, df[f'{race}_pct_reported_{year}'])
+        return df
+
+    def _draw(self, races: Dict[Tuple[str, str], Dict[str, np.ndarray]], draws: int, rng: np.random.Generator) -> Dict[str, np.ndarray]:
+        """Simulated counts, one row per draw, and the DataAnalytics metrics computed on them."""
+        n = len(self.df)
+        columns = {}
+        for year in self.YEARS:
+            # Only counties with outstanding votes this year need draws (most of 2020 is final)
+            active = (races[('pres', year)]['outstanding'] > 0) | (races[('house', year)]['outstanding'] > 0)
+            turnout = np.ones((draws, n))
+            shift = np.zeros((draws, n))
+            if active.any():
+                turnout[:, active] = rng.lognormal(-self.turnout_sigma ** 2 / 2, self.turnout_sigma, size=(draws, int(active.sum())))
+                shift[:, active] = rng.normal(0, self.shift_sigma, size=(draws, int(active.sum())))
+            for race in ('pres', 'house'):
+                r = races[(race, year)]
+                outstanding = r['outstanding'] * turnout
+                two_party_out = outstanding * r['two_party_fraction']
+                dem_out = two_party_out / (1 + np.exp(-(r['dem_logit'] + shift)))
+                columns[f'{race}_total_votes_{year}'] = r['total'] + outstanding
+                columns[f'{race}_total_votes_dem_{year}'] = r['dem'] + dem_out
+                columns[f'{race}_total_votes_rep_{year}'] = r['rep'] + (two_party_out - dem_out)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            DataAnalytics._calculate_all_metrics(columns)
+        return columns
+
+    def _bin_ranges(self, races: Dict[Tuple[str, str], Dict[str, np.ndarray]], metrics: List[str], chunk: int) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """Per-county histogram lower bound and bin width of each metric, from a pilot sample."""
+        n, bins = len(self.df), self.HISTOGRAM_BINS
+        rng = np.random.default_rng((self.seed, 1))
+        lo = {m: np.full(n, np.inf) for m in metrics}
+        hi = {m: np.full(n, -np.inf) for m in metrics}
+        done = 0
+        while done < self.PILOT_DRAWS:
+            size = min(chunk, self.PILOT_DRAWS - done)
+            columns = self._draw(races, size, rng)
+            for m in metrics:
+                finite = np.isfinite(columns[m])
+                lo[m] = np.minimum(lo[m], np.where(finite, columns[m], np.inf).min(axis=0))
+                hi[m] = np.maximum(hi[m], np.where(finite, columns[m], -np.inf).max(axis=0))
+            done += size
+
+        lower, width = {}, {}
+        for m in metrics:
+            # Widened by half the pilot range on each side, so the bins cover draws past the pilot's extremes
+            seen = np.isfinite(lo[m])
+            low, high = np.where(seen, lo[m], 0.0), np.where(seen, hi[m], 0.0)
+            span = np.where(high > low, high - low, np.maximum(np.abs(low), 1e-9) * 1e-3)
+            lower[m] = low - span / 2
+            width[m] = 2 * span / bins
+        return lower, width
+
+    def simulate(
+        self,
+        draws: int = 10000,
+        metrics: Optional[List[str]] = None,
+        quantiles: Optional[List[float]] = None,
+        memory_mb: float = 256
+    ) -> pd.DataFrame:
+        """
+        Runs the Monte Carlo simulation and returns, per county, each metric at the expected projection
+        plus its simulated mean and quantiles (columns <metric>, <metric>_mean, <metric>_q05, ...).
+        Deterministic for a given seed and memory_mb.
+        """
+        metrics = metrics or self.DEFAULT_METRICS
+        quantiles = quantiles or self.DEFAULT_QUANTILES
+        n, bins = len(self.df), self.HISTOGRAM_BINS
+        # The per-county histograms are fixed; the rest of the budget sets the draws per chunk
+        histogram_bytes = len(metrics) * n * bins * 4
+        draw_bytes = n * 8 * self.ARRAYS_PER_DRAW
+        if memory_mb * 2 ** 20 < histogram_bytes + draw_bytes:
+            raise Exception(f"memory_mb={memory_mb} cannot hold the histograms of {len(metrics)} metrics for {n} counties "
+                            f"and one draw; at least {(histogram_bytes + draw_bytes) / 2 ** 20:.1f}MB is needed")
+        chunk = int(min(draws, (memory_mb * 2 ** 20 - histogram_bytes) // draw_bytes))
+        rng = np.random.default_rng(self.seed)
+        races = {(race, year): self._race(race, year) for race in ('pres', 'house') for year in self.YEARS}
+
+        counts = {m: np.zeros(n * bins, dtype=np.int32) for m in metrics}
+        sums = {m: np.zeros(n) for m in metrics}
+        finite_draws = {m: np.zeros(n, dtype=np.int64) for m in metrics}
+        offsets = np.arange(n) * bins
+
+        with Instrumentation.stage('projection.simulate', draws=draws, chunk=chunk) as stage:
+            lower, width = self._bin_ranges(races, metrics, chunk)
+            done = 0
+            while done < draws:
+                size = min(chunk, draws - done)
+                columns = self._draw(races, size, rng)
+                for m in metrics:
+                    values = columns[m]
+                    finite = np.isfinite(values)
+                    index = np.clip(np.where(finite, (values - lower[m]) / width[m], 0), 0, bins - 1).astype(np.int64) + offsets
+                    counts[m] += np.bincount(index[finite], minlength=n * bins).astype(np.int32)
+                    sums[m] += np.where(finite, values, 0).sum(axis=0)
+                    finite_draws[m] += finite.sum(axis=0)
+                done += size
+            stage.rows = n
+
+        point = self.expected()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            DataAnalytics._calculate_all_metrics(point)
+        result = pd.DataFrame({c: self.df[c].to_numpy() for c in ('state_code', 'county', 'county_id') if c in self.df.columns}, index=self.df.index)
+        for m in metrics:
+            result[m] = point[m].to_numpy()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result[f'{m}_mean'] = np.where(finite_draws[m] > 0, sums[m] / finite_draws[m], np.nan)
+            cumulative = np.cumsum(counts[m].reshape(n, bins), axis=1)
+            for q in quantiles:
+                # Linear interpolation inside the bin holding the q-th draw
+                target = q * finite_draws[m]
+                b = np.minimum((cumulative < target[:, None]).sum(axis=1), bins - 1)
+                before = np.where(b > 0, cumulative[np.arange(n), b - 1], 0)
+                in_bin = cumulative[np.arange(n), b] - before
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    fraction = np.where(in_bin > 0, (target - before) / in_bin, 0.5)
+                values = lower[m] + (b + np.clip(fraction, 0, 1)) * width[m]
+                result[f'{m}_q{round(q * 100):02d}'] = np.where(finite_draws[m] > 0, values, np.nan)
+        return result
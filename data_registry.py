@@ -0,0 +1,309 @@
+import csv
+import os
+import re
+from typing import List, Dict, Optional, Tuple, Union, Iterable, ClassVar, TYPE_CHECKING
+
+# numpy and pandas are imported on first use to keep module import cheap
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+
+class CountyRegistry:
+    """
+    Assigns dense integer ids to counties so joins, grouping and set-membership tests can run on
+    integer arrays instead of (state_code, county) string tuples.
+
+    County names are matched on a normalized key (see NORMALIZATION_RULES and NAME_ALIASES), so
+    spellings that differ between sources or election years ("St. Lawrence" / "Saint Lawrence",
+    "Utah County" / "Utah") resolve to the same id. The display name kept for an id is the first
+    spelling registered.
+
+    FIPS codes are available for every state, and for counties when a local reference table is
+    present: data/county_fips.csv (columns state_code, county, fips) or the Census Bureau's
+    national county file saved as data/national_county2020.txt. Neither is shipped with the
+    repository, so without one fips() returns None for every county.
+
+    Example:
+        registry = CountyRegistry.default()
+        county_id = registry.get_id("MO", "St. Louis County")
+        registry.name(county_id), registry.fips(county_id)
+        swing_mask = np.isin(registry.county_state_ids[df["county_id"]], registry.state_ids(["PA", "MI"]))
+    """
+
+    STATE_FIPS: ClassVar[Dict[str, str]] = {
+        "AL": "01", "AK": "02", "AZ": "04", "AR": "05", "CA": "06", "CO": "08", "CT": "09", "DE": "10",
+        "FL": "12", "GA": "13", "HI": "15", "ID": "16", "IL": "17", "IN": "18", "IA": "19", "KS": "20",
+        "KY": "21", "LA": "22", "ME": "23", "MD": "24", "MA": "25", "MI": "26", "MN": "27", "MS": "28",
+        "MO": "29", "MT": "30", "NE": "31", "NV": "32", "NH": "33", "NJ": "34", "NM": "35", "NY": "36",
+        "NC": "37", "ND": "38", "OH": "39", "OK": "40", "OR": "41", "PA": "42", "RI": "44", "SC": "45",
+        "SD": "46", "TN": "47", "TX": "48", "UT": "49", "VT": "50", "VA": "51", "WA": "53", "WV": "54",
+        "WI": "55", "WY": "56", "DC": "11",
+    }
+
+    # Regex rules applied in order to a lower-cased county name to build its match key
+    NORMALIZATION_RULES: ClassVar[List[Tuple[str, str]]] = [
+        (r"[’'`.]", ""),         # Hart's Location / Harts Location, St. Lawrence / St Lawrence
+        (r"\bsaint\b", "st"),          # Saint Lawrence / St Lawrence
+        (r"\s+county$", ""),           # Utah County / Utah (but keeps "Baltimore City" distinct)
+        (r"[^a-z0-9]", ""),            # De Witt / DeWitt, La Salle / LaSalle
+    ]
+
+    # State-scoped aliases (normalized key -> normalized key) for spellings no general rule covers
+    NAME_ALIASES: ClassVar[Dict[Tuple[str, str], str]] = {
+        ("LA", "jeffdavis"): "jeffersondavis",
+        ("MS", "jeffdavis"): "jeffersondavis",
+        ("ME", "oldorchrdbch"): "oldorchardbeach",
+        ("ME", "piscataquisctytownshps"): "piscataquisctytownships",
+    }
+
+    # Looked for in order by default(); the first one present is loaded
+    DEFAULT_FIPS_TABLES: ClassVar[List[List[str]]] = [["data", "county_fips.csv"], ["data", "national_county2020.txt"]]
+    # Unit words of Census county names that election results leave out ("Acadia Parish")
+    CENSUS_SUFFIXES: ClassVar['re.Pattern'] = re.compile(r"\s+(parish|borough|census area|city and borough|municipality)$", re.IGNORECASE)
+
+    _default: ClassVar[Optional['CountyRegistry']] = None
+
+    def __init__(self):
+        self.states: List[str] = list(self.STATE_FIPS.keys())
+        self._state_index: Dict[str, int] = {s: i for i, s in enumerate(self.states)}
+        self._names: List[str] = []
+        self._state_of_county: List[int] = []
+        self._fips: List[Optional[str]] = []
+        self._ids: Dict[Tuple[str, str], int] = {}         # (state_code, normalized key) -> id
+        self._raw_ids: Dict[Tuple[str, str], int] = {}     # (state_code, raw name) -> id, lookup cache
+        self._county_fips: Dict[Tuple[str, str], str] = {}  # (state_code, normalized key) -> fips
+        self._county_state_ids: Optional['np.ndarray'] = None
+        self._compiled_rules = [(re.compile(p), r) for p, r in self.NORMALIZATION_RULES]
+
+    @classmethod
+    def default(cls) -> 'CountyRegistry':
+        """Returns the process-wide registry shared by all models, loading the local FIPS table if present."""
+        if cls._default is None:
+            registry = cls()
+            for fips_table in cls.DEFAULT_FIPS_TABLES:
+                if os.path.exists(os.path.join(*fips_table)):
+                    registry.load_fips_table(fips_table)
+                    break
+            cls._default = registry
+        return cls._default
+
+    def normalize(self, state_code: str, county: str) -> str:
+        """Returns the match key of a county name within its state."""
+        key = county.strip().lower()
+        for pattern, replacement in self._compiled_rules:
+            key = pattern.sub(replacement, key)
+        return self.NAME_ALIASES.get((state_code, key), key)
+
+    def state_id(self, state_code: str) -> int:
+        if state_code not in self._state_index:
+            self._state_index[state_code] = len(self.states)
+            self.states.append(state_code)
+        return self._state_index[state_code]
+
+    def state_ids(self, state_codes: Iterable[str]) -> 'np.ndarray':
+        """Returns the integer ids of the states, e.g. for np.isin masks."""
+        import numpy as np
+        return np.array([self.state_id(s) for s in state_codes], dtype=np.int64)
+
+    def get_id(self, state_code: str, county: str) -> int:
+        """Returns the id of a county, registering it on first sight."""
+        county_id = self._raw_ids.get((state_code, county))
+        if county_id is not None:
+            return county_id
+
+        key = (state_code, self.normalize(state_code, county))
+        county_id = self._ids.get(key)
+        if county_id is None:
+            county_id = len(self._names)
+            self._ids[key] = county_id
+            self._names.append(county)
+            self._state_of_county.append(self.state_id(state_code))
+            self._fips.append(self._county_fips.get(key))
+            self._county_state_ids = None
+        self._raw_ids[(state_code, county)] = county_id
+        return county_id
+
+    def get_ids(self, state_codes: Iterable[str], counties: Iterable[str]) -> 'np.ndarray':
+        """Returns the ids of many counties as an integer array."""
+        import numpy as np
+        return np.fromiter((self.get_id(s, c) for s, c in zip(state_codes, counties)), dtype=np.int64)
+
+    def find_id(self, state_code: str, county: str) -> Optional[int]:
+        """Returns the id of a county without registering it, or None if unknown."""
+        county_id = self._raw_ids.get((state_code, county))
+        if county_id is not None:
+            return county_id
+        return self._ids.get((state_code, self.normalize(state_code, county)))
+
+    def name(self, county_id: int) -> str:
+        return self._names[county_id]
+
+    def state_code(self, county_id: int) -> str:
+        return self.states[self._state_of_county[county_id]]
+
+    def fips(self, county_id: int) -> Optional[str]:
+        """Returns the 5-digit county FIPS code, or None when the reference table doesn't cover the county."""
+        return self._fips[county_id]
+
+    @property
+    def county_state_ids(self) -> 'np.ndarray':
+        """State id of every county id, so county id arrays map to state ids with a single take."""
+        import numpy as np
+        if self._county_state_ids is None or len(self._county_state_ids) != len(self._state_of_county):
+            self._county_state_ids = np.array(self._state_of_county, dtype=np.int64)
+        return self._county_state_ids
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def load_fips_table(self, filename: Union[str, List[str]]) -> None:
+        """
+        Loads county FIPS codes from a CSV with columns state_code, county and fips (5 digits, or the
+        3-digit county part which is prefixed with the state FIPS code), or from the Census Bureau's
+        pipe-delimited national county file (STATE|STATEFP|COUNTYFP|...|COUNTYNAME|...).
+        """
+        filepath = filename if isinstance(filename, str) else os.path.join(*filename)
+        with open(filepath, 'r', newline='', encoding='utf-8-sig') as f:
+            census = '|' in f.readline()
+            f.seek(0)
+            for row in csv.DictReader(f, delimiter='|' if census else ','):
+                if census:
+                    state_code, county = row['STATE'], self.CENSUS_SUFFIXES.sub('', row['COUNTYNAME'].strip())
+                    fips = row['STATEFP'] + row['COUNTYFP']
+                else:
+                    state_code, county, fips = row['state_code'], row['county'], row['fips'].strip()
+                if state_code not in self.STATE_FIPS:
+                    continue
+                if len(fips) <= 3:
+                    fips = self.STATE_FIPS[state_code] + fips.zfill(3)
+                key = (state_code, self.normalize(state_code, county))
+                self._county_fips[key] = fips
+                county_id = self._ids.get(key)
+                if county_id is not None:
+                    self._fips[county_id] = fips
+
+
+class CandidateRegistry:
+    """
+    Candidate table with dense integer ids, so grouped rows hold tuples of candidate ids instead of
+    repeated name strings. A candidate is identified by name and House district (None for statewide
+    races); the party code is kept as a small integer code into `parties`.
+
+    Labels are the strings written to files: the name, prefixed with "[district]" for House
+    candidates. Joined labels ("; " separated, as in the grouped CSV candidate columns) are built
+    once per distinct id tuple and shared.
+
+    Example:
+        registry = CandidateRegistry.default()
+        candidate_id = registry.get_id("Gary Palmer", "R", district=6)
+        registry.label(candidate_id)                          # "[6]Gary Palmer"
+        registry.decode("[6]Gary Palmer; [7]Terri Sewell", "D")
+        registry.to_dataframe()
+    """
+
+    LABEL_PATTERN: ClassVar[re.Pattern] = re.compile(r"^\[(\d+)\](.*)$")
+    SEPARATOR: ClassVar[str] = "; "
+
+    _default: ClassVar[Optional['CandidateRegistry']] = None
+
+    def __init__(self):
+        self.parties: List[str] = []
+        self._party_index: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._districts: List[Optional[int]] = []
+        self._party_codes: List[int] = []
+        self._labels: List[str] = []
+        self._ids: Dict[Tuple[str, Optional[int]], int] = {}                  # (name, district) -> id
+        self._raw_ids: Dict[Tuple[str, Optional[Union[int, str]]], int] = {}  # (name, district as given) -> id, lookup cache
+        self._joined: Dict[Tuple[int, ...], str] = {}
+        self._decoded: Dict[Tuple[str, str], Tuple[int, ...]] = {}
+        self._tuples: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+
+    @classmethod
+    def default(cls) -> 'CandidateRegistry':
+        """Returns the process-wide candidate table shared by all models."""
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def party_code(self, party: str) -> int:
+        if party not in self._party_index:
+            self._party_index[party] = len(self.parties)
+            self.parties.append(party)
+        return self._party_index[party]
+
+    def get_id(self, name: str, party: str, district: Optional[Union[int, str]] = None) -> int:
+        """Returns the id of a candidate, registering it on first sight with the given party."""
+        candidate_id = self._raw_ids.get((name, district))
+        if candidate_id is not None:
+            return candidate_id
+
+        key = (name, int(district) if district is not None else None)
+        candidate_id = self._ids.get(key)
+        if candidate_id is None:
+            candidate_id = len(self._names)
+            self._ids[key] = candidate_id
+            self._names.append(name)
+            self._districts.append(key[1])
+            self._party_codes.append(self.party_code(party))
+            self._labels.append(f"[{key[1]}]{name}" if key[1] is not None else name)
+        # District keys of fetched data are strings; cache the lookup as given
+        self._raw_ids[(name, district)] = candidate_id
+        return candidate_id
+
+    def name(self, candidate_id: int) -> str:
+        return self._names[candidate_id]
+
+    def district(self, candidate_id: int) -> Optional[int]:
+        return self._districts[candidate_id]
+
+    def party(self, candidate_id: int) -> str:
+        return self.parties[self._party_codes[candidate_id]]
+
+    def label(self, candidate_id: int) -> str:
+        return self._labels[candidate_id]
+
+    def intern(self, candidate_ids: Iterable[int]) -> Optional[Tuple[int, ...]]:
+        """Returns the shared tuple for a list of candidate ids (None when empty), so equal lists are one object."""
+        candidate_ids = tuple(candidate_ids)
+        if not candidate_ids:
+            return None
+        return self._tuples.setdefault(candidate_ids, candidate_ids)
+
+    def encode(self, candidate_ids: Optional[Tuple[int, ...]]) -> Optional[str]:
+        """Returns the joined labels of the candidates, or None when there are none."""
+        if not candidate_ids:
+            return None
+        joined = self._joined.get(candidate_ids)
+        if joined is None:
+            joined = self._joined[candidate_ids] = self.SEPARATOR.join(self._labels[i] for i in candidate_ids)
+        return joined
+
+    def decode(self, joined: Optional[str], party: str) -> Optional[Tuple[int, ...]]:
+        """Returns the candidate ids of joined labels. Unknown candidates are registered with the given party."""
+        if not joined or joined == 'None':
+            return None
+        candidate_ids = self._decoded.get((joined, party))
+        if candidate_ids is None:
+            ids = []
+            for label in joined.split(self.SEPARATOR):
+                match = self.LABEL_PATTERN.match(label)
+                ids.append(self.get_id(match.group(2), party, match.group(1)) if match else self.get_id(label, party))
+            candidate_ids = self._decoded[(joined, party)] = self.intern(ids)
+            self._joined.setdefault(candidate_ids, joined)
+        return candidate_ids
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def to_dataframe(self) -> 'pd.DataFrame':
+        """Returns the candidate table: candidate_id, name, party and district."""
+        import pandas as pd
+
+        return pd.DataFrame({
+            'candidate_id': range(len(self._names)),
+            'name': self._names,
+            'party': [self.parties[c] for c in self._party_codes],
+            'district': pd.array(self._districts, dtype='Int64'),
+        })
@@ -0,0 +1,345 @@
+import hashlib
+import io
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from typing import List, Dict, Optional, Tuple, Union
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.ticker import FuncFormatter
+
+
+@dataclass
+class ComparisonChartSpec:
+    """
+    Values and labels for one 2020 vs 2024 comparison bar chart (same inputs as DataAnalytics.plot_comparison_bar_chart).
+    Values are fractions, they are drawn as percentages.
+    """
+    non_swing_2020: float
+    non_swing_2024: float
+    swing_2020: float
+    swing_2024: float
+    title: str
+    subtitle: Optional[str] = None
+    y_label: Optional[str] = None
+    y_bounds: Optional[Tuple[float, float]] = None
+    category_labels: Tuple[str, str] = ('Non-Swing States', 'Swing States')
+    save_path: Optional[Union[str, List[str]]] = None
+
+
+class ComparisonChartRenderer:
+    """
+    Headless renderer for comparison bar charts. Draws on the Agg canvas directly (no pyplot, no plt.show),
+    builds the figure and its artists once and only updates bar heights, labels and limits per chart.
+
+    Example:
+        renderer = ComparisonChartRenderer(figsize=(5, 5))
+        png = renderer.render(ComparisonChartSpec(0.98, 0.99, 1.01, 1.04, 'Average Presidential-to-House Vote Ratio'))
+
+        specs = ComparisonChartRenderer.state_specs(analytics.df, 'pres_house_ratio', 'Presidential-to-House Vote Ratio')
+        ComparisonChartRenderer.render_batch(specs, processes=4, output_dir='images/states')
+    """
+
+    WIDTH: float = 0.35
+
+    def __init__(self, figsize: tuple = (10, 6), dpi: int = 300, tight: bool = True):
+        """
+        - dpi: output resolution (300 matches plot_comparison_bar_chart)
+        - tight: crop to the drawn content like savefig(bbox_inches='tight'); False renders the full canvas, which is faster
+        """
+        self.dpi = dpi
+        self.tight = tight
+        self.figure = Figure(figsize=figsize)
+        self.canvas = FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot()
+        self.ax = ax
+
+        x = np.arange(2)
+        width = self.WIDTH
+        self.bars_2020 = ax.bar(x - width / 2, [0, 0], width, label='2020', color='lightskyblue')
+        self.bars_2024 = ax.bar(x + width / 2, [0, 0], width, label='2024', color='tomato')
+        self.value_labels_2020 = [ax.text(i - width / 2, 0, '', ha='center', va='bottom') for i in x]
+        self.value_labels_2024 = [ax.text(i + width / 2, 0, '', ha='center', va='bottom') for i in x]
+
+        ax.set_xticks(x)
+        ax.legend()
+        ax.grid(axis='y', linestyle='--', alpha=0.7)
+        ax.yaxis.set_major_formatter(FuncFormatter(lambda v, p: f'{v:.2f}%'))
+
+        # Change values in small white boxes just below x-axis labels
+        self.change_labels = [
+            ax.text(i, -0.15, '',
+                    ha='center', va='top',
+                    transform=ax.get_xaxis_transform(),
+                    bbox=dict(facecolor='white',
+                              edgecolor='gray',
+                              alpha=0.9,
+                              pad=0.5,
+                              boxstyle='round'),
+                    size=9)
+            for i in x
+        ]
+        self.figure.subplots_adjust(bottom=0.15, top=0.85)
+
+    def _update(self, spec: ComparisonChartSpec) -> None:
+        values_2020 = [spec.non_swing_2020 * 100, spec.swing_2020 * 100]
+        values_2024 = [spec.non_swing_2024 * 100, spec.swing_2024 * 100]
+
+        for bars, labels, values in ((self.bars_2020, self.value_labels_2020, values_2020),
+                                     (self.bars_2024, self.value_labels_2024, values_2024)):
+            for bar, label, v in zip(bars, labels, values):
+                bar.set_height(v)
+                label.set_y(v)
+                label.set_text(f'{v:.2f}%')
+
+        for label, v1, v2 in zip(self.change_labels, values_2020, values_2024):
+            label.set_text(f'Change: {v2 - v1:+.2f}%')
+
+        ax = self.ax
+        ax.set_title(spec.title if not spec.subtitle else f'{spec.title}\n{spec.subtitle}', pad=20)
+        ax.set_ylabel(spec.y_label or '')
+        ax.set_xticklabels(spec.category_labels)
+
+        if spec.y_bounds:
+            ax.set_ylim(spec.y_bounds)
+        else:
+            # Same autoscale as pyplot: start at zero (or the lowest bar) with some padding above the highest bar
+            finite = [v for v in values_2020 + values_2024 if np.isfinite(v)]
+            low = min(0.0, min(finite)) if finite else 0.0
+            high = max(0.0, max(finite)) if finite else 1.0
+            ax.set_ylim(low, high * 1.05 * 1.1 if high > 0 else 1.0)
+
+    def render(self, spec: ComparisonChartSpec) -> bytes:
+        """Renders one chart and returns the PNG bytes. Also writes the file when spec.save_path is set."""
+        self._update(spec)
+        buffer = io.BytesIO()
+        self.figure.savefig(buffer, format='png', dpi=self.dpi, bbox_inches='tight' if self.tight else None)
+        png = buffer.getvalue()
+
+        if spec.save_path is not None:
+            image_file_path = spec.save_path if isinstance(spec.save_path, str) else os.path.join(*spec.save_path)
+            with open(image_file_path, 'wb') as f:
+                f.write(png)
+        return png
+
+    @classmethod
+    def render_batch(
+        cls,
+        specs: List[ComparisonChartSpec],
+        processes: Optional[int] = None,
+        output_dir: Optional[str] = None,
+        figsize: tuple = (5, 5),
+        dpi: int = 300,
+        tight: bool = True
+    ) -> List[bytes]:
+        """
+        Renders many charts, reusing one figure per process. processes > 1 fans the charts out over a process pool.
+        With output_dir, specs without a save_path are written there as <index>.png.
+        """
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            specs = [
+                spec if spec.save_path is not None else replace(spec, save_path=os.path.join(output_dir, f'{i:03d}.png'))
+                for i, spec in enumerate(specs)
+            ]
+
+        if not processes or processes <= 1:
+            renderer = cls(figsize=figsize, dpi=dpi, tight=tight)
+            return [renderer.render(spec) for spec in specs]
+
+        chunksize = max(1, len(specs) // (processes * 4))
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(figsize, dpi, tight)) as pool:
+            return list(pool.map(_render_in_worker, specs, chunksize=chunksize))
+
+    @staticmethod
+    def state_specs(
+        df: pd.DataFrame,
+        metric: str,
+        title: str,
+        scale: float = 1.0,
+        y_bounds: Optional[Tuple[float, float]] = None,
+        output_dir: Optional[str] = None
+    ) -> List[ComparisonChartSpec]:
+        """
+        Builds one spec per state comparing the state's average of '<metric>_2020' / '<metric>_2024'
+        with the rest of the nation, over counties where both years and the change are finite.
+        scale converts the metric to a fraction (e.g. 0.01 for split_ticket, which is already a percentage).
+        """
+        working_df = df[
+            np.isfinite(df[f'{metric}_2024']) &
+            np.isfinite(df[f'{metric}_2020']) &
+            np.isfinite(df[f'{metric}_change'])
+        ]
+        sums = working_df.groupby('state_code')[[f'{metric}_2020', f'{metric}_2024']].agg(['sum', 'count'])
+        total_2020, total_2024 = working_df[f'{metric}_2020'].sum(), working_df[f'{metric}_2024'].sum()
+        total_count = len(working_df)
+
+        specs = []
+        for state, row in sums.iterrows():
+            count = row[(f'{metric}_2020', 'count')]
+            rest = total_count - count
+            state_2020 = row[(f'{metric}_2020', 'sum')] / count
+            state_2024 = row[(f'{metric}_2024', 'sum')] / count
+            rest_2020 = (total_2020 - row[(f'{metric}_2020', 'sum')]) / rest if rest else np.nan
+            rest_2024 = (total_2024 - row[(f'{metric}_2024', 'sum')]) / rest if rest else np.nan
+            specs.append(ComparisonChartSpec(
+                non_swing_2020=rest_2020 * scale,
+                non_swing_2024=rest_2024 * scale,
+                swing_2020=state_2020 * scale,
+                swing_2024=state_2024 * scale,
+                title=f'{title} - {state}',
+                y_bounds=y_bounds,
+                category_labels=('Rest of Nation', state),
+                save_path=os.path.join(output_dir, f'{metric}_{state}.png') if output_dir else None
+            ))
+        return specs
+
+
+# Per-process renderer for render_batch
+_worker_renderer: Optional[ComparisonChartRenderer] = None
+
+
+def _init_worker(figsize: tuple, dpi: int, tight: bool) -> None:
+    global _worker_renderer
+    _worker_renderer = ComparisonChartRenderer(figsize=figsize, dpi=dpi, tight=tight)
+
+
+def _render_in_worker(spec: ComparisonChartSpec) -> bytes:
+    return _worker_renderer.render(spec)
+
+
+class TableImageRenderer:
+    """
+    Native replacement for dataframe_image's dfi.export. Draws a styled table (bold header, striped rows,
+    index as first column) straight onto an Agg canvas, so no headless browser is needed.
+
+    Rendered images are cached by a hash of the table contents and the style, so unchanged tables are
+    not redrawn: in memory for the renderer's lifetime and on disk when cache_dir is set.
+
+    Example:
+        tables = TableImageRenderer(cache_dir='.table_cache')
+        tables.export(ratio_analysis, 'images/ratio_analysis_data.png')
+        tables.export_many({'images/ratio_analysis_data.png': ratio_analysis, 'images/split_ticket_analysis_data.png': split_ticket_analysis})
+    """
+
+    # Bump to invalidate cached images when the drawing code changes
+    STYLE_VERSION: int = 2
+
+    HEADER_COLOR: str = '#ffffff'
+    STRIPE_COLOR: str = '#f5f5f5'
+    ROW_COLOR: str = '#ffffff'
+    EDGE_COLOR: str = '#d0d0d0'
+
+    def __init__(self, cache_dir: Optional[str] = None, dpi: int = 200, font_size: float = 9, float_format: str = '{:.6f}', na_rep: str = 'NaN'):
+        self.cache_dir = cache_dir
+        self.dpi = dpi
+        self.font_size = font_size
+        self.float_format = float_format
+        self.na_rep = na_rep
+        self._memory_cache: Dict[str, bytes] = {}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _format(self, value) -> str:
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return self.na_rep
+        if isinstance(value, (float, np.floating)):
+            return self.float_format.format(value)
+        return str(value)
+
+    def _cells(self, df: pd.DataFrame) -> Tuple[List[str], List[List[str]]]:
+        header = [''] + [str(c) for c in df.columns]
+        rows = [
+            [str(index)] + [self._format(v) for v in values]
+            for index, values in zip(df.index, df.itertuples(index=False, name=None))
+        ]
+        return header, rows
+
+    def cache_key(self, df: pd.DataFrame) -> str:
+        """Hash of the rendered contents and style settings."""
+        header, rows = self._cells(df)
+        h = hashlib.sha256()
+        h.update(repr((self.STYLE_VERSION, self.dpi, self.font_size, self.float_format, self.na_rep)).encode('utf-8'))
+        h.update('\x1f'.join(header).encode('utf-8'))
+        for row in rows:
+            h.update(b'\x1e')
+            h.update('\x1f'.join(row).encode('utf-8'))
+        return h.hexdigest()
+
+    def _draw(self, header: List[str], rows: List[List[str]]) -> bytes:
+        # Size columns by their longest text
+        char_width = self.font_size * 0.62 / 72
+        row_height = self.font_size * 2.2 / 72
+        col_chars = [max(len(header[j]), *(len(r[j]) for r in rows)) if rows else len(header[j]) for j in range(len(header))]
+        col_widths = [(chars + 2) * char_width for chars in col_chars]
+        width = sum(col_widths)
+        height = row_height * (len(rows) + 1)
+
+        figure = Figure(figsize=(width, height))
+        FigureCanvasAgg(figure)
+        ax = figure.add_axes([0, 0, 1, 1])
+        ax.set_axis_off()
+
+        table = ax.table(cellText=rows or None, colLabels=header, cellLoc='right', colLoc='center', bbox=[0, 0, 1, 1])
+        table.auto_set_font_size(False)
+        table.set_fontsize(self.font_size)
+        for (r, c), cell in table.get_celld().items():
+            cell.set_width(col_widths[c] / width)
+            cell.set_edgecolor(self.EDGE_COLOR)
+            cell.set_linewidth(0.5)
+            if r == 0:
+                cell.set_facecolor(self.HEADER_COLOR)
+                cell.get_text().set_fontweight('bold')
+                cell.visible_edges = 'B'
+            else:
+                cell.set_facecolor(self.STRIPE_COLOR if r % 2 == 1 else self.ROW_COLOR)
+                cell.visible_edges = 'open'
+                if c == 0:
+                    cell.get_text().set_fontweight('bold')
+                    cell.set_text_props(ha='left')
+
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format='png', dpi=self.dpi)
+        return buffer.getvalue()
+
+    def render(self, df: pd.DataFrame) -> bytes:
+        """Returns the PNG bytes of the table, drawing it only when no cached image matches its contents."""
+        png, _ = self._render(df)
+        return png
+
+    def _render(self, df: pd.DataFrame) -> Tuple[bytes, bool]:
+        key = self.cache_key(df)
+        png = self._memory_cache.get(key)
+        if png is not None:
+            return png, False
+
+        cache_file = os.path.join(self.cache_dir, f'{key}.png') if self.cache_dir else None
+        if cache_file and os.path.exists(cache_file):
+            with open(cache_file, 'rb') as f:
+                png = f.read()
+            self._memory_cache[key] = png
+            return png, False
+
+        header, rows = self._cells(df)
+        png = self._draw(header, rows)
+        self._memory_cache[key] = png
+        if cache_file:
+            with open(cache_file, 'wb') as f:
+                f.write(png)
+        return png, True
+
+    def export(self, df: pd.DataFrame, filename: Union[str, List[str]]) -> bool:
+        """Writes the table image to filename. Returns True if it had to be drawn, False if served from the cache."""
+        filepath = filename if isinstance(filename, str) else os.path.join(*filename)
+        png, drawn = self._render(df)
+        with open(filepath, 'wb') as f:
+            f.write(png)
+        return drawn
+
+    def export_many(self, tables: Dict[str, pd.DataFrame]) -> Dict[str, int]:
+        """Exports many tables in one process. Returns how many were drawn and how many came from the cache."""
+        drawn = sum(self.export(df, filename) for filename, df in tables.items())
+        return {'drawn': drawn, 'cached': len(tables) - drawn}
@@ -0,0 +1,251 @@
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Tuple, Union
+
+from data_model import ElectionDataFullModel
+
+
+class ResultsFixtures:
+    """
+    Response bodies of the results API's county-races endpoint, by race key ("2024-PG-PA",
+    "2024-HG-PA-3"), encoded once. Built from recorded responses (a directory of <key>.json files),
+    from fetched full data (e.g. data/election_data_full.json) or from SyntheticElectionData.
+
+    Example:
+        fixtures = ResultsFixtures.synthetic(units_per_state=90)
+        fixtures.save("fixtures")
+        fixtures = ResultsFixtures.from_directory("fixtures")
+    """
+
+    def __init__(self, bodies: Dict[str, bytes]):
+        self.bodies = bodies
+
+    @staticmethod
+    def county_response(county: str, county_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Inverse of DataFunctions.extract_county_data_from_response: one county entry of a response."""
+        return {
+            "countyName": county,
+            "percentReporting": county_data["pct_reported"],
+            "totalVote": county_data["total_votes"],
+            "extractedAt": county_data["timestamp"],
+            "candidates": [
+                {
+                    "candidatePartyCode": party,
+                    "fullName": candidate["name"],
+                    "voteNum": candidate["votes"],
+                    "votePercentStr": str(candidate["votes_pct"]),
+                }
+                for party, candidate in county_data["candidates"].items()
+            ],
+        }
+
+    @classmethod
+    def from_full_data(cls, full_data: ElectionDataFullModel) -> 'ResultsFixtures':
+        """Rebuilds the responses that full data was fetched from; races with no reported county are left out (404)."""
+        responses: Dict[str, List[Dict[str, Any]]] = {}
+        for year, states in full_data.data.items():
+            for state, counties in states.items():
+                for county, races in counties.items():
+                    for election_type, race_data in races.items():
+                        if election_type == 'H':
+                            entries = [(f"{year}-HG-{state}-{int(d)}", data) for d, data in race_data.items()]
+                        else:
+                            entries = [(f"{year}-{election_type}G-{state}", race_data)]
+                        for key, data in entries:
+                            if data.get("total_votes") is not None:
+                                responses.setdefault(key, []).append(cls.county_response(county, data))
+        return cls({key: json.dumps(counties).encode('utf-8') for key, counties in responses.items()})
+
+    @classmethod
+    def synthetic(cls, **kwargs) -> 'ResultsFixtures':
+        """Fixtures of SyntheticElectionData.generate(**kwargs)."""
+        from data_synthetic import SyntheticElectionData
+        return cls.from_full_data(SyntheticElectionData.generate(**kwargs))
+
+    @classmethod
+    def from_directory(cls, directory: Union[str, List[str]]) -> 'ResultsFixtures':
+        """Loads recorded responses saved as <key>.json files."""
+        directory = directory if isinstance(directory, str) else os.path.join(*directory)
+        bodies = {}
+        for filename in os.listdir(directory):
+            if filename.endswith('.json'):
+                with open(os.path.join(directory, filename), 'rb') as f:
+                    bodies[filename[:-len('.json')]] = f.read()
+        return cls(bodies)
+
+    def save(self, directory: Union[str, List[str]]) -> None:
+        """Writes every response as <key>.json, readable by from_directory."""
+        directory = directory if isinstance(directory, str) else os.path.join(*directory)
+        os.makedirs(directory, exist_ok=True)
+        for key, body in self.bodies.items():
+            with open(os.path.join(directory, f"{key}.json"), 'wb') as f:
+                f.write(body)
+
+    def __len__(self) -> int:
+        return len(self.bodies)
+
+
+class ResultsServer:
+    """
+    Local stand-in for the results API, for tests and fetch benchmarks without network access.
+    Serves GET <any prefix>/<key>.json from ResultsFixtures, and 404 for races it has no fixture
+    for, including districts past a state's last one, as the real API does.
+
+    Faults, all reproducible for a given seed:
+        latency, jitter     seconds added to every response (uniform in latency +- jitter)
+        error_rate          fraction of requests answered 503; whether the n-th request of a key
+                            fails depends only on (seed, key, n), so retries behave the same in
+                            every run whatever the thread interleaving
+        rate_limit, burst   token bucket of rate_limit requests/second holding up to burst tokens;
+                            requests over it get 429 with Retry-After
+
+    GET /_stats returns the request counts by status.
+
+    Point the fetch code at it with DataFunctions.set_base_url(server_url) (or the RESULTS_BASE_URL
+    environment variable); every path prefix is accepted, so the base url may be the bare server url.
+
+    Example:
+        results = ResultsServer(ResultsFixtures.synthetic(), latency=0.02, error_rate=0.05)
+        server = results.make_server('127.0.0.1', 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        DataFunctions.set_base_url(f"http://127.0.0.1:{server.server_port}")
+    """
+
+    KEY_PATTERN = re.compile(r'(?:^|/)(\d{4}-[A-Z]G-[A-Z]{2}(?:-\d+)?)\.json$')
+
+    def __init__(
+        self,
+        fixtures: ResultsFixtures,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: Optional[float] = None,
+        burst: int = 10,
+        seed: int = 0
+    ):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.seed = seed
+        self.counts: Counter = Counter()
+        self._requests_per_key: Counter = Counter()
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take_token(self) -> Optional[float]:
+        """Takes a rate limit token; returns None if one was available, else the seconds until the next."""
+        if self.rate_limit is None:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_limit)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return (1 - self._tokens) / self.rate_limit
+
+    def _fails(self, key: str) -> bool:
+        with self._lock:
+            self._requests_per_key[key] += 1
+            n = self._requests_per_key[key]
+        return self.error_rate > 0 and random.Random(f"{self.seed}:{key}:{n}").random() < self.error_rate
+
+    def respond(self, path: str) -> Tuple[int, Dict[str, str], bytes]:
+        """Returns (status, headers, body) for a request path, after the configured latency."""
+        if path == '/_stats':
+            with self._lock:
+                return 200, {}, json.dumps({str(status): count for status, count in sorted(self.counts.items())}).encode('utf-8')
+
+        retry_after = self._take_token()
+        match = self.KEY_PATTERN.search(path)
+        if retry_after is not None:
+            status, headers, body = 429, {'Retry-After': str(max(1, round(retry_after)))}, b'{"error": "rate limited"}'
+        elif match is None:
+            status, headers, body = 404, {}, b'{"error": "not found"}'
+        elif self._fails(match.group(1)):
+            status, headers, body = 503, {}, b'{"error": "injected failure"}'
+        elif match.group(1) not in self.fixtures.bodies:
+            status, headers, body = 404, {}, b'{"error": "not found"}'
+        else:
+            status, headers, body = 200, {}, self.fixtures.bodies[match.group(1)]
+
+        delay = self.latency + (random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self.counts[status] += 1
+        return status, headers, body
+
+    def make_server(self, host: str = '127.0.0.1', port: int = 8060) -> ThreadingHTTPServer:
+        """Creates a threaded HTTP server bound to this stand-in. Call serve_forever() on it to run."""
+        results = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, headers, body = results.respond(self.path.split('?', 1)[0])
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the county results API')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--fixtures', default=None, help='Directory of recorded <key>.json responses')
+    source.add_argument('--full-data', default=None, help='Serve the responses of fetched full data, e.g. data/election_data_full.json')
+    parser.add_argument('--units-per-state', type=int, default=90, help='Scale of the synthetic data served by default')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8060)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered 503')
+    parser.add_argument('--rate-limit', type=float, default=None, help='Requests per second before 429s')
+    parser.add_argument('--burst', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        fixtures = ResultsFixtures.from_directory(args.fixtures)
+    elif args.full_data:
+        fixtures = ResultsFixtures.from_full_data(ElectionDataFullModel.load_from_json(args.full_data))
+    else:
+        fixtures = ResultsFixtures.synthetic(units_per_state=args.units_per_state, seed=args.seed)
+
+    results = ResultsServer(fixtures, args.latency, args.jitter, args.error_rate, args.rate_limit, args.burst, args.seed)
+    server = results.make_server(args.host, args.port)
+    print(f"Serving {len(fixtures)} races on http://{args.host}:{server.server_port} (RESULTS_BASE_URL=http://{args.host}:{server.server_port})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Tuple, Union
+from urllib.parse import urlparse, parse_qs
+
+from data_model import ElectionDataGroupedAndFlattenedModel
+from data_analytics import DataAnalytics
+from data_validation import DataValidator, ValidationReport
+
+
+class LruCache:
+    """Thread-safe least-recently-used cache with hit/miss counters."""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class AnalyticsService:
+    """
+    Local JSON service over DataAnalytics. The flattened data is loaded once at startup, the standard
+    analyses are precomputed, and every response is cached in an LRU keyed by the data fingerprint and
+    the query parameters. When the data file changes on disk it is reloaded and the cache is dropped.
+
+    Endpoints (GET):
+        /health                                 fingerprint, row count, validation counts and cache counters
+        /analysis/ratio                         analyze_presidential_house_ratios_comprehensive
+        /analysis/split_ticket                  analyze_split_ticket_voting_comprehensive
+        /metric?metric=pres_house_ratio_change  summary stats and top/bottom counties for any metric
+    Query parameters: state (e.g. PA), top_k (e.g. 10), swing (e.g. AZ,GA,MI).
+
+    Example:
+        python data_service.py --port 8050
+        curl "http://127.0.0.1:8050/metric?metric=split_ticket_change&state=PA&top_k=3"
+    """
+
+    ANALYSES: Dict[str, str] = {
+        'ratio': 'analyze_presidential_house_ratios_comprehensive',
+        'split_ticket': 'analyze_split_ticket_voting_comprehensive',
+    }
+
+    def __init__(self, data_path: Union[str, List[str]], cache_size: int = 256, warm_cache_dir: Optional[str] = None):
+        """
+        - data_path: flattened election data CSV
+        - cache_size: number of responses kept in the LRU cache
+        - warm_cache_dir: if set, the analytics dataframe is pickled there per fingerprint so restarts skip the CSV parse
+        """
+        self.data_path = data_path if isinstance(data_path, str) else os.path.join(*data_path)
+        self.warm_cache_dir = warm_cache_dir
+        self.cache = LruCache(cache_size)
+        self._reload_lock = threading.RLock()
+        self._file_stat: Optional[Tuple[int, int]] = None
+        self.fingerprint: Optional[str] = None
+        self.analytics: Optional[DataAnalytics] = None
+        self.validation: Optional[ValidationReport] = None
+        self._load()
+
+    @staticmethod
+    def _stat(path: str) -> Tuple[int, int]:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def _file_fingerprint(path: str) -> str:
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def _load(self) -> None:
+        """Loads (or reloads) the data and precomputes the standard analyses."""
+        start = time.perf_counter()
+        file_stat = self._stat(self.data_path)
+        fingerprint = self._file_fingerprint(self.data_path)
+
+        warm_file = os.path.join(self.warm_cache_dir, f'analytics_{fingerprint}.pkl') if self.warm_cache_dir else None
+        if warm_file and os.path.exists(warm_file):
+            # Rebuilt through _prepare so the registry and state ids are set as on a cold load
+            analytics = DataAnalytics.from_dataframe(pd.read_pickle(warm_file))
+        else:
+            analytics = DataAnalytics(ElectionDataGroupedAndFlattenedModel.load_from_csv(self.data_path))
+            if warm_file:
+                os.makedirs(self.warm_cache_dir, exist_ok=True)
+                analytics.df.to_pickle(warm_file)
+
+        # Every load (startup or live update) is validated; violations are reported, not refused
+        validation = DataValidator.validate_flattened(analytics.df)
+        if len(validation.violations):
+            print(f"Validation of {self.data_path}:")
+            print(validation.summary().to_string(index=False))
+
+        self.analytics = analytics
+        self.validation = validation
+        self.fingerprint = fingerprint
+        self._file_stat = file_stat
+        self.cache.clear()
+
+        # Precompute the standard analyses
+        for name in self.ANALYSES:
+            status, body = self.query(f'/analysis/{name}', {})
+            if status != 200:
+                raise Exception(f"Precomputing /analysis/{name} failed with {status}: {body.decode('utf-8')}")
+        print(f"Loaded {self.data_path} ({len(analytics.df)} rows, fingerprint {fingerprint[:12]}) in {time.perf_counter() - start:.2f}s")
+
+    def _check_for_changes(self) -> None:
+        """Reloads the data when the underlying file changed since it was loaded."""
+        if self._stat(self.data_path) == self._file_stat:
+            return
+        with self._reload_lock:
+            if self._stat(self.data_path) != self._file_stat:
+                self._load()
+
+    @staticmethod
+    def _parse_params(params: Dict[str, Any]) -> Dict[str, Any]:
+        def first(name: str) -> Optional[str]:
+            value = params.get(name)
+            if isinstance(value, list):
+                return value[0] if value else None
+            return value
+
+        swing = first('swing')
+        top_k = first('top_k')
+        state = first('state')
+        return {
+            'metric': first('metric'),
+            'state': state.upper() if state else None,
+            'top_k': int(top_k) if top_k else 5,
+            'swing_states': tuple(sorted(s.strip().upper() for s in swing.split(',') if s.strip())) if swing else tuple(DataAnalytics.SWING_STATES),
+        }
+
+    def query(self, path: str, params: Dict[str, Any]) -> Tuple[int, bytes]:
+        """Returns (HTTP status, JSON body) for a request path and its query parameters."""
+        self._check_for_changes()
+        try:
+            parsed = self._parse_params(params)
+        except ValueError as ex:
+            return 400, self._encode({'error': f'Invalid parameter: {ex}'})
+
+        if path == '/health':
+            return 200, self._encode({
+                'fingerprint': self.fingerprint,
+                'rows': len(self.analytics.df),
+                'validation_errors': int((self.validation.violations['severity'] == 'error').sum()),
+                'validation_warnings': int((self.validation.violations['severity'] == 'warning').sum()),
+                'cache_size': len(self.cache),
+                'cache_hits': self.cache.hits,
+                'cache_misses': self.cache.misses,
+            })
+
+        key = (self.fingerprint, path, tuple(sorted(parsed.items())))
+        body = self.cache.get(key)
+        if body is not None:
+            return 200, body
+
+        try:
+            if path.startswith('/analysis/') and path[len('/analysis/'):] in self.ANALYSES:
+                result = self._analysis(path[len('/analysis/'):], parsed)
+            elif path == '/metric':
+                result = self._metric(parsed)
+            else:
+                return 404, self._encode({'error': f'Unknown path {path}'})
+        except Exception as ex:
+            return 400, self._encode({'error': str(ex)})
+
+        body = self._encode(result)
+        self.cache.put(key, body)
+        return 200, body
+
+    def _analysis(self, name: str, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        df = getattr(self.analytics, self.ANALYSES[name])(swing_states=list(parsed['swing_states']), top_k=parsed['top_k'])
+        if parsed['state']:
+            df = df[df['state_code'] == parsed['state']]
+        return {
+            'fingerprint': self.fingerprint,
+            'analysis': name,
+            'swing_states': list(parsed['swing_states']),
+            'rows': self._records(df),
+        }
+
+    def _metric(self, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        df = self.analytics.df
+        metric = parsed['metric']
+        if not metric or metric not in df.columns or not pd.api.types.is_numeric_dtype(df[metric]):
+            raise Exception(f"Unknown metric '{metric}'")
+
+        working_df = df[np.isfinite(df[metric])]
+        swing_mask = working_df['state_code'].isin(parsed['swing_states'])
+
+        def summary(values: pd.Series) -> Dict[str, Any]:
+            return {
+                'county_count': int(len(values)),
+                'mean': values.mean(),
+                'median': values.median(),
+                'std': values.std(),
+                'min': values.min(),
+                'max': values.max(),
+            }
+
+        groups = {
+            'nationwide': summary(working_df[metric]),
+            'swing': summary(working_df.loc[swing_mask, metric]),
+            'non_swing': summary(working_df.loc[~swing_mask, metric]),
+        }
+        if parsed['state']:
+            working_df = working_df[working_df['state_code'] == parsed['state']]
+            groups['state'] = summary(working_df[metric])
+
+        columns = ['state_code', 'county', metric]
+        return {
+            'fingerprint': self.fingerprint,
+            'metric': metric,
+            'state': parsed['state'] or 'ALL',
+            'swing_states': list(parsed['swing_states']),
+            'summary': groups,
+            'top': self._records(working_df.nlargest(parsed['top_k'], metric)[columns]),
+            'bottom': self._records(working_df.nsmallest(parsed['top_k'], metric)[columns]),
+        }
+
+    @staticmethod
+    def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+        # to_json maps NaN to null
+        return json.loads(df.to_json(orient='records'))
+
+    @staticmethod
+    def _encode(payload: Dict[str, Any]) -> bytes:
+        def default(value):
+            if isinstance(value, np.generic):
+                return value.item()
+            raise TypeError(f'Cannot serialize {type(value)}')
+
+        # NaN is not valid JSON, send null instead
+        def clean(value):
+            if isinstance(value, float) and not np.isfinite(value):
+                return None
+            if isinstance(value, dict):
+                return {k: clean(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [clean(v) for v in value]
+            if isinstance(value, np.floating):
+                return clean(float(value))
+            return value
+
+        return json.dumps(clean(payload), default=default).encode('utf-8')
+
+    def make_server(self, host: str = '127.0.0.1', port: int = 8050) -> ThreadingHTTPServer:
+        """Creates a threaded HTTP server bound to this service. Call serve_forever() on it to run."""
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                status, body = service.query(url.path.rstrip('/') or '/', parse_qs(url.query))
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local analytics HTTP/JSON service')
+    parser.add_argument('--data', default=os.path.join('data', 'election_data_grouped_and_flattened.csv'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--cache-size', type=int, default=256)
+    parser.add_argument('--warm-cache-dir', default=None)
+    args = parser.parse_args()
+
+    service = AnalyticsService(args.data, cache_size=args.cache_size, warm_cache_dir=args.warm_cache_dir)
+    server = service.make_server(args.host, args.port)
+    print(f"Serving on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
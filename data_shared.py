@@ -0,0 +1,186 @@
+import sys
+from dataclasses import dataclass
+from multiprocessing import get_context, shared_memory
+from typing import List, Dict, Optional, Tuple, Any, Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from data_registry import CountyRegistry
+
+
+@dataclass(frozen=True)
+class SharedColumnHandle:
+    """Picklable description of a SharedColumnStore: segment name, row count and (column, dtype, byte offset) of each column."""
+    name: str
+    rows: int
+    columns: Tuple[Tuple[str, str, int], ...]
+    nbytes: int
+
+
+class SharedColumnStore:
+    """
+    Numeric columns of a DataFrame in one shared memory segment, laid out column after column.
+    Other processes attach by name (through the small handle) and read the columns as numpy views
+    of the segment, without copying or unpickling the frame.
+
+    String columns (state_code, county) are left out; state_id and county_id carry them as integers.
+    Nullable integer columns are stored as float64 with NaN. Attached views are read-only.
+
+    The creating process owns the segment and unlinks it on close(); attached stores only close
+    their mapping.
+
+    Example:
+        with SharedColumnStore.create(analytics.df) as store:
+            handle = store.handle  # pass to workers
+            ...
+        # in a worker
+        store = SharedColumnStore.attach(handle)
+        df = store.frame()
+    """
+
+    ALIGNMENT = 64
+
+    def __init__(self, shm: shared_memory.SharedMemory, handle: SharedColumnHandle, owner: bool):
+        self._shm = shm
+        self.handle = handle
+        self.owner = owner
+        self.arrays: Dict[str, np.ndarray] = {}
+        for column, dtype, offset in handle.columns:
+            array = np.ndarray((handle.rows,), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            if not owner:
+                array.flags.writeable = False
+            self.arrays[column] = array
+        self._frame: Optional[pd.DataFrame] = None
+
+    @staticmethod
+    def numeric_columns(df: pd.DataFrame) -> List[str]:
+        """Columns of df that can be stored: numeric and boolean."""
+        return [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c]) or pd.api.types.is_bool_dtype(df[c])]
+
+    @classmethod
+    def create(cls, df: pd.DataFrame, columns: Optional[List[str]] = None) -> 'SharedColumnStore':
+        """Copies the numeric columns of df (or the given columns) into a new shared memory segment."""
+        columns = columns if columns is not None else cls.numeric_columns(df)
+        arrays = {}
+        for column in columns:
+            series = df[column]
+            if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) and not pd.api.types.is_bool_dtype(series):
+                arrays[column] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                arrays[column] = series.to_numpy()
+
+        layout, offset = [], 0
+        for column, array in arrays.items():
+            layout.append((column, array.dtype.str, offset))
+            offset += -(-array.nbytes // cls.ALIGNMENT) * cls.ALIGNMENT
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        handle = SharedColumnHandle(name=shm.name, rows=len(df), columns=tuple(layout), nbytes=offset)
+        store = cls(shm, handle, owner=True)
+        for column, array in arrays.items():
+            store.arrays[column][:] = array
+        return store
+
+    @classmethod
+    def attach(cls, handle: SharedColumnHandle) -> 'SharedColumnStore':
+        """Maps an existing store by its handle."""
+        # Only the owner unlinks; on Python 3.13+ keep the resource tracker of an unrelated process out of it
+        kwargs = {'track': False} if sys.version_info >= (3, 13) else {}
+        return cls(shared_memory.SharedMemory(name=handle.name, **kwargs), handle, owner=False)
+
+    def frame(self) -> pd.DataFrame:
+        """DataFrame over the shared columns, without copying them."""
+        if self._frame is None:
+            self._frame = pd.DataFrame(self.arrays, copy=False)
+        return self._frame
+
+    def close(self) -> None:
+        """Releases this process' mapping; the owner also removes the segment."""
+        self._frame = None
+        self.arrays = {}
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+    def __enter__(self) -> 'SharedColumnStore':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+# Store attached by each pool worker, once, in the pool initializer
+_worker_store: Optional[SharedColumnStore] = None
+
+
+def _attach_worker(handle: SharedColumnHandle) -> None:
+    global _worker_store
+    _worker_store = SharedColumnStore.attach(handle)
+
+
+def _run_task(func: Callable[[pd.DataFrame, Any], Any], task: Any) -> Any:
+    return func(_worker_store.frame(), task)
+
+
+def _run_state_task(func: Callable[[pd.DataFrame], Any], state_id: int) -> Any:
+    df = _worker_store.frame()
+    return func(df[df['state_id'].to_numpy() == state_id])
+
+
+def _run_resample_task(func: Callable[[pd.DataFrame, np.random.Generator], Any], seed: Tuple[int, int]) -> Any:
+    return func(_worker_store.frame(), np.random.default_rng(list(seed)))
+
+
+class AnalyticsWorkerPool:
+    """
+    Process pool whose workers attach to a SharedColumnStore once, at startup, so tasks only carry
+    the task function and its small arguments. Task functions must be picklable (module-level).
+    Created by DataAnalytics.worker_pool.
+
+    Example:
+        with analytics.worker_pool(processes=4) as pool:
+            medians = pool.map_states(median_ratio_change)
+            means = pool.map_resamples(bootstrap_mean_ratio_change, n=1000, seed=1)
+    """
+
+    def __init__(self, store: SharedColumnStore, processes: Optional[int] = None, owns_store: bool = False, start_method: Optional[str] = None):
+        self.store = store
+        self.owns_store = owns_store
+        self._pool = get_context(start_method).Pool(processes, initializer=_attach_worker, initargs=(store.handle,))
+
+    def map(self, func: Callable[[pd.DataFrame, Any], Any], tasks: Iterable[Any], chunksize: int = 1) -> List[Any]:
+        """Returns [func(frame, task) for task in tasks], run in the workers."""
+        return self._pool.starmap(_run_task, [(func, task) for task in tasks], chunksize)
+
+    def map_states(self, func: Callable[[pd.DataFrame], Any], states: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Returns {state: func(rows of the state)}, run in the workers, for the given states or every state
+        in the store. Rows are matched on the state_id column (CountyRegistry state ids, the same in every process).
+        """
+        registry = CountyRegistry.default()
+        if states is None:
+            state_ids = np.unique(self.store.arrays['state_id']).tolist()
+            states = [registry.states[i] for i in state_ids]
+        else:
+            states = list(states)
+            state_ids = registry.state_ids(states).tolist()
+        results = self._pool.starmap(_run_state_task, [(func, int(state_id)) for state_id in state_ids])
+        return dict(zip(states, results))
+
+    def map_resamples(self, func: Callable[[pd.DataFrame, np.random.Generator], Any], n: int, seed: int = 0, chunksize: int = 8) -> List[Any]:
+        """Returns func(frame, rng) for n resamples; resample i gets its own generator seeded with (seed, i)."""
+        return self._pool.starmap(_run_resample_task, [(func, (seed, i)) for i in range(n)], chunksize)
+
+    def close(self) -> None:
+        self._pool.close()
+        self._pool.join()
+        if self.owns_store:
+            self.store.close()
+
+    def __enter__(self) -> 'AnalyticsWorkerPool':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None:
+            self._pool.terminate()
+        self.close()
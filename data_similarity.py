@@ -0,0 +1,170 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import List, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_instrumentation import instrumented
+
+
+@dataclass
+class StateDistances:
+    """
+    Pairwise distances between the county-level distributions of metrics per state.
+    values[statistic, metric, i, j] compares states[i] with states[j]; counts[metric, i] is the
+    number of counties with a finite value. ks and wasserstein are symmetric with a zero diagonal;
+    mean_shift (mean_i - mean_j) and mean_shift_z (the Welch z of that difference) are
+    antisymmetric. States with fewer than min_count values of a metric get NaN.
+    """
+    statistics: List[str]
+    metrics: List[str]
+    states: List[str]
+    values: np.ndarray
+    counts: np.ndarray
+    fingerprint: str
+
+    def matrix(self, metric: str, statistic: str = 'ks') -> pd.DataFrame:
+        """Labeled state x state matrix of one statistic, e.g. as a distance matrix for clustering."""
+        values = self.values[self.statistics.index(statistic), self.metrics.index(metric)]
+        return pd.DataFrame(values, index=pd.Index(self.states, name='state_code'), columns=self.states)
+
+    def nearest(self, metric: str, state: str, statistic: str = 'ks', k: int = 5) -> pd.Series:
+        """The k states whose distribution of metric is closest to state's."""
+        distances = self.matrix(metric, statistic)[state].drop(state).abs()
+        return distances.nsmallest(k)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Long format: one row per (metric, state, other_state) with a column per statistic."""
+        n_metrics, n_states = len(self.metrics), len(self.states)
+        frame = pd.DataFrame({
+            'metric': np.repeat(self.metrics, n_states * n_states),
+            'state_code': np.tile(np.repeat(self.states, n_states), n_metrics),
+            'other_state_code': np.tile(self.states, n_metrics * n_states),
+        })
+        for s, statistic in enumerate(self.statistics):
+            frame[statistic] = self.values[s].reshape(-1)
+        return frame
+
+
+class StateSimilarity:
+    """
+    Compares every state's county-level distribution of DataAnalytics metrics with every other
+    state's: two-sample Kolmogorov-Smirnov statistic, Wasserstein-1 distance and mean shift.
+
+    Per metric, the finite values are sorted once into a pooled grid and each state's empirical CDF
+    is built on it from its bincounts (states x grid points). Every pair's KS statistic is the
+    largest gap between two rows and its Wasserstein distance the gap integrated over the grid
+    spacing, both exact, computed for as many states at a time as memory_mb allows; no per-state
+    masks or per-pair loops.
+
+    Results are cached by a fingerprint of the input (state codes and metric values) and the
+    settings, in memory and, with cache_dir, on disk as .npz, so repeated analyses of unchanged
+    data are free.
+
+    Example:
+        distances = StateSimilarity(cache_dir='.similarity_cache').compute(analytics.df)
+        distances.matrix('split_ticket_change', 'wasserstein')
+        distances.nearest('pres_house_ratio_change', 'PA')
+    """
+
+    DEFAULT_METRICS = [
+        'pres_house_ratio_2024', 'pres_house_ratio_2020', 'pres_house_ratio_change',
+        'split_ticket_2024', 'split_ticket_2020', 'split_ticket_change',
+    ]
+    STATISTICS = ['ks', 'wasserstein', 'mean_shift', 'mean_shift_z']
+    # Bump to invalidate cached results when the computation changes
+    VERSION = 1
+
+    def __init__(self, cache_dir: Optional[str] = None, min_count: int = 2, memory_mb: float = 64):
+        """
+        - cache_dir: if set, results are also saved there per fingerprint
+        - min_count: states with fewer finite values of a metric get NaN distances for it
+        - memory_mb: bound on the CDF gaps held at once, which sets how many states are compared per batch
+        """
+        self.cache_dir = cache_dir
+        self.min_count = min_count
+        self.memory_mb = memory_mb
+        self._memory_cache: Dict[str, StateDistances] = {}
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def fingerprint(self, df: pd.DataFrame, metrics: List[str]) -> str:
+        """Hash of the state codes and metric values of df and of the settings."""
+        h = hashlib.sha256()
+        h.update(repr((self.VERSION, self.min_count, metrics)).encode('utf-8'))
+        h.update('\x1f'.join(df['state_code'].astype(str)).encode('utf-8'))
+        for metric in metrics:
+            h.update(np.ascontiguousarray(df[metric].to_numpy(dtype=np.float64)).tobytes())
+        return h.hexdigest()
+
+    @instrumented('similarity.compute')
+    def compute(self, df: pd.DataFrame, metrics: Optional[List[str]] = None) -> StateDistances:
+        """Distances between all pairs of states of df (DataAnalytics.df) for each metric, cached."""
+        metrics = list(metrics or self.DEFAULT_METRICS)
+        key = self.fingerprint(df, metrics)
+        result = self._memory_cache.get(key)
+        if result is not None:
+            return result
+
+        cache_file = os.path.join(self.cache_dir, f'{key}.npz') if self.cache_dir else None
+        if cache_file and os.path.exists(cache_file):
+            with np.load(cache_file) as cached:
+                result = StateDistances(cached['statistics'].tolist(), cached['metrics'].tolist(), cached['states'].tolist(),
+                                        cached['values'], cached['counts'], key)
+        else:
+            result = self._compute(df, metrics, key)
+            if cache_file:
+                np.savez(cache_file, statistics=np.array(result.statistics), metrics=np.array(result.metrics),
+                         states=np.array(result.states), values=result.values, counts=result.counts)
+        self._memory_cache[key] = result
+        return result
+
+    def _compute(self, df: pd.DataFrame, metrics: List[str], key: str) -> StateDistances:
+        state_index, states = pd.factorize(df['state_code'], sort=True)
+        n_states = len(states)
+        values = np.full((len(self.STATISTICS), len(metrics), n_states, n_states), np.nan)
+        counts = np.zeros((len(metrics), n_states), dtype=np.int64)
+
+        for m, metric in enumerate(metrics):
+            column = df[metric].to_numpy(dtype=np.float64)
+            finite = np.isfinite(column)
+            x, state = column[finite], state_index[finite]
+            count = np.bincount(state, minlength=n_states)
+            counts[m] = count
+            valid = count >= self.min_count
+            if not valid.any():
+                continue
+
+            # Per-state moments for the mean shift
+            total = np.bincount(state, weights=x, minlength=n_states)
+            mean = np.divide(total, count, out=np.full(n_states, np.nan), where=count > 0)
+            squares = np.bincount(state, weights=(x - mean[state]) ** 2, minlength=n_states)
+            var = np.divide(squares, count - 1, out=np.full(n_states, np.nan), where=count > 1)
+            shift = mean[:, None] - mean[None, :]
+            values[2, m] = shift
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values[3, m] = shift / np.sqrt(var[:, None] / count[:, None] + var[None, :] / count[None, :])
+
+            # ECDF of every state at every pooled grid point (the CDF just after each point)
+            grid, position = np.unique(x, return_inverse=True)
+            cdf = np.bincount(state * len(grid) + position, minlength=n_states * len(grid)).reshape(n_states, len(grid))
+            cdf = np.cumsum(cdf, axis=1, dtype=np.float64)
+            cdf /= np.maximum(count, 1)[:, None]
+            spacing = np.diff(grid)
+
+            # Both are symmetric: each block of states is compared with itself and the states after it
+            block = max(1, int(self.memory_mb * 2 ** 20 // (n_states * len(grid) * 8)))
+            for start in range(0, n_states, block):
+                rows = slice(start, min(start + block, n_states))
+                gap = np.subtract(cdf[rows, None, :], cdf[None, start:, :])
+                np.abs(gap, out=gap)
+                ks, wasserstein = gap.max(axis=2), gap[:, :, :-1] @ spacing
+                values[0, m, rows, start:], values[0, m, start:, rows] = ks, ks.T
+                values[1, m, rows, start:], values[1, m, start:, rows] = wasserstein, wasserstein.T
+
+            values[:, m, ~valid, :] = np.nan
+            values[:, m, :, ~valid] = np.nan
+
+        return StateDistances(list(self.STATISTICS), metrics, list(states), values, counts, key)
@@ -0,0 +1,227 @@
+import math
+from typing import List, Dict, Optional, Tuple, Union, Iterable
+
+import numpy as np
+import pandas as pd
+
+from data_registry import CountyRegistry
+
+
+class QuantileSketch:
+    """
+    Mergeable t-digest: a quantile summary of a stream of values in at most ~compression centroids
+    (mean, weight), whatever the number of values. Centroids are small near the tails and larger in
+    the middle (arcsine scale function), so extreme quantiles are the most accurate. Quantile error is
+    typically well under 1/compression in rank, and sketches merged in any order give the same
+    accuracy as one sketch of all values.
+
+    Example:
+        sketch = QuantileSketch().add(values)
+        merged = QuantileSketch.merge([sketch, other])
+        merged.quantile([0.5, 0.9])
+    """
+
+    DEFAULT_COMPRESSION = 100
+
+    def __init__(self, compression: float = DEFAULT_COMPRESSION):
+        self.compression = compression
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.min = np.nan
+        self.max = np.nan
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def __len__(self) -> int:
+        return len(self.means)
+
+    def _scale(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        """Greedily merges sorted centroids while each stays within one unit of the scale function."""
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = float(weights.sum())
+        if total == 0:
+            self.means, self.weights = np.zeros(0), np.zeros(0)
+            return
+
+        # A centroid may grow until it spans one unit of the scale function; limits are in cumulative weight
+        out_means, out_weights = [], []
+        k_lower = self._scale(0.0)
+        cumulative = 0.0
+        current_mean, current_weight = float(means[0]), float(weights[0])
+        for mean, weight in zip(means[1:].tolist(), weights[1:].tolist()):
+            proposed = current_weight + weight
+            if self._scale((cumulative + proposed) / total) - k_lower <= 1:
+                current_mean += (mean - current_mean) * weight / proposed
+                current_weight = proposed
+            else:
+                out_means.append(current_mean)
+                out_weights.append(current_weight)
+                cumulative += current_weight
+                k_lower = self._scale(cumulative / total)
+                current_mean, current_weight = mean, weight
+        out_means.append(current_mean)
+        out_weights.append(current_weight)
+        self.means, self.weights = np.array(out_means), np.array(out_weights)
+
+    def add(self, values: Iterable[float], weights: Optional[Iterable[float]] = None) -> 'QuantileSketch':
+        """Adds values (non-finite ones are skipped) and returns the sketch."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=np.float64).ravel()
+        finite = np.isfinite(values) & (weights > 0)
+        values, weights = values[finite], weights[finite]
+        if len(values) == 0:
+            return self
+        self.min = np.nanmin([self.min, values.min()])
+        self.max = np.nanmax([self.max, values.max()])
+        self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, weights]))
+        return self
+
+    @classmethod
+    def merge(cls, sketches: Iterable['QuantileSketch'], compression: Optional[float] = None) -> 'QuantileSketch':
+        """Returns a new sketch of the values of all sketches."""
+        sketches = [s for s in sketches if len(s) > 0]
+        merged = cls(compression if compression is not None else max((s.compression for s in sketches), default=cls.DEFAULT_COMPRESSION))
+        if not sketches:
+            return merged
+        merged.min = min(s.min for s in sketches)
+        merged.max = max(s.max for s in sketches)
+        merged._compress(np.concatenate([s.means for s in sketches]), np.concatenate([s.weights for s in sketches]))
+        return merged
+
+    def quantile(self, q: Union[float, Iterable[float]]) -> Union[float, np.ndarray]:
+        """Estimated value at quantile(s) q in [0, 1]; NaN for an empty sketch."""
+        scalar = np.isscalar(q)
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if len(self.means) == 0:
+            result = np.full(len(q), np.nan)
+        else:
+            # Centroid i sits at the middle of its weight; the ends are pinned to the exact min and max
+            total = self.weights.sum()
+            positions = np.concatenate([[0.0], np.cumsum(self.weights) - self.weights / 2, [total]])
+            values = np.concatenate([[self.min], self.means, [self.max]])
+            result = np.interp(np.clip(q, 0, 1) * total, positions, values)
+        return float(result[0]) if scalar else result
+
+    def cdf(self, x: Union[float, Iterable[float]]) -> Union[float, np.ndarray]:
+        """Estimated fraction of values at or below x."""
+        scalar = np.isscalar(x)
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        if len(self.means) == 0:
+            result = np.full(len(x), np.nan)
+        else:
+            total = self.weights.sum()
+            positions = np.concatenate([[0.0], np.cumsum(self.weights) - self.weights / 2, [total]])
+            values = np.concatenate([[self.min], self.means, [self.max]])
+            result = np.interp(x, values, positions, left=0.0, right=total) / total
+        return float(result[0]) if scalar else result
+
+
+class MetricQuantiles:
+    """
+    Quantile sketches of DataAnalytics metrics per state, kept current across live updates.
+
+    update() takes the latest analytics frame, compares each metric with the values it saw last per
+    county and rebuilds the sketches of only the states with a changed, added or removed county.
+    Group (e.g. swing states) and nationwide sketches are merged from the state sketches and cached
+    until one of their states changes, so a poll that touches a few states costs a few state-sized
+    rebuilds and a merge of ~compression centroids per state, instead of sorting the whole frame.
+
+    t-digests can't remove values, so a state is re-sketched from its current county values
+    rather than patched; a state has at most a few hundred counties.
+
+    Example:
+        quantiles = MetricQuantiles()
+        quantiles.update(analytics.df)
+        ...
+        changed_states = quantiles.update(new_analytics.df)
+        quantiles.summary(groups={'SWING': DataAnalytics.SWING_STATES})
+        quantiles.nationwide('split_ticket_change').quantile(0.99)
+    """
+
+    DEFAULT_METRICS = [
+        'pres_house_ratio_2024', 'pres_house_ratio_2020', 'pres_house_ratio_change',
+        'split_ticket_2024', 'split_ticket_2020', 'split_ticket_change',
+    ]
+    DEFAULT_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+    def __init__(self, metrics: Optional[List[str]] = None, compression: float = QuantileSketch.DEFAULT_COMPRESSION, registry: Optional[CountyRegistry] = None):
+        self.metrics = list(metrics or self.DEFAULT_METRICS)
+        self.compression = compression
+        self.registry = registry or CountyRegistry.default()
+        self._sketches: Dict[Tuple[str, int], QuantileSketch] = {}
+        self._merged: Dict[Tuple[str, Tuple[int, ...]], QuantileSketch] = {}
+        # Last seen state id and metric values per row key
+        self._state_of: Dict[Tuple[int, int], int] = {}
+        self._values = pd.DataFrame(columns=self.metrics, index=pd.MultiIndex.from_arrays([[], []]), dtype=np.float64)
+
+    def update(self, df: pd.DataFrame) -> List[str]:
+        """
+        Brings the sketches up to date with df (DataAnalytics.df: county_id, state_id and the metric
+        columns). Returns the states whose sketches were rebuilt.
+        """
+        # Rows are keyed by (county_id, occurrence): a few source rows share a county id (spellings the registry folds together)
+        row_keys = pd.MultiIndex.from_arrays([df['county_id'].to_numpy(), df.groupby('county_id').cumcount().to_numpy()])
+        values = pd.DataFrame(df[self.metrics].to_numpy(dtype=np.float64), index=row_keys, columns=self.metrics)
+        state_of = dict(zip(row_keys.tolist(), df['state_id'].tolist()))
+
+        old = self._values.reindex(values.index)
+        same = (old.to_numpy() == values.to_numpy()) | (np.isnan(old.to_numpy()) & np.isnan(values.to_numpy()))
+        changed_rows = values.index[~same.all(axis=1)].tolist()
+        removed_rows = [r for r in self._state_of if r not in state_of]
+        changed_states = {state_of[r] for r in changed_rows} | {self._state_of[r] for r in removed_rows}
+        # A row that moved state also changes the state it left
+        changed_states |= {self._state_of[r] for r in changed_rows if r in self._state_of and self._state_of[r] != state_of[r]}
+
+        self._values, self._state_of = values, state_of
+        if changed_states:
+            state_ids = df['state_id'].to_numpy()
+            matrix = values.to_numpy()
+            for state_id in changed_states:
+                rows = matrix[state_ids == state_id]
+                for j, metric in enumerate(self.metrics):
+                    self._sketches[(metric, state_id)] = QuantileSketch(self.compression).add(rows[:, j])
+            self._merged = {key: sketch for key, sketch in self._merged.items() if not changed_states.intersection(key[1])}
+        return [self.registry.states[s] for s in sorted(changed_states)]
+
+    def state(self, metric: str, state: str) -> QuantileSketch:
+        """Sketch of a metric in one state."""
+        return self._sketches.get((metric, self.registry.state_id(state)), QuantileSketch(self.compression))
+
+    def group(self, metric: str, states: Iterable[str]) -> QuantileSketch:
+        """Sketch of a metric over several states, merged from the state sketches and cached."""
+        key = (metric, tuple(sorted(self.registry.state_ids(states).tolist())))
+        if key not in self._merged:
+            self._merged[key] = QuantileSketch.merge((self._sketches[(metric, s)] for s in key[1] if (metric, s) in self._sketches), self.compression)
+        return self._merged[key]
+
+    def nationwide(self, metric: str) -> QuantileSketch:
+        """Sketch of a metric over every state seen."""
+        return self.group(metric, [self.registry.states[s] for s in sorted({s for m, s in self._sketches if m == metric})])
+
+    def summary(self, quantiles: Optional[List[float]] = None, groups: Optional[Dict[str, List[str]]] = None) -> pd.DataFrame:
+        """
+        One row per metric and state, plus one per named group of states and one nationwide ('ALL'),
+        with the count, min, max and the requested quantiles (columns q05, q50, ...).
+        """
+        quantiles = quantiles or self.DEFAULT_QUANTILES
+        rows = []
+
+        def row(metric: str, state_code: str, sketch: QuantileSketch) -> Dict[str, object]:
+            r = {'metric': metric, 'state_code': state_code, 'count': sketch.count, 'min': sketch.min, 'max': sketch.max}
+            r.update({f"q{round(q * 100):02d}": v for q, v in zip(quantiles, sketch.quantile(quantiles))})
+            return r
+
+        for metric in self.metrics:
+            for (m, state_id), sketch in sorted(self._sketches.items(), key=lambda item: item[0][1]):
+                if m == metric:
+                    rows.append(row(metric, self.registry.states[state_id], sketch))
+            for name, states in (groups or {}).items():
+                rows.append(row(metric, name, self.group(metric, states)))
+            rows.append(row(metric, 'ALL', self.nationwide(metric)))
+        return pd.DataFrame(rows)
@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import pandas as pd
+from typing import List, Type, Union, Dict, Any, Optional, Tuple, Iterable
+
+from data_classes import RowModel
+
+
+class DataStore:
+    """
+    Embedded SQLite database file for the CSV models.
+    Each model is kept in its own table (see CsvFileData.db_table) with the model's indexes,
+    so selective queries only read the matching rows instead of the whole file.
+
+    Example:
+        grouped_election_data.save_to_db(["data", "election_data.db"])
+        pa_data = ElectionDataGroupedModel.load_from_db(["data", "election_data.db"], state_code="PA", election_year=2024)
+
+        with DataStore(["data", "election_data.db"]) as store:
+            df = store.query("SELECT state_code, SUM(votes_total) AS votes FROM election_data_grouped WHERE election_type = ? GROUP BY state_code", ("P",))
+    """
+
+    SQL_TYPES: Dict[type, str] = {
+        int: 'INTEGER',
+        float: 'REAL',
+        str: 'TEXT',
+    }
+
+    def __init__(self, filename: Union[str, List[str]]):
+        self.filepath = filename if isinstance(filename, str) else os.path.join(*filename)
+        self.connection = sqlite3.connect(self.filepath, check_same_thread=False)
+
+    def __enter__(self) -> 'DataStore':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    @classmethod
+    def _sql_type(cls, field_type: Any) -> str:
+        # Unwrap Optional[...]
+        if hasattr(field_type, '__origin__') and field_type.__origin__ is Union:
+            field_type = next(t for t in field_type.__args__ if t is not type(None))
+        return cls.SQL_TYPES.get(field_type, 'TEXT')
+
+    @staticmethod
+    def _where_clause(columns: List[str], filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """Builds a WHERE clause from column filters. List/tuple/set values are matched with IN."""
+        clauses = []
+        params = []
+        for column, value in filters.items():
+            if column not in columns:
+                raise Exception(f"Unknown filter column '{column}'. Available columns: {columns}")
+            if isinstance(value, (list, tuple, set)):
+                values = list(value)
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+            elif value is None:
+                clauses.append(f"{column} IS NULL")
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def write_table(self, table: str, row_model: Type[RowModel], rows: Iterable[RowModel], indexes: List[Tuple[str, ...]]) -> None:
+        """(Re)creates the table for the row model, inserts the rows and builds the indexes."""
+        model_fields = row_model.persisted_fields()
+        columns = [f.name for f in model_fields]
+        codecs = row_model.field_codecs()
+        column_defs = ', '.join(f"{f.name} {self._sql_type(f.type)}" for f in model_fields)
+
+        with self.connection:
+            self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+            self.connection.execute(f"CREATE TABLE {table} ({column_defs})")
+            self.connection.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                ([codecs[c].encode(getattr(row, c)) if c in codecs else getattr(row, c) for c in columns] for row in rows)
+            )
+            for index_columns in indexes:
+                index_name = f"idx_{table}_{'_'.join(index_columns)}"
+                self.connection.execute(f"CREATE INDEX {index_name} ON {table} ({', '.join(index_columns)})")
+            self.connection.execute(f"ANALYZE {table}")
+
+    def read_rows(self, table: str, row_model: Type[RowModel], **filters) -> List[RowModel]:
+        """Reads the rows matching the filters into row model instances."""
+        columns = [f.name for f in row_model.persisted_fields()]
+        where, params = self._where_clause(columns, filters)
+        cursor = self.connection.execute(f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY rowid", params)
+        codecs = row_model.field_codecs()
+        # SQLite already returns typed values, so skip the string conversions of RowModel.from_dict
+        if not codecs:
+            return [row_model(**dict(zip(columns, values))) for values in cursor]
+        rows = []
+        for values in cursor:
+            record = dict(zip(columns, values))
+            for name, codec in codecs.items():
+                record[name] = codec.decode(record[name])
+            rows.append(row_model(**record))
+        return rows
+
+    def read_table(self, table: str, columns: Optional[List[str]] = None, **filters) -> pd.DataFrame:
+        """Reads the rows matching the filters into a DataFrame."""
+        table_columns = [r[1] for r in self.connection.execute(f"PRAGMA table_info({table})")]
+        if not table_columns:
+            raise Exception(f"Table '{table}' not found in {self.filepath}")
+        selected = columns if columns is not None else table_columns
+        for column in selected:
+            if column not in table_columns:
+                raise Exception(f"Unknown column '{column}' in table '{table}'")
+        where, params = self._where_clause(table_columns, filters)
+        return self.query(f"SELECT {', '.join(selected)} FROM {table}{where} ORDER BY rowid", params)
+
+    def query(self, sql: str, params: Union[Tuple, List, Dict] = ()) -> pd.DataFrame:
+        """Runs an ad hoc SQL query and returns the result as a DataFrame."""
+        return pd.read_sql_query(sql, self.connection, params=params)
@@ -0,0 +1,444 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+from typing import List, Dict, Optional, Tuple, Union, Iterable, Iterator, Any
+
+import numpy as np
+import pandas as pd
+
+from data_model import ElectionDataMap, ElectionDataFullModel, ElectionDataGroupedModel, ElectionDataGroupedRowModel, ElectionYearStateCountyDistrictMap
+from data_registry import CountyRegistry, CandidateRegistry
+from data_functions import DataFunctions
+from data_analytics import DataAnalytics
+from data_instrumentation import instrumented
+
+
+class CountyAccumulator:
+    """
+    Running per-county sums of the vote columns the analytics use (total, dem and rep votes of the
+    presidential and House races per year), indexed by county id. Rows can be added in any order and
+    any number of chunks; precinct rows of the same county add up. Memory grows with the number of
+    counties, not with the number of input rows.
+
+    to_dataframe() returns the accumulated counties with the flattened model's column names, in
+    first-seen order (the order flatten_grouped_election_data produces), so the DataAnalytics
+    results match the in-memory path.
+
+    Example:
+        accumulator = CountyAccumulator()
+        accumulator.add_grouped_rows(rows)
+        analytics = accumulator.analytics()
+    """
+
+    ELECTION_TYPES = {'P': 'pres', 'H': 'house'}
+    FIELDS = {'votes_total': 'total_votes', 'votes_dem': 'total_votes_dem', 'votes_rep': 'total_votes_rep'}
+
+    def __init__(self, registry: Optional[CountyRegistry] = None, years: Optional[List[int]] = None):
+        self.registry = registry or CountyRegistry.default()
+        self.years = [str(y) for y in (years or ElectionDataMap.election_years)]
+        # One accumulator column per (year, election type, field)
+        self.columns: List[Tuple[str, str, str]] = [
+            (year, election_type, field_name)
+            for year in self.years for election_type in self.ELECTION_TYPES for field_name in self.FIELDS
+        ]
+        self._column_index = {c: i for i, c in enumerate(self.columns)}
+        self._sums = np.zeros((0, len(self.columns)), dtype=np.float64)
+        self._seen = np.zeros((0, len(self.columns)), dtype=bool)
+        self._order = np.zeros(0, dtype=np.int64)
+        self._names: Dict[int, str] = {}
+        self.rows_added = 0
+
+    def _reserve(self, max_id: int) -> None:
+        if max_id < len(self._order):
+            return
+        capacity = max(max_id + 1, 2 * len(self._order), 1024)
+        grow = capacity - len(self._order)
+        self._sums = np.vstack([self._sums, np.zeros((grow, len(self.columns)))])
+        self._seen = np.vstack([self._seen, np.zeros((grow, len(self.columns)), dtype=bool)])
+        self._order = np.concatenate([self._order, np.full(grow, -1, dtype=np.int64)])
+
+    def add(self, years: Iterable[str], election_types: Iterable[str], state_codes: Iterable[str], counties: Iterable[str], values: Dict[str, Iterable[Optional[float]]]) -> None:
+        """
+        Adds a chunk of rows given column-wise: years, election types, state codes and county names,
+        plus values keyed by grouped field name (votes_total, votes_dem, votes_rep). None is missing.
+        """
+        years, election_types, state_codes, counties = list(years), list(election_types), list(state_codes), list(counties)
+        if not years:
+            return
+        ids = self.registry.get_ids(state_codes, counties)
+        self._reserve(int(ids.max()))
+
+        # Register counties in first-seen order, including ones with only other races, as flattening does
+        for county_id, county in zip(ids.tolist(), counties):
+            if self._order[county_id] < 0:
+                self._order[county_id] = len(self._names)
+                self._names[county_id] = county
+
+        column = np.fromiter(
+            (self._column_index.get((str(y), t, 'votes_total'), -1) for y, t in zip(years, election_types)),
+            dtype=np.int64, count=len(years))
+        tracked = column >= 0
+        for offset, field_name in enumerate(self.FIELDS):
+            vals = np.array([np.nan if v is None else v for v in values[field_name]], dtype=np.float64)
+            rows = tracked & ~np.isnan(vals)
+            cols = column[rows] + offset
+            np.add.at(self._sums, (ids[rows], cols), vals[rows])
+            self._seen[ids[rows], cols] = True
+        self.rows_added += len(years)
+
+    def add_grouped_rows(self, rows: List[ElectionDataGroupedRowModel]) -> None:
+        """Adds grouped row models."""
+        self.add(
+            [str(r.election_year) for r in rows], [r.election_type for r in rows],
+            [r.state_code for r in rows], [r.county for r in rows],
+            {field_name: [getattr(r, field_name) for r in rows] for field_name in self.FIELDS})
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Returns one row per accumulated county with state_code, county, county_id and the pres/house vote columns."""
+        ids = np.flatnonzero(self._order >= 0)
+        ids = ids[np.argsort(self._order[ids], kind='stable')]
+        values = np.where(self._seen[ids], self._sums[ids], np.nan)
+
+        df = pd.DataFrame({
+            'state_code': [self.registry.state_code(i) for i in ids.tolist()],
+            'county': [self._names[i] for i in ids.tolist()],
+            'county_id': ids,
+        })
+        for i, (year, election_type, field_name) in enumerate(self.columns):
+            df[f"{self.ELECTION_TYPES[election_type]}_{self.FIELDS[field_name]}_{year}"] = values[:, i]
+        return df
+
+    def state_totals(self) -> pd.DataFrame:
+        """Returns the accumulated vote columns summed per state."""
+        df = self.to_dataframe().drop(columns=['county', 'county_id'])
+        return df.groupby('state_code', sort=False).sum(min_count=1).reset_index()
+
+    def analytics(self) -> DataAnalytics:
+        """Returns DataAnalytics over the accumulated counties."""
+        return DataAnalytics.from_dataframe(self.to_dataframe())
+
+
+class StreamingPipeline:
+    """
+    Out-of-core versions of the load, aggregate and flatten stages for inputs too large to hold in
+    memory (e.g. precinct-level results). Inputs are read in chunks of chunk_size rows (grouped CSV)
+    or county/precinct records (full data as JSONL) and folded into a CountyAccumulator, so peak
+    memory is bounded by the chunk size plus the number of counties.
+
+    The full data JSON is a single nested object that can't be read incrementally, so streaming
+    uses a JSONL layout with one record per line: {"year", "state_code", "county", "races"}, where
+    races is the county's entry of ElectionDataFullModel. Several lines may carry the same county
+    (e.g. one per precinct); their votes are summed.
+
+    Example:
+        StreamingPipeline.save_full_jsonl(SyntheticElectionData.iter_records(units_per_state=20000), "full.jsonl")
+        accumulator = StreamingPipeline.aggregate_full_jsonl("full.jsonl", grouped_csv="grouped.csv")
+        ratios = accumulator.analytics().analyze_presidential_house_ratios_comprehensive()
+
+        accumulator = StreamingPipeline.accumulate_grouped_csv(["data", "election_data_grouped.csv"])
+
+        grouped = StreamingPipeline.fetch_grouped(ElectionDataMap.election_types.keys(), data_map, full_jsonl="full.jsonl")
+    """
+
+    DEFAULT_CHUNK_SIZE = 50000
+    NO_RACE_STATUSES = (403, 404)
+
+    @staticmethod
+    def _filepath(filename: Union[str, List[str]]) -> str:
+        return filename if isinstance(filename, str) else os.path.join(*filename)
+
+    @staticmethod
+    def iter_grouped_csv_chunks(filename: Union[str, List[str]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Dict[str, list]]:
+        """Yields column-wise chunks of at most chunk_size rows from a grouped CSV, values parsed as load_from_csv does."""
+        def to_int(value: str) -> Optional[int]:
+            try:
+                return int(value) if value not in ('', 'None') else None
+            except ValueError:
+                return None
+
+        filepath = StreamingPipeline._filepath(filename)
+        with open(filepath, 'r', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            index = {name: header.index(name) for name in ('election_year', 'election_type', 'state_code', 'county', *CountyAccumulator.FIELDS)}
+            while True:
+                rows = list(islice(reader, chunk_size))
+                if not rows:
+                    break
+                chunk = {name: [row[i] for row in rows] for name, i in index.items()}
+                for field_name in CountyAccumulator.FIELDS:
+                    chunk[field_name] = [to_int(v) for v in chunk[field_name]]
+                yield chunk
+
+    @staticmethod
+    @instrumented('stream.grouped_csv')
+    def accumulate_grouped_csv(
+        filename: Union[str, List[str]],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        accumulator: Optional[CountyAccumulator] = None
+    ) -> CountyAccumulator:
+        """Folds a grouped CSV into a CountyAccumulator chunk by chunk."""
+        accumulator = accumulator or CountyAccumulator()
+        for chunk in StreamingPipeline.iter_grouped_csv_chunks(filename, chunk_size):
+            accumulator.add(chunk['election_year'], chunk['election_type'], chunk['state_code'], chunk['county'],
+                            {field_name: chunk[field_name] for field_name in CountyAccumulator.FIELDS})
+        return accumulator
+
+    @staticmethod
+    def save_full_jsonl(records: Union[ElectionDataFullModel, Iterable[Tuple[str, str, str, Dict[str, Any]]]], filename: Union[str, List[str]]) -> None:
+        """Writes full data, or (year, state_code, county, races) records, as JSONL."""
+        if isinstance(records, ElectionDataFullModel):
+            records = StreamingPipeline._iter_full_model(records)
+        filepath = StreamingPipeline._filepath(filename)
+        count = 0
+        with open(filepath, 'w') as f:
+            for year, state_code, county, races in records:
+                f.write(json.dumps({"year": str(year), "state_code": state_code, "county": county, "races": races}))
+                f.write('\n')
+                count += 1
+        print(f"Data saved to {filepath} ({count} records)")
+
+    @staticmethod
+    def _open_grouped_csv(grouped_csv: Optional[Union[str, List[str]]]) -> Tuple[Any, Optional[csv.DictWriter], Optional[str]]:
+        """Opens a grouped CSV for writing rows as save_to_csv would; (None, None, None) when no file is given."""
+        if grouped_csv is None:
+            return None, None, None
+        filepath = StreamingPipeline._filepath(grouped_csv)
+        f = open(filepath, 'w', newline='')
+        writer = csv.DictWriter(f, fieldnames=[field.name for field in ElectionDataGroupedRowModel.persisted_fields()], extrasaction='ignore')
+        writer.writeheader()
+        return f, writer, filepath
+
+    @staticmethod
+    def _iter_full_model(full_data: ElectionDataFullModel) -> Iterator[Tuple[str, str, str, Dict[str, Any]]]:
+        for year, states in full_data.data.items():
+            for state_code, counties in states.items():
+                for county, races in counties.items():
+                    yield str(year), state_code, county, races
+
+    @staticmethod
+    def iter_full_jsonl_chunks(filename: Union[str, List[str]], chunk_size: int = 5000) -> Iterator[ElectionDataFullModel]:
+        """
+        Yields ElectionDataFullModel chunks of at most chunk_size records. A chunk is closed early when a
+        county repeats, so every county appears at most once per chunk.
+        """
+        filepath = StreamingPipeline._filepath(filename)
+        chunk, count = {}, 0
+        with open(filepath, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if count >= chunk_size or record['county'] in chunk.get(record['year'], {}).get(record['state_code'], {}):
+                    yield ElectionDataFullModel(chunk)
+                    chunk, count = {}, 0
+                chunk.setdefault(record['year'], {}).setdefault(record['state_code'], {})[record['county']] = record['races']
+                count += 1
+        if count:
+            yield ElectionDataFullModel(chunk)
+
+    @staticmethod
+    @instrumented('stream.full_jsonl')
+    def aggregate_full_jsonl(
+        filename: Union[str, List[str]],
+        chunk_size: int = 5000,
+        grouped_csv: Optional[Union[str, List[str]]] = None,
+        accumulator: Optional[CountyAccumulator] = None
+    ) -> CountyAccumulator:
+        """
+        Aggregates full data JSONL to grouped rows chunk by chunk and folds them into a CountyAccumulator.
+        When grouped_csv is given the grouped rows are also written there, as save_to_csv would: rows of
+        a county spread over several records (precincts) are merged first, one row per (year, type,
+        county), so those rows are held until the end of the pass (one per county and race).
+        """
+        accumulator = accumulator or CountyAccumulator()
+        merged: Dict[Tuple[Any, str, str, str], ElectionDataGroupedRowModel] = {}
+        f, writer, filepath = StreamingPipeline._open_grouped_csv(grouped_csv)
+        try:
+            for chunk in StreamingPipeline.iter_full_jsonl_chunks(filename, chunk_size):
+                rows = DataFunctions.aggregate_full_data_to_grouped(chunk).data
+                accumulator.add_grouped_rows(rows)
+                if writer is not None:
+                    for row in rows:
+                        key = (row.election_year, row.election_type, row.state_code, row.county)
+                        merged[key] = StreamingPipeline._merge_grouped_rows(merged[key], row) if key in merged else row
+            if writer is not None:
+                for row in merged.values():
+                    writer.writerow(row.to_dict())
+        finally:
+            if f is not None:
+                f.close()
+                print(f"Data saved to {filepath}")
+        return accumulator
+
+    @staticmethod
+    def _merge_grouped_rows(row: ElectionDataGroupedRowModel, other: ElectionDataGroupedRowModel) -> ElectionDataGroupedRowModel:
+        """One grouped row of a county from two of its parts: votes summed, reported_pct weighted by votes, candidates combined."""
+        candidates = CandidateRegistry.default()
+
+        def add(a: Optional[int], b: Optional[int]) -> Optional[int]:
+            return None if a is None and b is None else (a or 0) + (b or 0)
+
+        def combine(a: Optional[Tuple[int, ...]], b: Optional[Tuple[int, ...]]) -> Optional[Tuple[int, ...]]:
+            return candidates.intern(dict.fromkeys((a or ()) + (b or ())))
+
+        reported = [(r.reported_pct, r.votes_total or 0) for r in (row, other) if r.reported_pct is not None]
+        weight = sum(w for _, w in reported)
+        if weight > 0:
+            reported_pct = sum(pct * w for pct, w in reported) / weight
+        else:
+            reported_pct = reported[0][0] if reported else None
+
+        total = add(row.votes_total, other.votes_total)
+        votes = {name: add(getattr(row, f'votes_{name}'), getattr(other, f'votes_{name}')) for name in ('dem', 'rep', 'other')}
+        return ElectionDataGroupedRowModel(
+            election_year=row.election_year,
+            election_type=row.election_type,
+            state_code=row.state_code,
+            county=row.county,
+            dem_candidate=combine(row.dem_candidate, other.dem_candidate),
+            rep_candidate=combine(row.rep_candidate, other.rep_candidate),
+            other_candidate=combine(row.other_candidate, other.other_candidate),
+            reported_pct=reported_pct,
+            votes_total=total,
+            votes_dem=votes['dem'],
+            votes_rep=votes['rep'],
+            votes_other=votes['other'],
+            votes_dem_pct=(votes['dem'] / total * 100) if total else None,
+            votes_rep_pct=(votes['rep'] / total * 100) if total else None,
+            votes_other_pct=(votes['other'] / total * 100) if total else None,
+        )
+
+    @staticmethod
+    def _fetch_race(race: str, max_attempts: int, retry_delay: float) -> Optional[List[Dict[str, Any]]]:
+        """County entries of a race response; None when the race didn't run (NO_RACE_STATUSES). Raises after max_attempts failures."""
+        url = DataFunctions.results_url(race)
+        for attempt in range(1, max_attempts + 1):
+            if attempt > 1:
+                time.sleep(retry_delay)
+            response = DataFunctions._request(url, race.split('-')[1], attempt=attempt)
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code in StreamingPipeline.NO_RACE_STATUSES:
+                return None
+        raise Exception(f"Failed request ({response.status_code}) after {max_attempts} attempts. Url: {url}")
+
+    @staticmethod
+    def iter_fetched_states(
+        election_types: Iterable[str],
+        year_state_county_district_map: ElectionYearStateCountyDistrictMap,
+        keep_full_data: bool = False,
+        max_attempts: int = 3,
+        retry_delay: float = 1.0
+    ) -> Iterator[Tuple[Any, str, List[ElectionDataGroupedRowModel], Optional[Dict[str, Dict[str, Any]]]]]:
+        """
+        Fetches the races of each state and yields (year, state_code, grouped rows, county records) per
+        state. Every response's county entries are folded into the state's race aggregates as it
+        arrives, then dropped, so besides the output rows only one response is held at a time.
+        Rows are the ones aggregate_full_data_to_grouped makes of get_all_election_data's result,
+        in the same order. With keep_full_data, county records are the state's counties as in
+        ElectionDataFullModel (blank races included); otherwise None.
+        """
+        election_types = list(election_types)
+        candidates = CandidateRegistry.default()
+        for year, states in year_state_county_district_map.data.items():
+            for state_code, state_map in states.items():
+                counties = state_map["counties"]
+                known_counties = set(counties)
+                # (election_type, county) -> aggregate; House rows exist for every county, as aggregation makes them
+                aggregates: Dict[Tuple[str, str], Dict[str, Any]] = {}
+                records = None
+                if keep_full_data:
+                    records = {
+                        county: {
+                            election_type: DataFunctions.get_blank_county_data() if election_type != 'H' else {
+                                district: DataFunctions.get_blank_county_data() for district in state_map["county_districts"].get(county, [])
+                            }
+                            for election_type in election_types
+                        }
+                        for county in counties
+                    }
+
+                for election_type in election_types:
+                    if election_type in ('P', 'S', 'G'):
+                        race = f"{year}-{election_type}G-{state_code}"
+                        entries = StreamingPipeline._fetch_race(race, max_attempts, retry_delay) or []
+                        loaded_counties = set()
+                        for entry in entries:
+                            county = entry["countyName"]
+                            if county not in known_counties:
+                                raise Exception(f"County '{county}' not in the county/district map for state {state_code}, year {year}, election type: {election_type}.")
+                            if county in loaded_counties:
+                                raise Exception(f"Duplicate county {county} for state {state_code}, year {year}, election type: {election_type}.")
+                            loaded_counties.add(county)
+                            data = DataFunctions.extract_county_data_from_response(entry)
+                            if records is not None:
+                                records[county][election_type] = data
+                            if data['candidates']:
+                                aggregates[(election_type, county)] = DataFunctions.new_race_aggregate(data['pct_reported'])
+                                DataFunctions.add_race_data(aggregates[(election_type, county)], data, candidates)
+                    elif election_type == 'H':
+                        for county in counties:
+                            aggregates[('H', county)] = DataFunctions.new_race_aggregate(house=True)
+                        for district in state_map["districts"]:
+                            race = f"{year}-HG-{state_code}-{district}"
+                            # A county listed twice in a response keeps its last entry, as in the full model
+                            district_data = {}
+                            for entry in StreamingPipeline._fetch_race(race, max_attempts, retry_delay) or []:
+                                if entry["countyName"] not in known_counties:
+                                    raise Exception(f"County '{entry['countyName']}' not in the county/district map for state {state_code}, year {year}, district {district}.")
+                                district_data[entry["countyName"]] = DataFunctions.extract_county_data_from_response(entry)
+                            for county, data in district_data.items():
+                                if records is not None:
+                                    records[county]['H'][district] = data
+                                if data['candidates']:
+                                    DataFunctions.add_race_data(aggregates[('H', county)], data, candidates, district)
+                    else:
+                        raise Exception(f"Unsupported election_type '{election_type}'")
+
+                rows = [
+                    DataFunctions.grouped_row(year, election_type, state_code, county, aggregates[(election_type, county)], candidates)
+                    for county in counties for election_type in election_types if (election_type, county) in aggregates
+                ]
+                print(f' Loaded state {state_code}')
+                yield year, state_code, rows, records
+
+    @staticmethod
+    @instrumented('stream.fetch_grouped')
+    def fetch_grouped(
+        election_types: Iterable[str],
+        year_state_county_district_map: ElectionYearStateCountyDistrictMap,
+        grouped_csv: Optional[Union[str, List[str]]] = None,
+        full_jsonl: Optional[Union[str, List[str]]] = None,
+        max_attempts: int = 3,
+        retry_delay: float = 1.0
+    ) -> ElectionDataGroupedModel:
+        """
+        Fetches straight to ElectionDataGroupedModel without building ElectionDataFullModel (see
+        iter_fetched_states). Rows are written to grouped_csv state by state when given. full_jsonl
+        optionally keeps the full data as a side output, in the JSONL layout of save_full_jsonl.
+        """
+        grouped_rows = []
+        f, writer, filepath = StreamingPipeline._open_grouped_csv(grouped_csv)
+        full_file = open(StreamingPipeline._filepath(full_jsonl), 'w') if full_jsonl is not None else None
+        try:
+            for year, state_code, rows, records in StreamingPipeline.iter_fetched_states(
+                    election_types, year_state_county_district_map, full_file is not None, max_attempts, retry_delay):
+                grouped_rows.extend(rows)
+                if writer is not None:
+                    for row in rows:
+                        writer.writerow(row.to_dict())
+                if full_file is not None:
+                    for county, races in records.items():
+                        full_file.write(json.dumps({"year": str(year), "state_code": state_code, "county": county, "races": races}))
+                        full_file.write('\n')
+        finally:
+            if f is not None:
+                f.close()
+                print(f"Data saved to {filepath}")
+            if full_file is not None:
+                full_file.close()
+                print(f"Data saved to {full_file.name}")
+        return ElectionDataGroupedModel(data=grouped_rows)
@@ -0,0 +1,127 @@
+import random
+from typing import List, Dict, Optional, Tuple, Any, Iterator
+
+from data_model import ElectionDataMap, ElectionDataFullModel, ElectionYearStateCountyDistrictMap
+
+
+class SyntheticElectionData:
+    """
+    Generates schema-valid ElectionDataFullModel data at any scale, for benchmarks and load tests.
+
+    Each state gets units_per_state reporting units (counties at the default scale of ~90 per state,
+    precinct-like at thousands per state) split across districts_per_state House districts, with
+    each unit spanning up to max_districts_per_unit of them. Vote totals, party shares and House
+    drop-off are drawn so the analytics produce values in realistic ranges. Senate and governor
+    races run in a random subset of states, and other states carry blank entries as fetched data does.
+
+    Keys are strings, as in data loaded from JSON. Output is deterministic for a given seed.
+
+    Example:
+        full = SyntheticElectionData.generate(units_per_state=2000, districts_per_state=20, seed=1)
+        grouped = DataFunctions.aggregate_full_data_to_grouped(full)
+    """
+
+    PARTIES: Tuple[str, ...] = ('D', 'R', 'L')
+
+    @staticmethod
+    def _blank_county_data() -> Dict[str, Any]:
+        return {"pct_reported": None, "total_votes": None, "candidates": {}, "timestamp": None}
+
+    @staticmethod
+    def _county_data(rng: random.Random, total_votes: int, dem_share: float, names: Dict[str, str], timestamp: str) -> Dict[str, Any]:
+        other_share = rng.uniform(0.005, 0.04)
+        dem_votes = int(total_votes * dem_share * (1 - other_share))
+        other_votes = int(total_votes * other_share)
+        votes = {'D': dem_votes, 'R': total_votes - dem_votes - other_votes, 'L': other_votes}
+        return {
+            "pct_reported": round(rng.uniform(90, 100), 1) if rng.random() < 0.3 else 100.0,
+            "total_votes": total_votes,
+            "candidates": {
+                party: {
+                    "name": names[party],
+                    "votes": votes[party],
+                    "votes_pct": round(votes[party] / total_votes * 100, 1) if total_votes else 0.0
+                }
+                for party in SyntheticElectionData.PARTIES
+            },
+            "timestamp": timestamp
+        }
+
+    @staticmethod
+    def iter_records(
+        units_per_state: int = 90,
+        states: Optional[List[str]] = None,
+        years: Optional[List[int]] = None,
+        districts_per_state: int = 8,
+        max_districts_per_unit: int = 3,
+        statewide_race_probability: float = 0.4,
+        seed: int = 0
+    ) -> Iterator[Tuple[str, str, str, Dict[str, Any]]]:
+        """
+        Yields (year, state_code, unit name, races) one unit at a time, so any scale can be written
+        out (e.g. with StreamingPipeline.save_full_jsonl) without holding it in memory.
+        """
+        states = states or list(ElectionDataMap.election_states.keys())
+        years = years or ElectionDataMap.election_years
+
+        for year in years:
+            timestamp = f"{year}-11-13T07:55:26.402536"
+            president = {'D': f"Dem Nominee {year}", 'R': f"Rep Nominee {year}", 'L': f"Lib Nominee {year}"}
+            for state in states:
+                rng = random.Random(f"{seed}:{year}:{state}")
+                races = {t: rng.random() < statewide_race_probability for t in ('S', 'G')}
+                swing = rng.gauss(0, 0.03)
+                turnout = rng.uniform(0.9, 1.1)
+                for i in range(units_per_state):
+                    # Per unit properties come from a seed of their own so they are the same in every year
+                    unit_rng = random.Random(f"{seed}:{state}:{i}")
+                    size = int(unit_rng.lognormvariate(9.5, 1.2)) + 50
+                    lean = min(max(unit_rng.gauss(0.42, 0.15), 0.05), 0.95)
+                    districts = sorted(unit_rng.sample(range(1, districts_per_state + 1), unit_rng.randint(1, min(max_districts_per_unit, districts_per_state))))
+
+                    total = int(size * turnout * rng.uniform(0.95, 1.05))
+                    dem_share = min(max(lean + swing + rng.gauss(0, 0.02), 0.01), 0.99)
+                    unit_data = {"P": SyntheticElectionData._county_data(rng, total, dem_share, president, timestamp)}
+
+                    for election_type in ('S', 'G'):
+                        if races[election_type]:
+                            names = {p: f"{state} {election_type} {p} {year}" for p in SyntheticElectionData.PARTIES}
+                            votes = int(total * rng.uniform(0.94, 1.0))
+                            unit_data[election_type] = SyntheticElectionData._county_data(rng, votes, min(max(dem_share + rng.gauss(0, 0.03), 0.01), 0.99), names, timestamp)
+                        else:
+                            unit_data[election_type] = SyntheticElectionData._blank_county_data()
+
+                    # House votes are split across the unit's districts with some drop-off from the top of the ticket
+                    house = {}
+                    weights = [rng.random() + 0.2 for _ in districts]
+                    house_total = total * rng.uniform(0.9, 1.0)
+                    for district, weight in zip(districts, weights):
+                        names = {p: f"{state}-{district} {p} {year}" for p in SyntheticElectionData.PARTIES}
+                        votes = int(house_total * weight / sum(weights))
+                        house[str(district)] = SyntheticElectionData._county_data(rng, votes, min(max(dem_share + rng.gauss(0, 0.05), 0.01), 0.99), names, timestamp)
+                    unit_data["H"] = house
+
+                    yield str(year), state, f"Unit {i:07d}", unit_data
+
+    @staticmethod
+    def generate(**kwargs) -> ElectionDataFullModel:
+        """Returns generated data for every year, state and unit; takes the arguments of iter_records."""
+        res = {}
+        for year, state, unit, unit_data in SyntheticElectionData.iter_records(**kwargs):
+            res.setdefault(year, {}).setdefault(state, {})[unit] = unit_data
+        return ElectionDataFullModel(res)
+
+    @staticmethod
+    def district_map(full_data: ElectionDataFullModel) -> ElectionYearStateCountyDistrictMap:
+        """Returns the county/district map matching generated data, e.g. for DataValidator.validate_grouped."""
+        res = {}
+        for year, states in full_data.data.items():
+            res[year] = {}
+            for state, counties in states.items():
+                county_districts = {county: [int(d) for d in data["H"].keys()] for county, data in counties.items()}
+                res[year][state] = {
+                    "counties": list(counties.keys()),
+                    "districts": sorted({d for ds in county_districts.values() for d in ds}),
+                    "county_districts": county_districts
+                }
+        return ElectionYearStateCountyDistrictMap(res)
@@ -0,0 +1,273 @@
+import json
+import os
+import struct
+import zlib
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from data_model import ElectionDataFullModel
+from data_validation import DataValidator
+
+
+class TimelineStore:
+    """
+    Append-only store of vote-count snapshots, so repeated fetches keep the progression of each
+    count instead of overwriting it.
+
+    A series is one candidate line of a county race: (election_year, election_type, state_code,
+    county, district, party). Every append is one block of the file holding only the series that
+    changed since the previous snapshot, as deltas of timestamp, votes, total_votes and pct_reported
+    against their previous values. Blocks are columnar and zlib compressed, so hundreds of polls stay
+    small. Series keys are stored once, in the block where they first appear.
+
+    Times are the source timestamps (CNN extractedAt) in epoch milliseconds, UTC; records without one
+    take the poll time. pct_reported is kept to hundredths of a percent and missing counts as -1.
+
+    Example:
+        timeline = TimelineStore(["data", "election_timeline.bin"])
+        timeline.append(DataFunctions.get_all_election_data(election_types, data_map))
+        ...
+        timeline.county_race(2024, 'P', 'PA', 'Erie', at='2024-11-06T03:00:00')
+        timeline.reporting_curve(2024, 'P', 'PA', 'Erie')
+        timeline.snapshot_at('2024-11-06T03:00:00')
+    """
+
+    MAGIC = b'ELECTL1\n'
+    KEY_COLUMNS = ['election_year', 'election_type', 'state_code', 'county', 'district', 'party']
+    VALUE_COLUMNS = ['timestamp', 'votes', 'total_votes', 'pct_reported']
+    # dtype of each delta column in a block, after the delta coded key ids
+    BLOCK_DTYPES = [np.int64, np.int64, np.int64, np.int32]
+
+    def __init__(self, filename: Union[str, List[str]]):
+        self.filepath = filename if isinstance(filename, str) else os.path.join(*filename)
+        self.keys: List[Tuple[str, str, str, str, str, str]] = []
+        self._key_ids: Dict[Tuple[str, str, str, str, str, str], int] = {}
+        self._race_keys: Dict[Tuple[str, str, str, str, str], List[int]] = {}
+        # Latest absolute values per series id, in VALUE_COLUMNS order
+        self._last = np.zeros((0, len(self.VALUE_COLUMNS)), dtype=np.int64)
+        self.polls: List[int] = []
+        self._blocks: List[Tuple[np.ndarray, np.ndarray, int]] = []  # (key ids, absolute values, poll index)
+        self._index = None
+
+        if os.path.exists(self.filepath):
+            self._read()
+
+    @staticmethod
+    def to_epoch_ms(value: Union[str, datetime, int, float, None]) -> Optional[int]:
+        """Converts an ISO timestamp, datetime or epoch milliseconds to epoch milliseconds (naive times are UTC)."""
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return None
+        if isinstance(value, (int, np.integer)):
+            return int(value)
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1000)
+
+    def _key_id(self, key: Tuple[str, str, str, str, str, str]) -> int:
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = len(self.keys)
+            self.keys.append(key)
+            self._key_ids[key] = key_id
+            self._race_keys.setdefault(key[:5], []).append(key_id)
+        return key_id
+
+    def _grow(self) -> None:
+        if len(self._last) < len(self.keys):
+            grow = max(len(self.keys) - len(self._last), len(self._last))
+            self._last = np.vstack([self._last, np.full((grow, len(self.VALUE_COLUMNS)), -1, dtype=np.int64)])
+
+    def append(self, full_data: ElectionDataFullModel, polled_at: Union[str, datetime, None] = None) -> int:
+        """Appends a fetched ElectionDataFullModel as a snapshot. Returns the number of changed series stored."""
+        return self.append_records(DataValidator.full_data_frame(full_data), polled_at)
+
+    def append_records(self, df: pd.DataFrame, polled_at: Union[str, datetime, None] = None) -> int:
+        """
+        Appends county records in the long format of DataValidator.full_data_frame (one row per county
+        race and candidate), e.g. the records of a single live response. Races without candidates are skipped.
+        """
+        polled_ms = self.to_epoch_ms(polled_at or datetime.now(timezone.utc))
+        df = df[df['party'].notna()]
+        new_keys_from = len(self.keys)
+
+        key_ids = np.fromiter((
+            self._key_id((str(y), t, s, c, '' if d is None or d != d else str(d), p))
+            for y, t, s, c, d, p in zip(df['election_year'], df['election_type'], df['state_code'], df['county'], df['district'], df['party'])
+        ), dtype=np.int64, count=len(df))
+        self._grow()
+
+        timestamps = df['timestamp'] if 'timestamp' in df.columns else pd.Series([None] * len(df))
+        # A response shares a handful of timestamps, so parse each distinct one once
+        parsed = {t: self.to_epoch_ms(t) or polled_ms for t in set(timestamps) if t is not None and t == t}
+        values = np.column_stack([
+            np.array([parsed.get(t, polled_ms) for t in timestamps], dtype=np.int64),
+            df['votes'].fillna(-1).to_numpy(dtype=np.int64),
+            df['total_votes'].fillna(-1).to_numpy(dtype=np.int64),
+            np.round(df['pct_reported'].fillna(-0.01).to_numpy(dtype=np.float64) * 100).astype(np.int64),
+        ]) if len(df) else np.zeros((0, len(self.VALUE_COLUMNS)), dtype=np.int64)
+
+        # Keep only series that changed (or are new) since their last stored value
+        order = np.argsort(key_ids, kind='stable')
+        key_ids, values = key_ids[order], values[order]
+        changed = np.any(values != self._last[key_ids], axis=1)
+        key_ids, values = key_ids[changed], values[changed]
+        deltas = values - np.where(self._last[key_ids] == -1, 0, self._last[key_ids])
+        # Series seen for the first time are stored as absolute values
+        first = self._last[key_ids, 0] == -1
+        deltas[first] = values[first]
+
+        header = json.dumps({
+            'polled_at': polled_ms,
+            'rows': int(len(key_ids)),
+            'new_keys': [list(k) for k in self.keys[new_keys_from:]],
+        }).encode('utf-8')
+        columns = [np.diff(key_ids, prepend=0).astype(np.int64)] + [deltas[:, i].astype(dtype) for i, dtype in enumerate(self.BLOCK_DTYPES)]
+        payload = struct.pack('<I', len(header)) + header + b''.join(c.tobytes() for c in columns)
+        block = zlib.compress(payload, 6)
+
+        new_file = not os.path.exists(self.filepath)
+        with open(self.filepath, 'ab') as f:
+            if new_file:
+                f.write(self.MAGIC)
+            f.write(struct.pack('<I', len(block)))
+            f.write(block)
+
+        self._last[key_ids] = values
+        self.polls.append(polled_ms)
+        self._blocks.append((key_ids, values, len(self.polls) - 1))
+        self._index = None
+        return int(len(key_ids))
+
+    def _read(self) -> None:
+        # A poll interrupted mid-append leaves a torn last block: stop before it and cut it off
+        file_size = os.path.getsize(self.filepath)
+        with open(self.filepath, 'rb') as f:
+            if f.read(len(self.MAGIC)) != self.MAGIC:
+                raise Exception(f"{self.filepath} is not a timeline file")
+            complete = f.tell()
+            while complete < file_size:
+                size = f.read(4)
+                if len(size) < 4 or struct.unpack('<I', size)[0] > file_size - complete - 4:
+                    break
+                block = f.read(struct.unpack('<I', size)[0])
+                try:
+                    payload = zlib.decompress(block)
+                except zlib.error as ex:
+                    if f.tell() < file_size:
+                        raise Exception(f"{self.filepath} has a corrupt block at byte {complete}: {ex}")
+                    break
+                complete = f.tell()
+                header_size = struct.unpack('<I', payload[:4])[0]
+                header = json.loads(payload[4:4 + header_size])
+                for key in header['new_keys']:
+                    self._key_id(tuple(key))
+                self._grow()
+
+                rows, offset = header['rows'], 4 + header_size
+                key_ids = np.cumsum(np.frombuffer(payload, dtype=np.int64, count=rows, offset=offset))
+                offset += rows * 8
+                deltas = np.zeros((rows, len(self.VALUE_COLUMNS)), dtype=np.int64)
+                for i, dtype in enumerate(self.BLOCK_DTYPES):
+                    deltas[:, i] = np.frombuffer(payload, dtype=dtype, count=rows, offset=offset)
+                    offset += rows * np.dtype(dtype).itemsize
+
+                previous = self._last[key_ids]
+                values = np.where(previous[:, :1] == -1, deltas, deltas + np.where(previous == -1, 0, previous))
+                self._last[key_ids] = values
+                self.polls.append(header['polled_at'])
+                self._blocks.append((key_ids, values, len(self.polls) - 1))
+        if complete < file_size:
+            with open(self.filepath, 'r+b') as f:
+                f.truncate(complete)
+
+    def _events(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Returns (key ids, values, poll index, segment starts per key id) of all stored events sorted by series and time."""
+        if self._index is None:
+            if self._blocks:
+                key_ids = np.concatenate([b[0] for b in self._blocks])
+                values = np.concatenate([b[1] for b in self._blocks])
+                polls = np.concatenate([np.full(len(b[0]), b[2], dtype=np.int64) for b in self._blocks])
+            else:
+                key_ids = np.zeros(0, dtype=np.int64)
+                values = np.zeros((0, len(self.VALUE_COLUMNS)), dtype=np.int64)
+                polls = np.zeros(0, dtype=np.int64)
+            order = np.lexsort((polls, values[:, 0], key_ids))
+            key_ids, values, polls = key_ids[order], values[order], polls[order]
+            starts = np.searchsorted(key_ids, np.arange(len(self.keys) + 1))
+            self._index = (key_ids, values, polls, starts)
+        return self._index
+
+    def _frame(self, key_ids: np.ndarray, values: np.ndarray) -> pd.DataFrame:
+        """Builds the long format frame of events; missing counts become <NA>."""
+        keys = [self.keys[k] for k in key_ids.tolist()]
+        columns = list(zip(*keys)) if keys else [()] * len(self.KEY_COLUMNS)
+        missing = values == -1
+        return pd.DataFrame({
+            'election_year': np.array(columns[0], dtype=np.int64),
+            'election_type': columns[1],
+            'state_code': columns[2],
+            'county': columns[3],
+            'district': [d or None for d in columns[4]],
+            'party': columns[5],
+            'timestamp': pd.to_datetime(values[:, 0], unit='ms', utc=True),
+            'votes': pd.arrays.IntegerArray(values[:, 1].copy(), missing[:, 1].copy()),
+            'total_votes': pd.arrays.IntegerArray(values[:, 2].copy(), missing[:, 2].copy()),
+            'pct_reported': np.where(missing[:, 3], np.nan, values[:, 3] / 100),
+        })
+
+    def snapshot_at(self, at: Union[str, datetime, int, None] = None) -> pd.DataFrame:
+        """Returns every series' latest values at time at (or the latest overall), in the long format."""
+        key_ids, values, _, _ = self._events()
+        if at is not None:
+            keep = values[:, 0] <= self.to_epoch_ms(at)
+            key_ids, values = key_ids[keep], values[keep]
+        last = np.r_[key_ids[1:] != key_ids[:-1], True] if len(key_ids) else np.zeros(0, dtype=bool)
+        return self._frame(key_ids[last], values[last])
+
+    def county_race(
+        self,
+        election_year: Union[int, str],
+        election_type: str,
+        state_code: str,
+        county: str,
+        district: Optional[Union[int, str]] = None,
+        at: Union[str, datetime, int, None] = None
+    ) -> pd.DataFrame:
+        """Returns the candidate votes of one county race at time at (or the latest), one row per party."""
+        series = self._race_keys.get((str(election_year), election_type, state_code, county, '' if district is None else str(district)), [])
+        key_ids, values, _, starts = self._events()
+        at_ms = self.to_epoch_ms(at)
+        rows = []
+        for key_id in series:
+            start, end = starts[key_id], starts[key_id + 1]
+            if at_ms is not None:
+                end = start + np.searchsorted(values[start:end, 0], at_ms, side='right')
+            if end > start:
+                rows.append(end - 1)
+        return self._frame(key_ids[rows], values[rows])
+
+    def reporting_curve(
+        self,
+        election_year: Union[int, str],
+        election_type: str,
+        state_code: str,
+        county: str,
+        district: Optional[Union[int, str]] = None
+    ) -> pd.DataFrame:
+        """Returns the progression of one county race: a row per distinct timestamp with total_votes, pct_reported and votes per party."""
+        series = self._race_keys.get((str(election_year), election_type, state_code, county, '' if district is None else str(district)), [])
+        key_ids, values, _, starts = self._events()
+        rows = np.concatenate([np.arange(starts[k], starts[k + 1]) for k in series]) if series else np.zeros(0, dtype=np.int64)
+        df = self._frame(key_ids[rows], values[rows])
+        if df.empty:
+            return pd.DataFrame(columns=['timestamp', 'total_votes', 'pct_reported'])
+
+        curve = df.pivot_table(index='timestamp', columns='party', values='votes', aggfunc='last')
+        race = df.groupby('timestamp')[['total_votes', 'pct_reported']].last()
+        # A party's line only gets a point when it changes; carry it forward
+        return race.join(curve.ffill()).reset_index()
@@ -0,0 +1,354 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple, Union, Any
+
+from data_model import (
+    ElectionDataMap,
+    ElectionYearStateCountyDistrictMap,
+    ElectionDataFullModel,
+    ElectionDataGroupedModel,
+    ElectionDataGroupedAndFlattenedModel,
+)
+
+
+@dataclass
+class ValidationReport:
+    """Structured result of a validation run. One row in violations per failed check and record."""
+    violations: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=DataValidator.REPORT_COLUMNS))
+    checked_rows: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not (self.violations['severity'] == 'error').any()
+
+    def summary(self) -> pd.DataFrame:
+        """Violation counts per dataset, rule and severity."""
+        if len(self.violations) == 0:
+            return pd.DataFrame(columns=['dataset', 'rule', 'severity', 'count'])
+        return (self.violations
+                .groupby(['dataset', 'rule', 'severity'], sort=False)
+                .size()
+                .reset_index(name='count'))
+
+    def raise_for_errors(self) -> None:
+        """Raises if any error-level violation was found."""
+        if not self.ok:
+            summary = self.summary()
+            errors = summary[summary['severity'] == 'error']
+            details = ', '.join(f"{r.dataset}.{r.rule}: {r.count}" for r in errors.itertuples())
+            raise Exception(f"Data validation failed ({details})")
+
+    def save_to_json(self, filename: Union[str, List[str]]) -> None:
+        filepath = filename if isinstance(filename, str) else os.path.join(*filename)
+        with open(filepath, 'w') as f:
+            json.dump({
+                'checked_rows': self.checked_rows,
+                'summary': json.loads(self.summary().to_json(orient='records')),
+                'violations': json.loads(self.violations.to_json(orient='records')),
+            }, f, indent=4)
+        print(f"Data saved to {filepath}")
+
+    def __add__(self, other: 'ValidationReport') -> 'ValidationReport':
+        frames = [df for df in (self.violations, other.violations) if len(df) > 0]
+        violations = pd.concat(frames, ignore_index=True) if frames else self.violations
+        return ValidationReport(violations=violations, checked_rows={**self.checked_rows, **other.checked_rows})
+
+
+class DataValidator:
+    """
+    Vectorized data-integrity checks over the full, grouped and flattened election data.
+    Each rule is a boolean mask over whole columns, so a run costs a handful of array operations
+    and is cheap enough for every pipeline build and every live-poll update.
+
+    Example:
+        report = DataValidator.validate_grouped(grouped_election_data, data_map)
+        report += DataValidator.validate_flattened(flattened_election_data)
+        print(report.summary())
+        report.raise_for_errors()
+    """
+
+    REPORT_COLUMNS: List[str] = [
+        'dataset', 'rule', 'severity', 'election_year', 'election_type', 'state_code', 'county',
+        'district', 'value', 'expected', 'message'
+    ]
+
+    # Percentages computed from counts must match within this tolerance (percentage points)
+    PCT_TOLERANCE: float = 0.01
+    # CNN's votePercentStr is rounded to one decimal
+    SOURCE_PCT_TOLERANCE: float = 0.051
+    # Weighted House pct_reported averages can land a rounding error above 100
+    RANGE_TOLERANCE: float = 1e-9
+
+    RACE_PREFIXES: Dict[str, str] = {
+        'P': 'pres',
+        'S': 'senate',
+        'H': 'house',
+        'G': 'gov',
+    }
+
+    @classmethod
+    def _violations(
+        cls,
+        df: pd.DataFrame,
+        mask: np.ndarray,
+        dataset: str,
+        rule: str,
+        severity: str,
+        message: str,
+        value: Optional[np.ndarray] = None,
+        expected: Optional[np.ndarray] = None,
+        election_type: Optional[str] = None,
+        election_year: Optional[Union[int, str]] = None
+    ) -> Optional[pd.DataFrame]:
+        """Builds the violation rows for the records selected by mask."""
+        mask = np.asarray(mask, dtype=bool)
+        if not mask.any():
+            return None
+        hits = df.loc[mask]
+        n = len(hits)
+
+        def column(name: str, default: Any = None):
+            return hits[name].to_numpy() if name in hits.columns else np.full(n, default, dtype=object)
+
+        return pd.DataFrame({
+            'dataset': dataset,
+            'rule': rule,
+            'severity': severity,
+            'election_year': column('election_year', election_year),
+            'election_type': column('election_type', election_type),
+            'state_code': column('state_code'),
+            'county': column('county'),
+            'district': column('district'),
+            'value': value[mask] if value is not None else np.full(n, None, dtype=object),
+            'expected': expected[mask] if expected is not None else np.full(n, None, dtype=object),
+            'message': message,
+        })
+
+    @classmethod
+    def _report(cls, parts: List[Optional[pd.DataFrame]], checked_rows: Dict[str, int]) -> ValidationReport:
+        parts = [p for p in parts if p is not None]
+        violations = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=cls.REPORT_COLUMNS)
+        return ValidationReport(violations=violations[cls.REPORT_COLUMNS], checked_rows=checked_rows)
+
+    @classmethod
+    def _vote_rules(
+        cls,
+        df: pd.DataFrame,
+        dataset: str,
+        total: str,
+        parties: Dict[str, Tuple[str, str]],
+        reported: str,
+        election_type: Optional[str] = None,
+        election_year: Optional[Union[int, str]] = None
+    ) -> List[Optional[pd.DataFrame]]:
+        """
+        Shared count rules: party votes sum to the total, party percentages match the counts,
+        no negative counts and pct_reported within 0-100.
+        parties maps party -> (votes column, pct column).
+        """
+        labels = {'election_type': election_type, 'election_year': election_year}
+        total_votes = df[total].to_numpy(dtype=float)
+        party_votes = {p: df[votes].to_numpy(dtype=float) for p, (votes, _) in parties.items()}
+        has_total = np.isfinite(total_votes)
+        parts = []
+
+        vote_sum = np.nansum(np.vstack(list(party_votes.values())), axis=0)
+        all_present = has_total & np.all(np.isfinite(np.vstack(list(party_votes.values()))), axis=0)
+        parts.append(cls._violations(
+            df, all_present & (vote_sum != total_votes), dataset, 'votes_sum_mismatch', 'error',
+            'Party votes do not sum to the total votes', vote_sum, total_votes, **labels))
+
+        negative = np.zeros(len(df), dtype=bool)
+        for values in list(party_votes.values()) + [total_votes]:
+            negative |= values < 0
+        parts.append(cls._violations(
+            df, negative, dataset, 'negative_votes', 'error', 'Negative vote count', total_votes, None, **labels))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for party, (votes, pct) in parties.items():
+                expected = party_votes[party] / total_votes * 100
+                actual = df[pct].to_numpy(dtype=float)
+                check = has_total & (total_votes > 0) & np.isfinite(expected)
+                mismatch = check & ~(np.abs(actual - expected) <= cls.PCT_TOLERANCE)
+                parts.append(cls._violations(
+                    df, mismatch, dataset, 'votes_pct_mismatch', 'error',
+                    f"'{pct}' does not match '{votes}' / '{total}'", actual, expected, **labels))
+
+        reported_pct = df[reported].to_numpy(dtype=float)
+        out_of_range = np.isfinite(reported_pct) & ((reported_pct < -cls.RANGE_TOLERANCE) | (reported_pct > 100 + cls.RANGE_TOLERANCE))
+        parts.append(cls._violations(
+            df, out_of_range, dataset, 'pct_reported_range', 'error', 'pct_reported outside 0-100', reported_pct, None, **labels))
+
+        missing_reported = has_total & (total_votes > 0) & ~np.isfinite(reported_pct)
+        parts.append(cls._violations(
+            df, missing_reported, dataset, 'pct_reported_missing', 'warning', 'Votes reported without pct_reported', None, None, **labels))
+        return parts
+
+    @classmethod
+    def validate_grouped(
+        cls,
+        grouped_data: Union[ElectionDataGroupedModel, pd.DataFrame],
+        year_state_county_district_map: Optional[ElectionYearStateCountyDistrictMap] = None
+    ) -> ValidationReport:
+        """
+        Validates grouped rows. When the district map is given, also checks that House totals
+        cover every county that has districts in the map and that every county is known to the map.
+        """
+        df = grouped_data if isinstance(grouped_data, pd.DataFrame) else grouped_data.to_dataframe()
+        # Rows aggregated straight from JSON carry string years; rows loaded from CSV carry ints
+        df = df.astype({'election_year': 'int64'})
+        dataset = 'grouped'
+        parts = cls._vote_rules(df, dataset, 'votes_total', {
+            'D': ('votes_dem', 'votes_dem_pct'),
+            'R': ('votes_rep', 'votes_rep_pct'),
+            'O': ('votes_other', 'votes_other_pct'),
+        }, 'reported_pct')
+
+        key = ['election_year', 'election_type', 'state_code', 'county']
+        parts.append(cls._violations(
+            df, df.duplicated(key, keep=False).to_numpy(), dataset, 'duplicate_key', 'error',
+            'Duplicate (election_year, election_type, state_code, county)'))
+
+        unknown_type = ~df['election_type'].isin(list(ElectionDataMap.election_types.keys())).to_numpy()
+        parts.append(cls._violations(df, unknown_type, dataset, 'unknown_election_type', 'error', 'Unknown election type'))
+
+        if year_state_county_district_map is not None:
+            map_df = cls._district_map_frame(year_state_county_district_map)
+            years = map_df['election_year'].unique()
+
+            # House coverage: every county with districts needs a House row
+            with_districts = map_df[map_df['district_count'] > 0]
+            house = df.loc[df['election_type'] == 'H', ['election_year', 'state_code', 'county']]
+            covered = with_districts.merge(house.assign(_found=True), on=['election_year', 'state_code', 'county'], how='left')
+            missing = covered['_found'].isna().to_numpy()
+            parts.append(cls._violations(
+                covered, missing, dataset, 'house_coverage', 'error',
+                'County has districts in the map but no House totals',
+                covered['district_count'].to_numpy(), None, election_type='H'))
+
+            # Every grouped county must exist in the map for its year
+            in_years = df['election_year'].isin(years).to_numpy()
+            known = df[['election_year', 'state_code', 'county']].merge(
+                map_df[['election_year', 'state_code', 'county']].assign(_found=True),
+                on=['election_year', 'state_code', 'county'], how='left')['_found'].notna().to_numpy()
+            parts.append(cls._violations(
+                df, in_years & ~known, dataset, 'unknown_county', 'error', 'County not present in the district map'))
+
+        return cls._report(parts, {dataset: len(df)})
+
+    @classmethod
+    def validate_flattened(cls, flattened_data: Union[ElectionDataGroupedAndFlattenedModel, pd.DataFrame]) -> ValidationReport:
+        """Validates every race/year column block of the flattened rows."""
+        df = flattened_data if isinstance(flattened_data, pd.DataFrame) else flattened_data.to_dataframe()
+        dataset = 'flattened'
+        parts = []
+        for year in ElectionDataMap.election_years:
+            for election_type, prefix in cls.RACE_PREFIXES.items():
+                total = f'{prefix}_total_votes_{year}'
+                if total not in df.columns:
+                    continue
+                parts.extend(cls._vote_rules(df, dataset, total, {
+                    'D': (f'{prefix}_total_votes_dem_{year}', f'{prefix}_total_votes_dem_pct_{year}'),
+                    'R': (f'{prefix}_total_votes_rep_{year}', f'{prefix}_total_votes_rep_pct_{year}'),
+                    'O': (f'{prefix}_total_votes_other_{year}', f'{prefix}_total_votes_other_pct_{year}'),
+                }, f'{prefix}_pct_reported_{year}', election_type=election_type, election_year=year))
+
+        parts.append(cls._violations(
+            df, df.duplicated(['state_code', 'county'], keep=False).to_numpy(), dataset, 'duplicate_key', 'error',
+            'Duplicate (state_code, county)'))
+        return cls._report(parts, {dataset: len(df)})
+
+    @classmethod
+    def validate_full(cls, full_data: ElectionDataFullModel) -> ValidationReport:
+        """
+        Validates source county records: candidate votes sum to total_votes, candidate votes_pct
+        match the counts (to the source's rounding) and pct_reported within 0-100.
+        """
+        df = cls.full_data_frame(full_data)
+        return cls.validate_county_records(df)
+
+    @classmethod
+    def validate_county_records(cls, df: pd.DataFrame) -> ValidationReport:
+        """
+        Validates county records in the long format of full_data_frame (one row per county race and
+        candidate). Live polls can pass the records of a single response.
+        """
+        dataset = 'full'
+        if len(df) == 0:
+            return cls._report([], {dataset: 0})
+        parts = []
+        key = ['election_year', 'election_type', 'state_code', 'county', 'district']
+
+        # One row per county race
+        races = df.drop_duplicates(key)[key + ['total_votes', 'pct_reported']].reset_index(drop=True)
+        race_index = df.groupby(key, sort=False, dropna=False).ngroup().to_numpy()
+        votes = df['votes'].to_numpy(dtype=float)
+        vote_sum = np.bincount(race_index, weights=np.nan_to_num(votes), minlength=len(races))
+        total_votes = races['total_votes'].to_numpy(dtype=float)
+
+        has_candidates = np.bincount(race_index, weights=np.isfinite(votes).astype(float), minlength=len(races)) > 0
+        parts.append(cls._violations(
+            races, has_candidates & np.isfinite(total_votes) & (vote_sum != total_votes), dataset, 'votes_sum_mismatch', 'error',
+            'Candidate votes do not sum to total_votes', vote_sum, total_votes))
+
+        reported_pct = races['pct_reported'].to_numpy(dtype=float)
+        parts.append(cls._violations(
+            races, np.isfinite(reported_pct) & ((reported_pct < -cls.RANGE_TOLERANCE) | (reported_pct > 100 + cls.RANGE_TOLERANCE)), dataset, 'pct_reported_range', 'error',
+            'pct_reported outside 0-100', reported_pct, None))
+
+        # Candidate level percentages
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected = votes / total_votes[race_index] * 100
+        actual = df['votes_pct'].to_numpy(dtype=float)
+        check = np.isfinite(expected) & np.isfinite(actual)
+        parts.append(cls._violations(
+            df, check & ~(np.abs(actual - expected) <= cls.SOURCE_PCT_TOLERANCE), dataset, 'votes_pct_mismatch', 'warning',
+            'Candidate votes_pct does not match votes / total_votes', actual, expected))
+
+        parts.append(cls._violations(
+            df, np.isfinite(votes) & (votes < 0), dataset, 'negative_votes', 'error', 'Negative candidate votes', votes, None))
+
+        return cls._report(parts, {dataset: len(races)})
+
+    @staticmethod
+    def full_data_frame(full_data: ElectionDataFullModel) -> pd.DataFrame:
+        """Flattens the nested full model into one row per county race and candidate."""
+        rows = []
+
+        def add(year, state_code, county, election_type, district, data):
+            candidates = data.get('candidates') or {}
+            base = (year, election_type, state_code, county, district, data.get('total_votes'), data.get('pct_reported'))
+            timestamp = data.get('timestamp')
+            if not candidates:
+                rows.append(base + (None, None, None, timestamp))
+            for party, candidate in candidates.items():
+                rows.append(base + (party, candidate.get('votes'), candidate.get('votes_pct'), timestamp))
+
+        for year, state_data in full_data.data.items():
+            for state_code, county_data in state_data.items():
+                for county, election_types in county_data.items():
+                    for election_type, data in election_types.items():
+                        if election_type == 'H':
+                            for district, district_data in data.items():
+                                add(year, state_code, county, election_type, str(district), district_data)
+                        else:
+                            add(year, state_code, county, election_type, None, data)
+
+        return pd.DataFrame(rows, columns=[
+            'election_year', 'election_type', 'state_code', 'county', 'district',
+            'total_votes', 'pct_reported', 'party', 'votes', 'votes_pct', 'timestamp'
+        ])
+
+    @staticmethod
+    def _district_map_frame(year_state_county_district_map: ElectionYearStateCountyDistrictMap) -> pd.DataFrame:
+        """One row per (year, state, county) of the district map with its district count."""
+        rows = [
+            (int(year), state_code, county, len(state_data['county_districts'].get(county, [])))
+            for year, states in year_state_county_district_map.data.items()
+            for state_code, state_data in states.items()
+            for county in state_data['counties']
+        ]
+        return pd.DataFrame(rows, columns=['election_year', 'state_code', 'county', 'district_count'])